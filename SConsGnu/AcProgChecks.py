@@ -42,14 +42,18 @@ in some cases whether they support certain features.
 
 __docformat__ = 'restructuredText'
 
-from SCons.Script import Delete, Mkdir
-from SCons.Action import _subproc
+from SCons.Script import Delete
+from SCons.Action import _subproc, ActionFactory
 from SCons.Util import CLVar, AppendPath, PrependPath, is_Sequence, is_String
 from subprocess import PIPE
-import re, os, fnmatch
+from contextlib import contextmanager
+from functools import wraps
+import re, os, fnmatch, errno, tempfile, shutil, copy, inspect
 
 from SConsGnu.AcProgVars import gvar_names, declare_gvars
 from SConsGnu.AcProgVars import GVarNames, DeclareGVars
+from SConsGnu.Common import get_scratch_dir
+from SConsGnu.Probes import run_probe
 
 try:
     import cPickle as pickle
@@ -72,6 +76,63 @@ class _WriteTarget(object):
         src = env.subst(source, target = target, source = source)
         return "%s(%r, %r)" % (objstr, tgt, src)
 
+###############################################################################
+def _scratch_bases(env, fallback):
+    base = get_scratch_dir(env)
+    if base:
+        bases = [ base ]
+    else:
+        bases = [ os.environ.get('XDG_RUNTIME_DIR'), '/dev/shm' ]
+    bases.append(fallback)
+    return [ b for b in bases if b and os.path.isdir(b) ]
+
+###############################################################################
+@contextmanager
+def scratch_dir(env, fallback = None, prefix = 'sconf'):
+    """Context manager providing a private temporary directory for probe
+    artifacts.
+
+    The directory is created in ``$GNUBLD_SCRATCH_DIR`` if set, otherwise in
+    ``$XDG_RUNTIME_DIR`` or ``/dev/shm`` (usually memory-backed), and in
+    **fallback** if none of these is usable. The directory and its whole
+    content are removed on exit. Both are done with direct system calls,
+    not with SCons actions.
+
+    **Example**::
+
+        with scratch_dir(env, '.sconf_temp') as tmpdir:
+            with open(os.path.join(tmpdir, 'conftest.sed'), 'w') as f:
+                f.write(script)
+
+    :Parameters:
+        env
+            SCons environment,
+        fallback
+            directory to be used when no better location is available, if
+            ``None``, the system default temporary directory is used,
+        prefix
+            prefix for the name of the created directory.
+    """
+    path = None
+    for base in _scratch_bases(env, fallback):
+        try:
+            path = tempfile.mkdtemp(prefix = prefix, dir = base)
+        except EnvironmentError:
+            continue
+        break
+    if path is None:
+        path = tempfile.mkdtemp(prefix = prefix)
+    try:
+        yield path
+    finally:
+        shutil.rmtree(path, ignore_errors = True)
+
+###############################################################################
+def _target_dir(target, source, env):
+    """Return absolute path of the directory containing $TARGET."""
+    tgt = env.subst('$TARGET', target = target, source = source)
+    return os.path.dirname(os.path.abspath(tgt))
+
 ###############################################################################
 class _PathProgsFeatureCheck(object):
     """Corresponds to `_AC_PATH_PROGS_FEATURE_CHECK`_
@@ -268,13 +329,11 @@ class _ProgGrep(object):
                 if self.grep_args is not None:
                     cmd.extend(CLVar(self.grep_args))
                 try:
-                    proc = _subproc(env, cmd, 'raise', stdin = PIPE, stdout = PIPE)
+                    # we ignore stderr; same way as it was in _AC_FEATURE_CHECK_LENGTH
+                    stat, out = run_probe(env, cmd, self.grep_input)
                 except EnvironmentError:
                     pass
                 else:
-                    # we ignore stderr; same way as it was in _AC_FEATURE_CHECK_LENGTH
-                    out, err = proc.communicate(self.grep_input)
-                    stat = proc.wait()
                     if stat == 0:
                         tgt = env.subst('$TARGET', target = target)
                         with open(tgt, 'wt') as f:
@@ -302,6 +361,100 @@ class _ProgGrep(object):
         src = env.subst(source, target = target, source = source)
         return "%s(%r, %r)" % (objstr, tgt, src)
 
+###############################################################################
+class InstallCapabilities(object):
+    """Features supported by an ``install`` program.
+
+    An instance of this class is returned by `AcProgInstall` (together with
+    the ``INSTALL`` command) when invoked with ``capabilities=True``. Builders
+    may use it to install many files with a single ``install`` invocation
+    instead of spawning one process per file.
+
+    **Example**::
+
+        install, caps = cfg.AcProgInstall(capabilities = True)
+        cmd = caps.batch_command(install, ['a.h', 'b.h'], '/usr/include/foo')
+        if cmd:
+            env.Execute(str(cmd))
+
+    :IVariables:
+        multiple_files
+            ``install SRC1 SRC2 ... DIR`` works,
+        leading_dirs
+            ``install -D SRC DIR/SUB/DST`` creates missing leading directories,
+        target_directory
+            ``install -t DIR SRC1 SRC2 ...`` works,
+        preserve_timestamps
+            ``install -p`` (``--preserve-timestamps``) keeps modification
+            times of the installed files,
+        compare
+            ``install -C`` (compare before copy) works.
+    """
+    _attributes = [ 'multiple_files', 'leading_dirs', 'target_directory',
+                    'preserve_timestamps', 'compare' ]
+
+    def __init__(self, multiple_files=False, leading_dirs=False,
+                 target_directory=False, preserve_timestamps=False,
+                 compare=False):
+        """Initialize `InstallCapabilities` object."""
+        self.multiple_files = multiple_files
+        self.leading_dirs = leading_dirs
+        self.target_directory = target_directory
+        self.preserve_timestamps = preserve_timestamps
+        self.compare = compare
+
+    def batch_command(self, install, sources, dest_dir):
+        """Return command installing all **sources** into **dest_dir** at once.
+
+        :Parameters:
+            install
+                the ``INSTALL`` command, as returned by `AcProgInstall`,
+            sources
+                list of files to be installed,
+            dest_dir
+                destination directory (must exist, unless the command is
+                used with ``-D``),
+        :Returns:
+            a ``CLVar`` with the command, or ``None`` if the program can't
+            install multiple files with one invocation.
+        """
+        if self.target_directory:
+            return CLVar(install) + CLVar(['-t', dest_dir]) + CLVar(sources)
+        elif self.multiple_files:
+            return CLVar(install) + CLVar(sources) + CLVar([dest_dir])
+        else:
+            return None
+
+    def __eq__(self, other):
+        if not isinstance(other, InstallCapabilities):
+            return NotImplemented
+        return self.__dict__ == other.__dict__
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+
+    def __repr__(self):
+        args = ["%s=%r" % (a, getattr(self, a)) for a in self._attributes]
+        return "%s(%s)" % (self.__class__.__name__, ', '.join(args))
+
+###############################################################################
+def _run_quietly(env, cmd):
+    """Run **cmd** discarding its output.
+
+    :Returns:
+        exit status of the command or ``None`` if it couldn't be started.
+    """
+    try:
+        proc = _subproc(env, cmd, 'raise', stdin = PIPE, stdout = PIPE,
+                        stderr = PIPE)
+    except EnvironmentError:
+        return None
+    proc.communicate()
+    return proc.wait()
+
 ###############################################################################
 class _ProgInstall(object):
     """Finds a good install program.
@@ -320,7 +473,7 @@ class _ProgInstall(object):
     - OS/2's system ``install``, which has a completely different semantic
     - ``./install``, which can be erroneously created by make from ``./install.sh``.
     """
-    def __init__(self, programs=None, reject_paths=None):
+    def __init__(self, programs=None, reject_paths=None, capabilities=False):
         """Initialize ``_ProgInstall`` object.
 
         :Parameters:
@@ -331,36 +484,80 @@ class _ProgInstall(object):
             reject_paths
                 a list of globs to be excluded from search path when looking
                 for ``install`` program,
+            capabilities
+                if ``True``, the program found is additionally probed for
+                optional features and the action stores a tuple ``(install,
+                caps)``, where ``caps`` is an `InstallCapabilities` object.
 
         """
         self.programs = programs
         self.reject_paths = reject_paths
+        self.capabilities = capabilities
+
+    def _check_install_caps(self, target, source, env, install):
+        """Probe the **install** command (a program already known to install
+        multiple files) for optional features.
+
+        :Returns:
+            an `InstallCapabilities` object.
+        """
+        caps = InstallCapabilities(multiple_files = True)
+        fallback = _target_dir(target, source, env)
+        with scratch_dir(env, fallback) as caps_dir:
+            src1 = os.path.join(caps_dir, 'caps.one')
+            src2 = os.path.join(caps_dir, 'caps.two')
+            for src in (src1, src2):
+                with open(src, 'w') as f:
+                    f.write(src + "\n")
+            # an old timestamp, so we can see if install preserves it
+            os.utime(src1, (1000000000, 1000000000))
+
+            # install -D SRC DIR/SUB/DST
+            dst = os.path.join(caps_dir, 'D', 'sub', 'one')
+            if not _run_quietly(env, install + CLVar(['-D', src1, dst])):
+                caps.leading_dirs = os.path.isfile(dst)
+
+            # install -t DIR SRC1 SRC2
+            tdir = os.path.join(caps_dir, 't')
+            os.mkdir(tdir)
+            if not _run_quietly(env, install + CLVar(['-t', tdir, src1, src2])):
+                installed = [ os.path.join(tdir, os.path.basename(s)) \
+                              for s in (src1, src2) ]
+                caps.target_directory = all(map(os.path.isfile, installed))
+
+            # install -p SRC DST
+            dst = os.path.join(caps_dir, 'p')
+            if not _run_quietly(env, install + CLVar(['-p', src1, dst])):
+                try:
+                    caps.preserve_timestamps = \
+                        int(os.stat(dst).st_mtime) == 1000000000
+                except OSError:
+                    pass
+
+            # install -C SRC DST (twice, the second one compares)
+            dst = os.path.join(caps_dir, 'C')
+            cmd = install + CLVar(['-C', src1, dst])
+            if not _run_quietly(env, cmd) and not _run_quietly(env, cmd):
+                caps.compare = os.path.isfile(dst)
+        return caps
 
     def _check_install_prog(self, target, source, env, prog_path):
-        install_dir = env.subst("${TARGET}.dir", target = target, source = source)
         base_names = ["${TARGET.file}.one", "${TARGET.file}.two"]
         base_names = env.subst(base_names, target = target, source = source)
-        to_install = [ os.path.join("${TARGET.dir}", x) for x in base_names ]
-        to_install = env.subst(to_install, target = target, source = source)
-        installed = [ os.path.join(install_dir, x) for x in base_names ]
-        installed = env.subst(installed, target = target, source = source)
-
-        temps = to_install + installed + [install_dir]
-        delete_temps = Delete(temps)
-
-        # Delete files that could be left by previous (interrupted) action
-        env.Execute(delete_temps)
+        fallback = _target_dir(target, source, env)
+        with scratch_dir(env, fallback) as tmpdir:
+            install_dir = os.path.join(tmpdir, 'dir')
+            to_install = [ os.path.join(tmpdir, x) for x in base_names ]
+            installed = [ os.path.join(install_dir, x) for x in base_names ]
 
-        for ti in to_install:
-            with open(ti, 'w') as f:
-                f.write(ti + "\n")
+            for ti in to_install:
+                with open(ti, 'w') as f:
+                    f.write(ti + "\n")
 
-        env.Execute(Mkdir(install_dir))
+            os.mkdir(install_dir)
 
-        install_dir_abs = env.Dir(install_dir).abspath
-        cmd = CLVar(prog_path) + CLVar('-c') + CLVar(to_install) + CLVar(install_dir_abs)
+            cmd = CLVar(prog_path) + CLVar('-c') + CLVar(to_install) + CLVar(install_dir)
 
-        try:
             if env.Execute(str(cmd)):
                 return None
             # Verify the size of the installed files
@@ -370,9 +567,6 @@ class _ProgInstall(object):
                         return None
                 except OSError:
                     return None
-        finally:
-            # Delete temporary files
-            env.Execute(delete_temps)
         return cmd[:2]
 
     def __call__(self, target, source, env):
@@ -409,17 +603,61 @@ class _ProgInstall(object):
                         else:
                             result = self._check_install_prog(target, source, env, prog_path)
                             if result:
+                                if self.capabilities:
+                                    caps = self._check_install_caps(target, source, env, result)
+                                    result = (result, caps)
                                 with open(env.subst('$TARGET', target = target), 'w') as f:
                                     f.write(pickle.dumps(result))
                                 return 0 # Success
         return 1 # Failed
 
     def strfunction(self, target, source, env):
-        objstr = "%s(%r, %r)" % (self.__class__.__name__, self.programs, self.reject_paths)
+        objstr = "%s(%r, %r, %r)" % (self.__class__.__name__, self.programs,
+                                     self.reject_paths, self.capabilities)
         tgt = env.subst(target, target = target, source = source)
         src = env.subst(source, target = target, source = source)
         return "%s(%r, %r)" % (objstr, tgt, src)
 
+###############################################################################
+def _mkdir_p_func(dest):
+    """Create directories listed in **dest** together with missing parents.
+
+    Unlike ``os.makedirs()`` this tolerates concurrent creation of the same
+    directories (e.g. by another job of ``scons -j``), so it's race-free in
+    the sense required by `AcProgMkdirP`.
+
+    :Parameters:
+        dest
+            directory (or list of directories) to be created
+    """
+    from SCons.Util import flatten
+    if not is_Sequence(dest):
+        dest = [dest]
+    for entry in flatten(dest):
+        path = str(entry)
+        try:
+            os.makedirs(path)
+        except OSError, e:
+            if e.errno != errno.EEXIST or not os.path.isdir(path):
+                raise
+
+###############################################################################
+def _mkdir_p_strfunc(dest):
+    from SCons.Defaults import get_paths_str
+    return 'MkdirP(%s)' % get_paths_str(dest)
+
+###############################################################################
+MkdirP = ActionFactory(_mkdir_p_func, _mkdir_p_strfunc)
+"""In-process, race-free implementation of ``mkdir -p``.
+
+This is an action factory, just like SCons ``Mkdir``, for example::
+
+    env.Command('dir/file', 'file', [ MkdirP('$TARGET.dir'), Copy('$TARGET', '$SOURCE') ])
+
+It is returned by `AcProgMkdirP` unless a program was selected or an
+external program was explicitly requested.
+"""
+
 ###############################################################################
 class _ProgMkdirP(object):
     """Check whether ``mkdir -p`` is known to be thread-safe, and fall back to
@@ -446,17 +684,14 @@ class _ProgMkdirP(object):
 
     def _check_mkdir_prog(self, target, source, env, prog_path):
         from SCons.Script import Delete
-        from SCons.Action import _subproc
         from SCons.Util import CLVar
-        from subprocess import PIPE
         import re, os
         cmd = CLVar(prog_path) + CLVar('--version')
         try:
-            proc = _subproc(env, cmd, 'raise', stdin = PIPE, stdout = PIPE)
+            stat, out = run_probe(env, cmd)
         except EnvironmentError:
             return None
         else:
-            out, err = proc.communicate()
             xpr = r'mkdir (\(GNU coreutils\)|\(coreutils\)|\(fileutils\) 4\.1)'
             if re.findall(xpr, out):
                 return CLVar([prog_path, '-p'])
@@ -483,8 +718,7 @@ class _ProgMkdirP(object):
                             f.write(pickle.dumps(result))
                         return 0 # Success
 
-        # FIXME: actually we should return '$ac_install_sh -d' here.
-        return 1 # Failed
+        return 1 # Failed, AcProgMkdirP falls back to MkdirP
 
     def strfunction(self, target, source, env):
         objstr = "%s(%r)" % (self.__class__.__name__, self.programs)
@@ -514,19 +748,19 @@ class _ProgSed(object):
         # but more than about 7000 bytes, to cacth a limit in Solaris 8
         # /usr/ucb/sed.
         script = 128 * 's/aaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaa/bbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbb/\n'
-        script_file = env.subst("${TARGET}.sed", target = target, source = source)
         programs = self.programs
         if programs is None:
             programs = ['sed', 'gsed']
-        progargs = ['-f', script_file]
 
-        with open(script_file,'w') as f:
-            f.write(script)
-        try:
-            action = _PathProgsFeatureCheck(_feature_check_length, programs, progargs)
+        fallback = _target_dir(target, source, env)
+        with scratch_dir(env, fallback) as tmpdir:
+            script_file = os.path.join(tmpdir, 'conftest.sed')
+            with open(script_file,'w') as f:
+                f.write(script)
+            progargs = ['-f', script_file]
+            action = _PathProgsFeatureCheck(_feature_check_length, programs,
+                                            progargs, files = [script_file])
             result = action(target, source, env)
-        finally:
-            env.Execute(Delete(script_file))
 
         return result
 
@@ -603,7 +837,6 @@ class _LexFeatureCheck(object):
 
     def _check_lex_feature(self, target, source, env, **kw):
         global _lex_script
-        lexdir = env.subst('${TARGET}.dir', target = target, source = source)
         lexfile = env.subst("${TARGET.file}.l", target = target, source = source)
         lexcmd = str(CLVar(self.lex) + CLVar(lexfile))
 
@@ -611,11 +844,11 @@ class _LexFeatureCheck(object):
         if script is None:
             script = _lex_script
 
-        env.Execute(Mkdir(lexdir))
-        with open(os.path.join(lexdir, lexfile) ,'w') as f:
-            f.write(script)
+        fallback = _target_dir(target, source, env)
+        with scratch_dir(env, fallback) as lexdir:
+            with open(os.path.join(lexdir, lexfile) ,'w') as f:
+                f.write(script)
 
-        try:
             err = env.Execute(lexcmd, chdir = lexdir)
             if not err:
                 kw2 = kw.copy()
@@ -624,9 +857,6 @@ class _LexFeatureCheck(object):
                              'lexcmd' : lexcmd,
                              'script' : script })
                 err = self._lex_feature(target, source, env, **kw2)
-        finally:
-            env.Execute(Delete(env.Glob(os.path.join(lexdir,'*'))))
-            env.Execute(Delete(lexdir))
 
         return err
 
@@ -700,40 +930,22 @@ class _ProgLnS(object):
         import traceback
         import sys
 
-        tmpdir = env.subst('${TARGET}.dir', target = target, source = source)
-        tmpconf = os.path.join(tmpdir, 'conf')
-        confdir = "%s.dir" % tmpconf
-        confile = "%s.file" % tmpconf
-
         ln_s = CLVar(['cp','-pR'])
-        if not env.Execute(Mkdir(tmpdir)):
-            try:
-                with open(confile, 'w') as f:
-                    f.write('')
-                try:
-                    if not env.Execute('ln -s %s %s' %(confile, tmpconf)):
-                        try:
-                            if not env.Execute(Mkdir(confdir)):
-                                try:
-                                    if not env.Execute('ln -s %s %s' %(confile, confdir)):
-                                        try:
-                                            if not os.path.isfile('%s.exe' % tmpconf):
-                                                ln_s = CLVar(['ln','-s'])
-                                        finally:
-                                            glob = os.path.join(confdir,'*')
-                                            env.Execute(Delete(env.Glob(glob)))
-                                finally:
-                                    env.Execute(Delete(confdir))
-                        finally:
-                            env.Execute(Delete(tmpconf))
-                    else:
-                        if env.Execute('ln %s %s' % (confile, tmpconf)) == 0:
-                            ln_s = CLVar('ln')
-                            env.Execute(Delete(tmpconf))
-                finally:
-                    env.Execute(Delete(confile))
-            finally:
-                env.Execute(Delete(tmpdir))
+        fallback = _target_dir(target, source, env)
+        with scratch_dir(env, fallback) as tmpdir:
+            tmpconf = os.path.join(tmpdir, 'conf')
+            confdir = "%s.dir" % tmpconf
+            confile = "%s.file" % tmpconf
+
+            with open(confile, 'w') as f:
+                f.write('')
+            if not env.Execute('ln -s %s %s' %(confile, tmpconf)):
+                os.mkdir(confdir)
+                if not env.Execute('ln -s %s %s' %(confile, confdir)):
+                    if not os.path.isfile('%s.exe' % tmpconf):
+                        ln_s = CLVar(['ln','-s'])
+            elif env.Execute('ln %s %s' % (confile, tmpconf)) == 0:
+                ln_s = CLVar('ln')
 
         with open(env.subst('$TARGET', target = target), 'w') as f:
             f.write(pickle.dumps(ln_s))
@@ -782,6 +994,58 @@ class _ActionWrapper(object):
         else:
             return str(self.check) + "(%r,%r,%r)" % (target, source, env)
 
+###############################################################################
+_prog_check_memo = {}
+
+###############################################################################
+class _RecordingContext(object):
+    """Proxy to SConf context which records messages passed to `Display()`
+    and `Result()`, so they can be replayed later by `_memoize_prog_check`.
+    """
+    def __init__(self, context):
+        self.context = context
+        self.messages = []
+
+    def Display(self, msg):
+        self.messages.append(('Display', msg))
+        return self.context.Display(msg)
+
+    def Result(self, res):
+        self.messages.append(('Result', res))
+        return self.context.Result(res)
+
+    def __getattr__(self, name):
+        return getattr(self.context, name)
+
+###############################################################################
+def _memoize_prog_check(check):
+    """Decorate **check** such that its results are memoized within current
+    process.
+
+    The memo is keyed by the name of the check, its arguments and the
+    ``$ENV['PATH']`` of the configuration environment. On a hit, the
+    messages originally displayed by the check are replayed and a copy of
+    the original result is returned without running any action. See also
+    `InvalidateProgChecks`.
+    """
+    @wraps(check)
+    def wrapper(context, *args, **kw):
+        callargs = inspect.getcallargs(check, context, *args, **kw)
+        del callargs['context']
+        path = context.env.get('ENV', {}).get('PATH')
+        key = (check.__name__, repr(sorted(callargs.items())), path)
+        try:
+            messages, result = _prog_check_memo[key]
+        except KeyError:
+            recorder = _RecordingContext(context)
+            result = check(recorder, *args, **kw)
+            _prog_check_memo[key] = (recorder.messages, copy.deepcopy(result))
+            return result
+        for method, msg in messages:
+            getattr(context, method)(msg)
+        return copy.deepcopy(result)
+    return wrapper
+
 ###############################################################################
 def _path_prog_flavor_gnu(env, program):
     """Corresponds to `_AC_PATH_PROG_FLAVOR_GNU`_.
@@ -799,25 +1063,25 @@ def _path_prog_flavor_gnu(env, program):
     """
     cmd = CLVar(program) + CLVar('--version')
     try:
-        proc = _subproc(env, cmd, 'raise', stdin = PIPE, stdout = PIPE)
+        stat, out = run_probe(env, cmd)
     except EnvironmentError:
         return False
     else:
-        out, err = proc.communicate()
         if re.findall(r'GNU', out):
             return True
     return False
 
 
 ###############################################################################
-def _feature_check_length(env, cmd, match_string = None):
+def _feature_check_length(env, cmd, match_string = None, files = None):
     """Corresponds to `_AC_FEATURE_CHECK_LENGTH`_.
 
     For use as the **feature_test** argument to `_PathProgsFeatureCheck`. On
     each iteration run **cmd** providing an auto-generated input text to its
     **stdin** and looking at its **stdout**. The input string is always one
     line, starting with only 10 characters, and doubling in length at each
-    iteration until approx 10000 characters.
+    iteration until approx 10000 characters. The **files** are scratch files
+    used by **cmd**, see `SConsGnu.Probes.run_probe()`.
 
     .. _`_AC_FEATURE_CHECK_LENGTH`: http://git.savannah.gnu.org/cgit/autoconf.git/tree/lib/autoconf/programs.m4
     """
@@ -834,13 +1098,12 @@ def _feature_check_length(env, cmd, match_string = None):
         if match_string: content = content + match_string
         content = content + '\n'
         try:
-            proc = _subproc(env, cmd, 'raise', stdin = PIPE, stdout = PIPE)
+            # we ignore stderr; same way as it was in _AC_FEATURE_CHECK_LENGTH
+            stat, out = run_probe(env, cmd, content, files)
         except EnvironmentError:
             break
         else:
-            # we ignore stderr; same way as it was in _AC_FEATURE_CHECK_LENGTH
-            out, err = proc.communicate(content)
-            if proc.wait() != 0:
+            if stat != 0:
                 break
             if not (out == content):
                 break
@@ -1180,6 +1443,7 @@ def AcProgFgrep(context, grep, selection=None):
         return None
 
 ###############################################################################
+@_memoize_prog_check
 def AcProgGrep(context, selection=None, programs = None):
     """Corresponds to AC_PROG_GREP_ autoconf macro
 
@@ -1217,7 +1481,9 @@ def AcProgGrep(context, selection=None, programs = None):
 
 
 ###############################################################################
-def AcProgInstall(context, selection=None, programs=None, reject_paths=None):
+@_memoize_prog_check
+def AcProgInstall(context, selection=None, programs=None, reject_paths=None,
+                  capabilities=False):
     """Corresponds to AC_PROG_INSTALL_ autoconf macro
 
     Find a good install program. We prefer a C program (faster), so one script
@@ -1248,30 +1514,48 @@ def AcProgInstall(context, selection=None, programs=None, reject_paths=None):
             List of paths to be rejected from search path. If ``None``, a
             default list will be used which excludes all the broken versions
             described above.
+        capabilities
+            If ``True``, the install program found is also probed for optional
+            features (see `InstallCapabilities`) and the function returns a
+            tuple ``(install, caps)``. The ``caps`` is ``None`` if the program
+            was not probed (e.g. when it's given by **selection**).
 
     .. _AC_PROG_INSTALL: http://www.gnu.org/software/autoconf/manual/autoconf.html#index-AC_005fPROG_005fINSTALL-270
     """
     context.Display("Checking for a BSD-compatible install... ")
     context.sconf.cached = 1
-    action = _ActionWrapper(_ProgInstall(programs,reject_paths))
+    action = _ActionWrapper(_ProgInstall(programs,reject_paths,capabilities))
     args = pickle.dumps({ 'selection' : selection,
                           'programs' : programs,
-                          'reject_paths' : reject_paths })
+                          'reject_paths' : reject_paths,
+                          'capabilities' : capabilities })
     stat, out = context.TryAction(action, args, '.arg')
     if stat and out:
         out = pickle.loads(out)
+        if isinstance(out, tuple):
+            out, caps = out
+        else:
+            caps = None
         context.Result(str(out))
-        return out
     else:
         context.Result('not found')
-        return None
+        out, caps = None, None
+    if capabilities:
+        return out, caps
+    return out
 
 ###############################################################################
-def AcProgMkdirP(context, selection=None, programs=None):
+def AcProgMkdirP(context, selection=None, programs=None, external=False):
     """Corresponds to AC_PROG_MKDIR_P_ autoconf macro
 
-    Check whether ``mkdir -p`` is known to be thread-safe, and fall back to
-    ``install-sh -d`` otherwise.
+    If **selection** is given, it's returned (as ``CLVar``) without running
+    any check. Otherwise, by default returns `MkdirP`, an in-process,
+    race-free implementation of ``mkdir -p``, which needs no external process
+    per created directory.
+
+    If **external** is ``True``, check whether
+    ``mkdir -p`` is known to be thread-safe, and fall back to `MkdirP`
+    otherwise.
 
     We cannot accept any implementation of ``mkdir`` that recognizes ``-p``.
     Some implementations (such as Solaris 8's) are vulnerable to race
@@ -1297,10 +1581,29 @@ def AcProgMkdirP(context, selection=None, programs=None):
         programs
             List of program names to look for. If ``None`` (default), the
             default list ``[ 'mkdir', 'gmkdir' ]`` will be used.
+        external
+            If ``True``, look for an external ``mkdir -p`` program. If
+            ``False`` (default), the `MkdirP` action factory is returned
+            without running any check (unless **selection** is given).
+
+    :Returns:
+        ``CLVar(selection)`` if **selection** is given, a ``CLVar`` command
+        (such as ``['/bin/mkdir', '-p']``) if **external** is ``True`` and
+        a known race-free program was found, or `MkdirP` otherwise. Note
+        that `MkdirP` is an ``ActionFactory``, not a command; it may be used
+        in the actions list (``MkdirP('$TARGET.dir')``), but it can't be
+        interpolated into command strings like the ``CLVar`` commands.
 
     .. _AC_PROG_MKDIR_P: http://www.gnu.org/software/autoconf/manual/autoconf.html#index-AC_005fPROG_005fMKDIR_005fP-277
     """
     context.Display("Checking for a thread-safe mkdir -p... ")
+    if selection:
+        selection = CLVar(selection)
+        context.Result(str(selection))
+        return selection
+    if not external:
+        context.Result('MkdirP (built-in)')
+        return MkdirP
     context.sconf.cached = 1
     action = _ActionWrapper(_ProgMkdirP(programs))
     args = pickle.dumps({ 'selection' : selection, 'programs' : programs })
@@ -1310,8 +1613,8 @@ def AcProgMkdirP(context, selection=None, programs=None):
         context.Result(str(out))
         return out
     else:
-        context.Result('not found')
-        return None
+        context.Result('MkdirP (built-in)')
+        return MkdirP
 
 ###############################################################################
 def AcLexExe(context, selection=None, programs=None):
@@ -1557,6 +1860,7 @@ def AcProgRanlib(context, selection=None):
     raise NotImplementedError("not implemented")
 
 ###############################################################################
+@_memoize_prog_check
 def AcProgSed(context, selection=None, programs=None):
     """Corresponds to AC_PROG_SED_ autoconf macro
 
@@ -1613,6 +1917,28 @@ def AcProgYacc(context, selection=None, programs=None, value_if_not_found='yacc'
         prog = CLVar(prog)
     return prog
 
+###############################################################################
+def InvalidateProgChecks(checks=None):
+    """Forget the results of program checks memoized within current process.
+
+    Results of `AcProgGrep`, `AcProgInstall` and `AcProgSed` are remembered
+    and reused when the check is run again with same arguments and same
+    ``$ENV['PATH']``. Call this function when the results may be stale for
+    other reasons, e.g. programs were installed or removed meanwhile.
+
+    :Parameters:
+        checks
+            list of check names (e.g. ``['AcProgSed']``) whose results should
+            be forgotten; if ``None`` (default), all results are forgotten.
+    """
+    global _prog_check_memo
+    if checks is None:
+        _prog_check_memo.clear()
+    else:
+        for key in _prog_check_memo.keys():
+            if key[0] in checks:
+                del _prog_check_memo[key]
+
 ###############################################################################
 def Tests():
     """Returns all the checks implemented in AcProgChecks as a dictionary."""
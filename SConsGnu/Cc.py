@@ -26,9 +26,8 @@ Several utility methods related to C compilers.
 
 __docformat__ = "restructuredText"
 
-from SCons.Action import _subproc
-from subprocess import PIPE
 from SCons.Util import CLVar
+from SConsGnu.Probes import run_probe
 import os
 import re
 
@@ -106,21 +105,17 @@ def _parse_cc_target(env, cc, text):
 
 def _run_cc_cmd(env, cmd):
     try:
-        proc = _subproc(env, cmd, 'raise', stdout = PIPE)
+        stat, out = run_probe(env, cmd)
     except EnvironmentError as e:
         stat = 1
         out = ''
         err = e.message
     else:
-        out, err = proc.communicate()
-        stat = proc.wait()
+        err = None
         if stat or not out:
             if not stat:
                 stat = 1
-            if err:
-                err = err.strip()
-            if not err:
-                err = 'command %r returned status: %d' % (cmd, stat)
+            err = 'command %r returned status: %d' % (cmd, stat)
     return stat, out, err
 
 def _query_cc_info(env, ccpath, cmd_fun, parse_fun):
@@ -66,6 +66,7 @@ Flags for programs:
 __docformat__ = "restructuredText"
 
 from SConsGnu import Defaults
+from SConsGnu.GVars import PureConverter
 from SCons.Util import is_Sequence, CLVar
 
 #############################################################################
@@ -109,6 +110,7 @@ def __init_module_vars():
 __init_module_vars()
 
 #############################################################################
+@PureConverter
 def _flag_converter(val, env=None):
     if isinstance(val, CLVar):
         return val
@@ -241,6 +243,7 @@ def declare_gvars(defaults = {}, name_filter=lambda x : True,
                  'var_key'  : var_key_transform(name),
                  'default'  : default,
                  'converter': _flag_converter,
+                 'memoize_converter' : True,
                  'help'     : desc }
         return name, decl
 
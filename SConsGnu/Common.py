@@ -142,6 +142,94 @@ def get_config_cache(env, override=__null, *args):
     default = '.scons.config.cache'
     return __get_var(env, key, default, override, *args)
 
+#############################################################################
+def get_config_fingerprint(env, override=__null, *args):
+    """Get the file name where the fingerprint of configuration is stored
+    (see `SConsGnu.GConfig`). By default (``None``) it is the name of the
+    config cache file (see `get_config_cache()`) with ``.fingerprint``
+    suffix."""
+    key = 'GNUBLD_CONFIG_FINGERPRINT'
+    default = None
+    filename = __get_var(env, key, default, override, *args)
+    if filename is None:
+        filename = get_config_cache(env, __null, *args) + '.fingerprint'
+    return filename
+
+#############################################################################
+def get_scratch_dir(env, override=__null, *args):
+    """Get the directory where configure checks create their temporary
+    files. If ``None`` (default), a memory-backed location is chosen
+    automatically (``$XDG_RUNTIME_DIR`` or ``/dev/shm``)."""
+    key = 'GNUBLD_SCRATCH_DIR'
+    default = None
+    return __get_var(env, key, default, override, *args)
+
+#############################################################################
+def get_probe_mode(env, override=__null, *args):
+    """Get the mode of running probe commands: ``'record'``, ``'replay'`` or
+    ``None`` (default, just run them)."""
+    key = 'GNUBLD_PROBE_MODE'
+    default = None
+    return __get_var(env, key, default, override, *args)
+
+#############################################################################
+def get_probe_journal(env, override=__null, *args):
+    key = 'GNUBLD_PROBE_JOURNAL'
+    default = '.scons.probe.journal'
+    return __get_var(env, key, default, override, *args)
+
+#############################################################################
+def write_file_if_changed(filename, data):
+    """Write `data` to file `filename`, unless it already has this content.
+
+    The file is rewritten only if its content would change (so it keeps its
+    mtime on no-op runs), and the new content is first written to a temporary
+    file which then gets renamed over the old one.
+
+    :Returns:
+        ``True`` if the file was written, ``False`` otherwise.
+    :Raises:
+        IOError, OSError
+            on failures.
+    """
+    import os
+    import tempfile
+
+    try:
+        f = open(filename, 'rb')
+    except IOError:
+        pass
+    else:
+        try:
+            if f.read() == data:
+                return False
+        finally:
+            f.close()
+
+    dir, base = os.path.split(os.path.abspath(filename))
+    fd, tmp = tempfile.mkstemp(prefix = base + '.', dir = dir)
+    try:
+        # mkstemp() creates files readable only by owner
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(tmp, 0666 & ~umask)
+        f = os.fdopen(fd, 'wb')
+        try:
+            f.write(data)
+        finally:
+            f.close()
+        try:
+            os.rename(tmp, filename)
+        except OSError:
+            # os.rename() does not replace existing files on Windows
+            os.remove(filename)
+            os.rename(tmp, filename)
+    except:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return True
+
 # Local Variables:
 # # tab-width:4
 # # indent-tabs-mode:nil
@@ -26,6 +26,62 @@ TODO: Write docs for XXX
 
 __docformat__ = "restructuredText"
 
+#############################################################################
+_toolchain_vars = ('CC', 'CXX', 'SHCC', 'SHCXX', 'LINK', 'SHLINK', 'AS', 'AR',
+                   'RANLIB', 'LEX', 'YACC')
+"""Construction variables naming the tools which determine the toolchain
+fingerprint, see `_toolchain_fingerprint()`."""
+
+#############################################################################
+def _toolchain_fingerprint(env):
+    """Return a hash identifying the toolchain used by `env`.
+
+    The hash covers ``$ENV['PATH']``, the commands found in `_toolchain_vars`
+    and the size and modification time of the programs they run.
+    """
+    import os
+    import hashlib
+    md5 = hashlib.md5()
+    md5.update('PATH=%r\n' % env.get('ENV', {}).get('PATH'))
+    for key in _toolchain_vars:
+        if key not in env:
+            continue
+        cmd = env.subst('${%s}' % key)
+        path = None
+        stamp = None
+        if cmd.split():
+            path = env.WhereIs(cmd.split()[0])
+        if path is not None:
+            try:
+                st = os.stat(path)
+            except OSError:
+                pass
+            else:
+                stamp = (st.st_size, int(st.st_mtime))
+        md5.update('%s=%r %r %r\n' % (key, cmd, path, stamp))
+    return md5.hexdigest()
+
+#############################################################################
+def _checks_fingerprint(custom_tests):
+    """Return a hash identifying the list of configure checks.
+
+    :Parameters:
+        custom_tests : dict
+            custom tests as passed to SCons ``Configure()``; the hash covers
+            their names and the source code of the modules they are defined
+            in (if it can be found).
+    """
+    import hashlib
+    from SConsGnu.GVars import SourceHash
+    md5 = hashlib.md5()
+    for name in sorted(custom_tests):
+        try:
+            source = SourceHash(custom_tests[name])
+        except (TypeError, IOError):
+            source = None
+        md5.update('%s=%r\n' % (name, source))
+    return md5.hexdigest()
+
 
 class _GConfig(object):
     """
@@ -132,8 +188,106 @@ class _GConfig(object):
         # Append other declarations if necessary
         return self.gvar_decls
 
-    def Configure(self, **kw):
-        pass
+    def Fingerprint(self, gvars, custom_tests=None):
+        """Return fingerprint of configuration.
+
+        The fingerprint combines values of ``GVar`` variables (see
+        `SConsGnu.GVars._GVars.Fingerprint()`), the toolchain and the list of
+        configure checks.
+
+        :Parameters:
+            gvars : `_GVars`
+                ``GVar`` variables used as configuration variables,
+            custom_tests : dict
+                configure checks, as passed to SCons ``Configure()``; no
+                checks if ``None``.
+        """
+        import hashlib
+        md5 = hashlib.md5()
+        md5.update(gvars.Fingerprint(self.env))
+        md5.update(_toolchain_fingerprint(self.env))
+        md5.update(_checks_fingerprint(custom_tests or {}))
+        return md5.hexdigest()
+
+    def IsConfigured(self, gvars, custom_tests=None):
+        """Return ``True`` if the fingerprint stored by last `Configure()`
+        matches current configuration and the reconfiguration is not forced
+        with ``--config=force``.
+
+        :Parameters:
+            gvars : `_GVars`
+                ``GVar`` variables used as configuration variables,
+            custom_tests : dict
+                configure checks, as passed to SCons ``Configure()``; no
+                checks if ``None``.
+        """
+        from SCons.Script import GetOption
+        from SConsGnu.Common import get_config_fingerprint
+        if GetOption('config') == 'force':
+            return False
+        try:
+            f = open(get_config_fingerprint(self.env))
+            try:
+                stored = f.read().strip()
+            finally:
+                f.close()
+        except IOError:
+            return False
+        return stored == self.Fingerprint(gvars, custom_tests)
+
+    def Configure(self, gvars, custom_tests=None, callback=None, **kw):
+        """Run configure checks, unless the configuration is unchanged.
+
+        If `IsConfigured()` returns ``True`` nothing is done. Otherwise
+        SCons configure context is created with
+        ``env.Configure(custom_tests = custom_tests, **kw)`` and passed to
+        `callback`. After that the fingerprint of the resultant
+        configuration is stored in file (see
+        ``SConsGnu.Common.get_config_fingerprint()``).
+
+        The results of checks are not restored when the checks are skipped,
+        so they should be kept in ``GVar`` variables which are saved to file
+        (see `SConsGnu.GVars._GVars.SaveVariables()`).
+
+        **Example**::
+
+            def callback(conf):
+                conf.env['CC'] = conf.AcCheckProg('cc', ...)
+
+            gvars.UpdateEnvironment(env, variables)
+            conf.Configure(gvars, custom_tests, callback)
+            gvars.SaveVariables(variables, filename, env)
+
+        :Parameters:
+            gvars : `_GVars`
+                ``GVar`` variables used as configuration variables,
+            custom_tests : dict
+                configure checks, passed to SCons ``Configure()``; no checks
+                if ``None``,
+            callback
+                function called as ``callback(context)`` to perform the
+                checks,
+            kw
+                other arguments passed to SCons ``Configure()``.
+        :Returns:
+            ``True`` if the checks were run, ``False`` if skipped.
+        """
+        from SConsGnu.Common import get_config_fingerprint
+        from SConsGnu.Common import write_file_if_changed
+        if custom_tests is None:
+            custom_tests = {}
+        if self.IsConfigured(gvars, custom_tests):
+            return False
+        context = self.env.Configure(custom_tests = custom_tests, **kw)
+        try:
+            if callback is not None:
+                callback(context)
+        finally:
+            self.env = context.Finish()
+        fingerprint = self.Fingerprint(gvars, custom_tests)
+        write_file_if_changed(get_config_fingerprint(self.env),
+                              fingerprint + '\n')
+        return True
 
 # Local Variables:
 # # tab-width:4
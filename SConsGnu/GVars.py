@@ -248,6 +248,9 @@ For more details we refer you to the documentation of `GVarDecls()`,
 
 __docformat__ = "restructuredText"
 
+import re
+import collections
+
 #############################################################################
 ENV = 0
 """Represents selection of construction variable corresponding to particular
@@ -288,6 +291,56 @@ class _notfound(object):
     "Something that has not been found."
     pass # represents a key that is never present in dict
 
+#############################################################################
+_placeholder_re = re.compile(r'\$(?:(\$)|([_a-zA-Z][_a-zA-Z0-9]*)|\{([_a-zA-Z][_a-zA-Z0-9]*)\})')
+"""Pattern matching placeholders, the same as ``string.Template.pattern``,
+except that it doesn't match invalid placeholders."""
+
+#############################################################################
+class _Renamer(object):
+    #========================================================================
+    """Callable object which renames placeholders in string values according
+    to a fixed resubst dictionary.
+
+    The result is identical to that of
+    ``string.Template(value).safe_substitute(**resubst_dict)`` (including
+    ``$$`` being replaced by ``$``), but the placeholder pattern is compiled
+    only once and the dictionary is not copied on each call. Strings without
+    ``$`` are returned immediately.
+    """
+    #========================================================================
+    def __init__(self, resubst_dict):
+        """Initializes `_Renamer` object.
+
+        :Parameters:
+            resubst_dict
+                a dictionary of the form ``{ "xxx" : "${yyy}", ...}``, see
+                `_resubst()`; it may also be another `_Renamer`.
+        """
+        if isinstance(resubst_dict, _Renamer):
+            resubst_dict = resubst_dict.resubst_dict
+        self.resubst_dict = resubst_dict
+
+    #========================================================================
+    def __replace(self, match):
+        escaped, named, braced = match.groups()
+        if escaped is not None:
+            return '$'
+        try:
+            return '%s' % (self.resubst_dict[named or braced],)
+        except KeyError:
+            return match.group()
+
+    #========================================================================
+    def __call__(self, value):
+        if not isinstance(value, basestring):
+            from SCons.Util import is_String
+            if not is_String(value):
+                return value
+        if '$' not in value:
+            return value
+        return _placeholder_re.sub(self.__replace, value)
+
 #############################################################################
 def _resubst(value, resubst_dict = {}):
     """Rename placeholders (substrings like ``$name``) in a string value.
@@ -302,17 +355,13 @@ def _resubst(value, resubst_dict = {}):
             above dictionary, all occurrences of ``$xxx`` or ``${xxx}`` within
             `value` string will be replaced with ``${yyy}``, all occurrences of
             ``$vvv`` or ``${vvv}`` with ``${www}`` and so on; see also
-            `_build_resubst_dict()`,
+            `_build_resubst_dict()`; it may also be a `_Renamer` object,
     :Returns:
         returns the ``value`` with placeholders renamed.
     """
-    from string import Template
-    from SCons.Util import is_String
-    if is_String(value):
-        # make substitution in strings only
-        return Template(value).safe_substitute(**resubst_dict)
-    else:
-        return value
+    if not isinstance(resubst_dict, _Renamer):
+        resubst_dict = _Renamer(resubst_dict)
+    return resubst_dict(value)
 
 #############################################################################
 def _build_resubst_dict(rename_dict):
@@ -337,7 +386,7 @@ def _build_resubst_dict(rename_dict):
         ignored, so the entries of type ``"zzz":"zzz"`` do not enter the
         result.
     """
-    return dict(map(lambda (k,v): (k, '${' + v + '}'),
+    return dict(map(lambda (k,v): (k, _intern('${' + v + '}')),
                     filter(lambda (k,v) : k != v, rename_dict.iteritems())))
 
 #############################################################################
@@ -363,7 +412,7 @@ def _build_iresubst_dict(rename_dict):
         val)`` with ``key==val`` are ignored, so the entries of type
         ``"zzz":"zzz"`` do not enter the result;
     """
-    return dict(map(lambda (k,v): (v, '${' + k + '}'),
+    return dict(map(lambda (k,v): (v, _intern('${' + k + '}')),
                     filter(lambda (k,v) : k != v, rename_dict.iteritems())))
 
 #############################################################################
@@ -385,6 +434,150 @@ def _compose_dicts(dict1, dict2):
 def _invert_dict(_dict):
     return dict(map(lambda (k,v) : (v,k), _dict.iteritems()))
 
+#############################################################################
+def _placeholder_names(value):
+    """Return the list of names referenced by placeholders in `value`.
+
+    Only the plain ``$name`` and ``${name}`` placeholders are recognized. If
+    `value` is not a string, or it contains other substitutions (for example
+    ``${foo.bar}``, ``${func(x)}`` or ``$(``) its dependencies can't be
+    determined and ``None`` is returned.
+    """
+    if not isinstance(value, basestring):
+        from SCons.Util import is_String
+        if not is_String(value):
+            return None
+    names = []
+    if '$' in value:
+        if '$' in _placeholder_re.sub('', value):
+            return None
+        for escaped, named, braced in _placeholder_re.findall(value):
+            name = named or braced
+            if name and name not in names:
+                names.append(name)
+    return names
+
+#############################################################################
+def _canonical(value):
+    """Return canonical string representation of `value` used by
+    `_GVars.Fingerprint()`.
+
+    Strings, numbers, booleans, ``None`` and containers of them are
+    represented by ``repr()`` (with dictionaries sorted), other objects are
+    converted to strings (as SCons does when substituting them).
+    """
+    if isinstance(value, (basestring, int, long, float, bool)) \
+       or value is None:
+        return repr(value)
+    if isinstance(value, (list, tuple)):
+        items = ', '.join([ _canonical(v) for v in value ])
+        if isinstance(value, tuple):
+            return '(%s)' % items
+        return '[%s]' % items
+    if isinstance(value, dict):
+        items = sorted([ (_canonical(k), _canonical(v))
+                         for (k, v) in value.iteritems() ])
+        return '{%s}' % ', '.join([ '%s: %s' % kv for kv in items ])
+    from SCons.Util import to_String
+    return repr(to_String(value))
+
+#############################################################################
+def _dependency_order(roots, deps):
+    """Return `roots` and all the nodes they depend on, in topological order
+    (dependencies first).
+
+    :Parameters:
+        roots
+            the nodes to start from,
+        deps
+            a callable, ``deps(node)`` returns list of nodes ``node`` depends
+            on.
+
+    :Raises:
+        RuntimeError
+            if a cycle is found; the error message shows the cycle.
+    """
+    order = []
+    done = set()
+    path = []
+    def visit(node):
+        if node in done:
+            return
+        if node in path:
+            cycle = path[path.index(node):] + [node]
+            raise RuntimeError("circular dependency between variables: %s" \
+                               % ' -> '.join(cycle))
+        path.append(node)
+        for dep in deps(node):
+            visit(dep)
+        path.pop()
+        done.add(node)
+        order.append(node)
+    for root in roots:
+        visit(root)
+    return order
+
+#############################################################################
+def _add_options(opt_args):
+    """Create several command-line options at once.
+
+    ``SCons.Script.Main.AddOption()`` re-parses the leftover command-line
+    arguments after each added option. Here all the options are added to the
+    same option group, as used by ``AddOption()``, and the command line is
+    re-parsed only once. If SCons option parser is not initialized yet, the
+    options are passed to ``AddOption()`` one by one.
+
+    :Parameters:
+        opt_args
+            list of ``(names, kw)`` pairs, each one describing arguments to
+            ``AddOption(*names, **kw)``.
+    """
+    from SCons.Script import Main
+    from SCons.Script.SConsOptions import SConsOptionParser, SConsOptionGroup
+    parser = Main.OptionsParser
+    if not isinstance(parser, SConsOptionParser):
+        for names, kw in opt_args:
+            Main.AddOption(*names, **dict(kw))
+        return
+    try:
+        group = parser.local_option_group
+    except AttributeError:
+        group = SConsOptionGroup(parser, 'Local Options')
+        group = parser.add_option_group(group)
+        parser.local_option_group = group
+    defaults = parser.values.__defaults__
+    added = False
+    try:
+        for names, kw in opt_args:
+            kw = dict(kw)
+            kw.setdefault('default', None)
+            result = group.add_option(*names, **kw)
+            if result:
+                setattr(defaults, result.dest, result.default)
+                added = True
+    finally:
+        if added:
+            parser.parse_args(parser.largs, parser.values)
+
+#############################################################################
+def _get_options(keys):
+    """Get values of several command-line options at once.
+
+    Returns list of ``(key, value)`` pairs, where ``value`` is what
+    ``SCons.Script.Main.GetOption(key)`` would return. The values set on
+    command line, in SConscripts and the defaults are merged in a single
+    pass, instead of resolving every option separately.
+    """
+    from SCons.Script import Main
+    from SCons.Script.SConsOptions import SConsValues
+    values = Main.OptionsParser.values
+    if not isinstance(values, SConsValues):
+        return [ (key, Main.GetOption(key)) for key in keys ]
+    merged = vars(values.__dict__['__defaults__']).copy()
+    merged.update(values.__dict__['__SConscript_settings__'])
+    merged.update(values.__dict__)
+    return [ (key, merged[key]) for key in keys ]
+
 #############################################################################
 class _GVarsEnvProxy(object):
     #========================================================================
@@ -417,7 +610,7 @@ class _GVarsEnvProxy(object):
     """
     #========================================================================
     def __init__(self, env, rename={}, resubst={}, irename={}, iresubst={},
-                 strict=False):
+                 strict=False, dirty=None):
         # -------------------------------------------------------------------
         """Initializes `_GVarsEnvProxy` object.
 
@@ -434,7 +627,7 @@ class _GVarsEnvProxy(object):
                 `subst()`)
             irename
                 dictionary used for mapping variable names from environment
-                to user namespace (used by ``items()``),
+                to user namespace (used by ``items()``, ``keys()`` etc.),
             iresubst
                 dictionary used by to rename placeholders in values passed
                 back from environment to user (used by `__getitem__()` for
@@ -443,13 +636,20 @@ class _GVarsEnvProxy(object):
                 if ``True`` only the keys defined in rename/resubst
                 dictionaries are allowed, otherwise the original variables
                 from ``env`` are also accessible via their keys
+            dirty
+                if not ``None``, it should be a set; the keys (in environment
+                namespace) of variables written or deleted through this proxy
+                are added to it
         """
         # -------------------------------------------------------------------
         self.env = env
+        self.dirty = dirty
         self.__rename = rename
         self.__resubst = resubst
         self.__irename = irename
         self.__iresubst = iresubst
+        self.__renamer = _Renamer(resubst)
+        self.__irenamer = _Renamer(iresubst)
         self.set_strict(strict)
 
     #========================================================================
@@ -471,6 +671,9 @@ class _GVarsEnvProxy(object):
             self.has_key = self._has_key_strict
             self.__contains__impl = self.__contains__strict
             self.items = self._items_strict
+            self.iteritems = self._iteritems_strict
+            self.iterkeys = self._iterkeys_strict
+            self.itervalues = self._itervalues_strict
         else:
             self.__delitem__impl = self.__delitem__nonstrict
             self.__getitem__impl = self.__getitem__nonstrict
@@ -479,10 +682,15 @@ class _GVarsEnvProxy(object):
             self.has_key = self._has_key_nonstrict
             self.__contains__impl = self.__contains__nonstrict
             self.items = self._items_nonstrict
+            self.iteritems = self._iteritems_nonstrict
+            self.iterkeys = self._iterkeys_nonstrict
+            self.itervalues = self._itervalues_nonstrict
 
     #========================================================================
     def __delitem__(self, key):
         self.__delitem__impl(key)
+        if self.dirty is not None:
+            self.dirty.add(self.__rename.get(key,key))
 
     #========================================================================
     def __delitem__strict(self, key):
@@ -499,16 +707,18 @@ class _GVarsEnvProxy(object):
     #========================================================================
     def __getitem__strict(self, key):
         env_key = self.__rename[key]
-        return _resubst(self.env[env_key], self.__iresubst)
+        return self.__irenamer(self.env[env_key])
 
     #========================================================================
     def __getitem__nonstrict(self, key):
         env_key = self.__rename.get(key,key)
-        return _resubst(self.env[env_key], self.__iresubst)
+        return self.__irenamer(self.env[env_key])
 
     #========================================================================
     def __setitem__(self, key, value):
-        return self.__setitem__impl(key, value)
+        self.__setitem__impl(key, value)
+        if self.dirty is not None:
+            self.dirty.add(self.__rename.get(key,key))
 
     #========================================================================
     def __setitem__strict(self, key, value):
@@ -517,24 +727,24 @@ class _GVarsEnvProxy(object):
         # Maybe we sohuld provide some default way of extending __rename when
         # setting new items in strict mode?
         env_key = self.__rename[key]
-        env_value = _resubst(value, self.__resubst)
+        env_value = self.__renamer(value)
         self.env[env_key] = env_value
 
     #========================================================================
     def __setitem__nonstrict(self, key, value):
         env_key = self.__rename.get(key,key)
-        env_value = _resubst(value, self.__resubst)
+        env_value = self.__renamer(value)
         self.env[env_key] = env_value
 
     #========================================================================
     def _get_strict(self, key, default=None):
         env_key = self.__rename[key]
-        return _resubst(self.env.get(env_key, default), self.__iresubst)
+        return self.__irenamer(self.env.get(env_key, default))
 
     #========================================================================
     def _get_nonstrict(self, key, default=None):
         env_key = self.__rename.get(key,key)
-        return _resubst(self.env.get(env_key, default), self.__iresubst)
+        return self.__irenamer(self.env.get(env_key, default))
 
     #========================================================================
     def _has_key_strict(self, key):
@@ -556,22 +766,94 @@ class _GVarsEnvProxy(object):
     def __contains__nonstrict(self, key):
         return self.env.__contains__(self.__rename.get(key,key))
 
+    #========================================================================
+    def __env_dict(self):
+        """Return the dictionary of construction variables of proxied
+        environment, without copying it where possible."""
+        try:
+            dictionary = self.env.Dictionary
+        except AttributeError:
+            return self.env
+        return dictionary()
+
+    #========================================================================
+    def __iter__(self):
+        return self.iterkeys()
+
+    #========================================================================
+    def keys(self):
+        return list(self.iterkeys())
+
+    #========================================================================
+    def values(self):
+        return list(self.itervalues())
+
     #========================================================================
     def _items_strict(self):
-        iresubst = lambda v : _resubst(v, self.__iresubst)
-        return [ (k, self[k]) for k in self.__rename ]
+        return list(self._iteritems_strict())
+
+    #========================================================================
+    def _iteritems_strict(self):
+        # values are resubst'ed only when they're consumed
+        env, irenamer = self.__env_dict(), self.__irenamer
+        for (k, ek) in self.__rename.iteritems():
+            try:
+                v = env[ek]
+            except KeyError:
+                continue
+            yield (k, irenamer(v))
+
+    #========================================================================
+    def _iterkeys_strict(self):
+        env = self.__env_dict()
+        for (k, ek) in self.__rename.iteritems():
+            if ek in env:
+                yield k
+
+    #========================================================================
+    def _itervalues_strict(self):
+        for (k, v) in self._iteritems_strict():
+            yield v
 
     #========================================================================
     def _items_nonstrict(self):
-        iresubst = lambda v : _resubst(v, self.__iresubst)
-        irename = lambda k : self.__irename.get(k,k)
-        return [ (irename(k), iresubst(v)) for (k,v) in self.env.items() ]
+        return list(self._iteritems_nonstrict())
+
+    #========================================================================
+    def _iteritems_nonstrict(self):
+        # values are resubst'ed only when they're consumed
+        irename, irenamer = self.__irename, self.__irenamer
+        for (k, v) in self.__env_dict().iteritems():
+            yield (irename.get(k,k), irenamer(v))
+
+    #========================================================================
+    def _iterkeys_nonstrict(self):
+        irename = self.__irename
+        for k in self.__env_dict():
+            yield irename.get(k,k)
+
+    #========================================================================
+    def _itervalues_nonstrict(self):
+        irenamer = self.__irenamer
+        for v in self.__env_dict().itervalues():
+            yield irenamer(v)
 
     #========================================================================
     def subst(self, string, *args):
-        env_string = _resubst(string, self.__resubst)
+        env_string = self.__renamer(string)
         return self.env.subst(env_string, *args)
 
+#############################################################################
+_variables_file_header = '# SConsGnu.GVars variables file, format 1\n'
+"""First line of variables files written by `_GVars.SaveVariables()`, the
+rest of such file is a marshalled list of ``(key, value)`` pairs."""
+
+#############################################################################
+_gvars_cache_header = '# SConsGnu.GVars cache file, format 1\n'
+"""First line of cache files written by `_GVars.SaveCache()`, the rest of
+such file is a marshalled tuple ``(source_hash, keys, rename, irename,
+resubst, iresubst)``."""
+
 #############################################################################
 class _VariablesWrapper(object):
 
@@ -593,6 +875,7 @@ class _VariablesWrapper(object):
         # unless it was created by someone else).
         import os
         import sys
+        import SCons.Errors
 
         variables = self.variables
         values = {}
@@ -605,42 +888,45 @@ class _VariablesWrapper(object):
         # next set the value specified in the options file
         for filename in variables.files:
             if os.path.exists(filename):
-                dir = os.path.split(os.path.abspath(filename))[0]
-                if dir:
-                    sys.path.insert(0, dir)
-                try:
-                    values['__name__'] = filename
-                    exec open(filename, 'rU').read() in {}, values
-                finally:
-                    if dir:
-                        del sys.path[0]
-                    del values['__name__']
+                self._load_file(filename, values)
 
         # set the values specified on the command line
         if args is None:
             args = variables.args
 
+        # index option keys by their names and aliases, so we don't have to
+        # scan all the options for each argument
+        index = {}
+        for option in variables.options:
+            for name in list(option.aliases) + [ option.key ]:
+                keys = index.setdefault(name, [])
+                if option.key not in keys:
+                    keys.append(option.key)
+
         for arg, value in args.items():
-            added = False
-            for option in variables.options:
-                if arg in list(option.aliases) + [ option.key ]:
-                    values[option.key] = value
-                    added = True
-            if not added:
+            try:
+                keys = index[arg]
+            except KeyError:
                 variables.unknown[arg] = value
+            else:
+                for key in keys:
+                    values[key] = value
+
+        # options that got some value; the assignments, conversions and
+        # validations are still done in three separate passes (as in SCons),
+        # because converters and validators may look at other variables in
+        # env
+        present = [ o for o in variables.options if o.key in values ]
+        defined = [ o for o in present if values[o.key] is not _undef ]
 
         # put the variables in the environment:
         # (don't copy over variables that are not declared as options)
-        for option in variables.options:
-            try:
-                if values[option.key] is not _undef:
-                    env[option.key] = values[option.key]
-            except KeyError:
-                pass
+        for option in defined:
+            env[option.key] = values[option.key]
 
         # Call the convert functions:
-        for option in variables.options:
-            if option.converter and option.key in values and values[option.key] is not _undef:
+        for option in defined:
+            if option.converter:
                 value = env.get(option.key)
                 try:
                     try:
@@ -652,10 +938,225 @@ class _VariablesWrapper(object):
 
 
         # Finally validate the values:
-        for option in variables.options:
-            if option.validator and option.key in values:
+        for option in present:
+            if option.validator:
                 option.validator(option.key, env.get(option.key), env)
 
+
+    #========================================================================
+    def _load_file(self, filename, values):
+        # Files written by Save() are loaded without exec(). Anything else is
+        # a legacy python script (as written by SCons' Variables.Save()), it
+        # gets executed and is silently converted by the next Save().
+        import os
+        import sys
+        import marshal
+
+        f = open(filename, 'rb')
+        try:
+            header = f.readline()
+            if header == _variables_file_header:
+                try:
+                    values.update(marshal.load(f))
+                except (EOFError, ValueError, TypeError), x:
+                    import SCons.Errors
+                    raise SCons.Errors.UserError(
+                        'Error reading variables file: %s\n%s' % (filename, x))
+                return
+        finally:
+            f.close()
+
+        dir = os.path.split(os.path.abspath(filename))[0]
+        if dir:
+            sys.path.insert(0, dir)
+        try:
+            values['__name__'] = filename
+            exec open(filename, 'rU').read() in {}, values
+        finally:
+            if dir:
+                del sys.path[0]
+            del values['__name__']
+
+    #========================================================================
+    def _values_to_save(self, env):
+        # Same selection of values as in SCons' Variables.Save(): only
+        # variables having a value other than their default are stored.
+        import marshal
+        import SCons.Util
+        values = []
+        for option in self.variables.options:
+            try:
+                value = env[option.key]
+            except KeyError:
+                continue
+            try:
+                prepare = value.prepare_to_store
+            except AttributeError:
+                try:
+                    eval(repr(value))
+                    marshal.dumps(value)
+                except KeyboardInterrupt:
+                    raise
+                except:
+                    # Convert stuff that has a repr() that cannot be
+                    # evaluated (or marshalled) into a string
+                    value = SCons.Util.to_String(value)
+            else:
+                value = prepare()
+
+            default = env.subst(SCons.Util.to_String(option.default))
+            if option.converter:
+                default = option.converter(default)
+
+            if str(env.subst('${%s}' % option.key)) != str(default):
+                values.append((option.key, value))
+        return values
+
+    #========================================================================
+    def Save(self, filename, env):
+        # Replaces SCons' Variables.Save(), see
+        # SConsGnu.Common.write_file_if_changed().
+        import marshal
+        import SCons.Errors
+        from SConsGnu.Common import write_file_if_changed
+
+        data = _variables_file_header \
+             + marshal.dumps(self._values_to_save(env), 2)
+        try:
+            return write_file_if_changed(filename, data)
+        except (IOError, OSError), x:
+            raise SCons.Errors.UserError(
+                'Error writing options to file: %s\n%s' % (filename, x))
+
+#############################################################################
+class _LazyHelpText(object):
+    #========================================================================
+    """Help text formatted when it's converted to string for the first time.
+
+    Objects of this class may be passed to SCons ``Help()`` in place of
+    strings. SCons keeps the help text and converts it to string only if it is
+    asked to print the help (``scons -h``), so the formatting is skipped
+    otherwise. The concatenation with strings (as performed by subsequent
+    ``Help()`` calls) results in another `_LazyHelpText` object.
+    """
+    #========================================================================
+    def __init__(self, func, *args, **kw):
+        # -------------------------------------------------------------------
+        """Initializes `_LazyHelpText` object.
+
+        :Parameters:
+            func
+                function returning the help text, it's called as
+                ``func(*args, **kw)`` at most once,
+            args, kw
+                arguments for `func`.
+        """
+        # -------------------------------------------------------------------
+        self.__func = func
+        self.__args = args
+        self.__kw = kw
+        self.__text = None
+
+    #========================================================================
+    def __str__(self):
+        if self.__text is None:
+            self.__text = '%s' % self.__func(*self.__args, **self.__kw)
+            self.__func, self.__args, self.__kw = None, None, None
+        return self.__text
+
+    #========================================================================
+    def __add__(self, other):
+        return _LazyHelpText(lambda : '%s%s' % (self, other))
+
+    #========================================================================
+    def __radd__(self, other):
+        return _LazyHelpText(lambda : '%s%s' % (other, self))
+
+#############################################################################
+class _GVarsSnapshot(dict):
+    #========================================================================
+    """Values of ``GVar`` variables taken by `_GVars.TrackChanges()`.
+
+    It's a dictionary with the same content as the one returned by
+    `_GVars.GetCurrentValues()`. In addition it holds the tracked environment
+    ``env`` and the set ``dirty`` of its keys written (or deleted) since the
+    snapshot was taken.
+    """
+    #========================================================================
+    def __init__(self, env, values):
+        super(_GVarsSnapshot, self).__init__(values)
+        self.env = env
+        self.dirty = set()
+
+#############################################################################
+class _GVarsView(collections.Mapping):
+    #========================================================================
+    """Read-only view of ``GVar`` variables stored in SCons environment.
+
+    The view doesn't copy anything. The names of variables are translated
+    and the placeholders in their values are renamed when they're accessed,
+    so it reflects the current state of the environment. Use `snapshot()` to
+    get a copy.
+    """
+    #========================================================================
+    def __init__(self, env, rename, convert):
+        # -------------------------------------------------------------------
+        """Initializes `_GVarsView` object.
+
+        :Parameters:
+            env
+                `SCons environment`_ object or simply a dict which holds
+                the values of variables,
+            rename
+                dictionary mapping keys of this view to keys in `env`,
+            convert
+                callable applied to values taken from `env` (e.g. a
+                `_Renamer`).
+
+        .. _SCons environment:  http://www.scons.org/doc/HTML/scons-user.html#chap-environments
+        """
+        # -------------------------------------------------------------------
+        self.env = env
+        self.__rename = rename
+        self.__convert = convert
+
+    #========================================================================
+    def __getitem__(self, key):
+        return self.__convert(self.env[self.__rename[key]])
+
+    #========================================================================
+    def __contains__(self, key):
+        try:
+            env_key = self.__rename[key]
+        except KeyError:
+            return False
+        return env_key in self.env
+
+    #========================================================================
+    def __iter__(self):
+        env = self.env
+        for (k, ek) in self.__rename.iteritems():
+            if ek in env:
+                yield k
+
+    #========================================================================
+    def __len__(self):
+        return len([ k for k in self ])
+
+    #========================================================================
+    def snapshot(self):
+        """Return the dictionary with current values of variables."""
+        env, convert = self.env, self.__convert
+        res = {}
+        for (k, ek) in self.__rename.iteritems():
+            try:
+                v = env[ek]
+            except KeyError:
+                # note: KeyError can be triggered by env.
+                continue
+            res[k] = convert(v)
+        return res
+
 #############################################################################
 class _GVars(object):
     #========================================================================
@@ -691,8 +1192,20 @@ class _GVars(object):
                 declarations of ``GVar`` variables,
         """
         # -------------------------------------------------------------------
-        self.__keys = gdecls.keys()
+        if gdecls is not None:
+            self.__keys = gdecls.keys()
+            self.__converters = gdecls.get_var_converters()
+            self.__defaults = gdecls.get_env_defaults()
+        else:
+            self.__keys = []
+            self.__converters = None
+            self.__defaults = None
+        self.__imported = {}
         self.__init_supp_dicts(gdecls)
+        self.__expanded = {}
+        self.__placeholders = {}
+        self.__help_texts = {}
+        self.__tracked = None
 
     #========================================================================
     def __reset_supp_dicts(self):
@@ -701,6 +1214,8 @@ class _GVars(object):
         self.__irename = [{} for n in range(0,ALL)]
         self.__resubst = [{} for n in range(0,ALL)]
         self.__iresubst = [{} for n in range(0,ALL)]
+        self.__proxy_dicts = {}
+        self.__view_args = {}
 
     #========================================================================
     def __init_supp_dicts(self, gdecls):
@@ -714,37 +1229,112 @@ class _GVars(object):
                 self.__resubst[xxx] = gdecls.get_xxx_resubst_dict(xxx)
                 self.__iresubst[xxx] = gdecls.get_xxx_iresubst_dict(xxx)
 
+    #========================================================================
+    def _get_tables(self):
+        """Return the tuple ``(keys, rename, irename, resubst, iresubst)``
+        with the list of ``GVar`` keys and the lists of supplementary
+        dictionaries (one dictionary per namespace ``xxx``)."""
+        return (self.__keys, self.__rename, self.__irename, self.__resubst,
+                self.__iresubst)
+
+    #========================================================================
+    def _set_tables(self, tables):
+        """Replace the list of ``GVar`` keys and supplementary dictionaries
+        with `tables`, as returned by `_get_tables()`."""
+        self.__reset_supp_dicts()
+        (self.__keys, self.__rename, self.__irename, self.__resubst,
+         self.__iresubst) = tables
+
+    #========================================================================
+    def __get_proxy_dicts(self, xxx):
+        """Return the tuple ``(rename, resubst, irename, iresubst)`` of
+        dictionaries for a proxy which uses keys from ``xxx`` namespace to
+        access construction variables.
+
+        The dictionaries are computed once and shared by all the proxies
+        created later, as the supplementary dictionaries do not change after
+        commit.
+        """
+        try:
+            return self.__proxy_dicts[xxx]
+        except KeyError:
+            pass
+        if xxx == ENV:
+            dicts = (self.__rename[ENV], self.__resubst[ENV],
+                     self.__irename[ENV], self.__iresubst[ENV])
+        else:
+            rename = _compose_dicts(self.__irename[xxx], self.__rename[ENV])
+            irename = _invert_dict(rename)
+            resubst = _build_resubst_dict(rename)
+            iresubst = _build_resubst_dict(irename)
+            dicts = (rename, resubst, irename, iresubst)
+        self.__proxy_dicts[xxx] = dicts
+        return dicts
+
+    #========================================================================
+    def __get_view_args(self, unmangled):
+        """Return the pair ``(rename, convert)`` of arguments for
+        `_GVarsView`; the view uses ``GVar`` keys if `unmangled` is ``True``,
+        otherwise keys from ``ENV`` namespace (as `GetCurrentValues()`).
+
+        The arguments are computed once, as `__get_proxy_dicts()` does."""
+        try:
+            return self.__view_args[unmangled]
+        except KeyError:
+            pass
+        rename, resubst, irename, iresubst = self.__get_proxy_dicts(ENV)
+        irenamer = _Renamer(iresubst)
+        if unmangled:
+            args = (rename, irenamer)
+        else:
+            renamer = _Renamer(resubst)
+            args = (dict([ (ek, ek) for ek in rename.itervalues() ]),
+                    lambda v : renamer(irenamer(v)))
+        self.__view_args[unmangled] = args
+        return args
+
+    #========================================================================
+    def __tracking_kw(self, env, kw):
+        """Add the ``dirty`` set to keyword arguments of a new proxy, if `env`
+        is tracked by `TrackChanges()`."""
+        tracked = self.__tracked
+        if tracked is not None and tracked.env is env and 'dirty' not in kw:
+            kw['dirty'] = tracked.dirty
+        return kw
+
+    #========================================================================
+    def __dirty_keys(self, env, org):
+        """Return the set of ``GVar`` keys that could have been altered in
+        `env` since `org` was taken, or ``None`` if it's not known (`org` was
+        not returned by the recent `TrackChanges()` for `env`)."""
+        tracked = self.__tracked
+        if tracked is None or tracked is not org or tracked.env is not env:
+            return None
+        irename = self.__irename[ENV]
+        return set([ irename[ek] for ek in tracked.dirty if ek in irename ])
+
     #========================================================================
     def VarEnvProxy(self, env, *args, **kw):
         """Return proxy to SCons environment `env` which uses keys from
         `VAR` namespace to access corresponding environment construction
         variables"""
-        rename = _compose_dicts(self.__irename[VAR], self.__rename[ENV])
-        irename = _invert_dict(rename)
-        resubst = _build_resubst_dict(rename)
-        iresubst = _build_resubst_dict(irename)
-        return _GVarsEnvProxy(env, rename, resubst, irename, iresubst, *args,
-                              **kw)
+        return _GVarsEnvProxy(env, *(self.__get_proxy_dicts(VAR) + args),
+                              **self.__tracking_kw(env, kw))
 
     #========================================================================
     def OptEnvProxy(self, env, *args, **kw):
         """Return proxy to SCons environment `env` which uses keys from
         `OPT` namespace to access corresponding environment construction
         variables"""
-        rename = _compose_dicts(self.__irename[OPT], self.__rename[ENV])
-        irename = _invert_dict(rename)
-        resubst = _build_resubst_dict(rename)
-        iresubst = _build_resubst_dict(irename)
-        return _GVarsEnvProxy(env, rename, resubst, irename, iresubst, *args,
-                              **kw)
+        return _GVarsEnvProxy(env, *(self.__get_proxy_dicts(OPT) + args),
+                              **self.__tracking_kw(env, kw))
 
     #========================================================================
     def EnvProxy(self, env, *args, **kw):
         """Return proxy to SCons environment `env` which uses original keys
         identifying ``GVar`` variables to access construction variables"""
-        return _GVarsEnvProxy(env, self.__rename[ENV], self.__resubst[ENV],
-                                   self.__irename[ENV], self.__iresubst[ENV],
-                                   *args, **kw)
+        return _GVarsEnvProxy(env, *(self.__get_proxy_dicts(ENV) + args),
+                              **self.__tracking_kw(env, kw))
 
     #========================================================================
     def get_keys(self):
@@ -779,6 +1369,41 @@ class _GVars(object):
     def opt_key(self, key):
         return self.__rename[OPT][key]
 
+    #========================================================================
+    def ApplyDefaultsTo(self, envs):
+        #--------------------------------------------------------------------
+        """Initialize construction variables in several environments with
+        default values of ``GVar`` variables.
+
+        It has the same effect on each environment as committing the
+        declarations to it (see `_GVarDecls.Commit()`), but the default
+        values are computed once (when this object is created) and applied
+        with one ``SetDefault()`` call per environment. Command-line
+        variables and options are not touched.
+
+        **Example**::
+
+            gvars = decls.Commit(env, variables, True)
+            gvars.ApplyDefaultsTo([ env.Clone() for v in variants ])
+
+        :Parameters:
+            envs
+                sequence of `SCons environment`_ objects.
+        :Raises:
+            RuntimeError
+                if this object was loaded from cache (see `LoadGVars()`) and
+                the default values are unknown.
+
+        .. _SCons environment:  http://www.scons.org/doc/HTML/scons-user.html#chap-environments
+        """
+        #--------------------------------------------------------------------
+        defaults = self.__defaults
+        if defaults is None:
+            raise RuntimeError("default values of variables are not known")
+        if defaults:
+            for env in envs:
+                env.SetDefault(**defaults)
+
     #========================================================================
     def update_env_from_vars(self, env, variables, args=None):
         #--------------------------------------------------------------------
@@ -823,10 +1448,8 @@ class _GVars(object):
         .. _command-line options: http://www.scons.org/doc/HTML/scons-user.html#sect-command-line-options
         """
         #--------------------------------------------------------------------
-        from SCons.Script.Main import GetOption
         proxy = self.OptEnvProxy(env)
-        for opt_key in self.__irename[OPT]:
-            opt_value = GetOption(opt_key)
+        for opt_key, opt_value in _get_options(self.__irename[OPT]):
             if opt_value is not None:
                 proxy[opt_key] = opt_value
 
@@ -867,6 +1490,14 @@ class _GVars(object):
         #--------------------------------------------------------------------
         """Save the `variables` to file mapping appropriately their names.
 
+        The file is written in a binary format (see `_variables_file_header`),
+        which is loaded by `UpdateEnvironment()` without ``exec``-ing any
+        python code. It's rewritten (atomically) only if the saved values
+        have changed, so on no-op runs it keeps its modification time. Legacy
+        files created by ``SCons.Variables.Variables.Save()`` are still
+        readable and get converted on the next save. Note that the new files
+        are not understood by ``SCons.Variables.Variables.Update()``.
+
         :Parameters:
             variables : ``SCons.Variables.Variables``
                 if not ``None``, it should be an instance of
@@ -884,6 +1515,41 @@ class _GVars(object):
         proxy = self.VarEnvProxy(env)
         _VariablesWrapper(variables).Save(filename, proxy)
 
+    def SaveCache(self, filename, source_hash):
+        #--------------------------------------------------------------------
+        """Save the namespace tables of this object to file `filename`, such
+        that the object may be later restored by `LoadGVars()`.
+
+        The file is rewritten only when its content changes.
+
+        :Parameters:
+            filename
+                name of the cache file,
+            source_hash
+                a string identifying the source of declarations this object
+                was created from, see `SourceHash()`; `LoadGVars()` rejects
+                the file if it's called with different hash.
+        :Returns:
+            ``True`` if the file was written, ``False`` otherwise.
+        """
+        #--------------------------------------------------------------------
+        import marshal
+        import SCons.Errors
+        from SConsGnu.Common import write_file_if_changed
+
+        # marshal accepts only plain dictionaries
+        tables = self._get_tables()
+        tables = (tables[0],) + tuple([ [ dict(d) for d in dicts ]
+                                        for dicts in tables[1:] ])
+        data = _gvars_cache_header \
+             + marshal.dumps((source_hash,) + tables, 2)
+        try:
+            return write_file_if_changed(filename, data)
+        except (IOError, OSError), x:
+            raise SCons.Errors.UserError(
+                'Error writing GVars cache to file: %s\n%s' % (filename, x))
+
+    #========================================================================
     def GenerateVariablesHelpText(self, variables, env, *args, **kw):
         #--------------------------------------------------------------------
         """Generate help text for `variables` using
@@ -894,47 +1560,323 @@ class _GVars(object):
             where SCons command line variables and construction variables live.
 
         :Parameters:
-            variables : ``SCons.Variables.Variables``
-                if not ``None``, it should be an instance of
-                `SCons.Variables.Variables`_; this object is used to save
-                SCons variables,
+            variables : ``SCons.Variables.Variables``
+                if not ``None``, it should be an instance of
+                `SCons.Variables.Variables`_; this object is used to save
+                SCons variables,
+            env
+                `SCons environment`_ object to update,
+            args
+                other arguments passed verbatim to ``GenerateHelpText()``
+
+        .. _SCons.Variables.Variables: http://www.scons.org/doc/latest/HTML/scons-api/SCons.Variables.Variables-class.html
+        .. _SCons environment:  http://www.scons.org/doc/HTML/scons-user.html#chap-environments
+        """
+        #--------------------------------------------------------------------
+        try:
+            key = (id(variables), args, tuple(sorted(kw.items())))
+            hash(key)
+        except TypeError:
+            key = None
+        sig = self.__help_text_signature(variables, env)
+        if key is not None and sig is not None:
+            try:
+                cached = self.__help_texts[key]
+            except KeyError:
+                pass
+            else:
+                if cached[:2] == (variables, sig):
+                    return cached[2]
+        proxy = self.VarEnvProxy(env)
+        text = _VariablesWrapper(variables).GenerateHelpText(proxy, *args, **kw)
+        if key is not None and sig is not None:
+            self.__help_texts[key] = (variables, sig, text)
+        return text
+
+    #========================================================================
+    def __help_text_signature(self, variables, env):
+        """Return the signature of the help text generated for `variables`,
+        that is the declaration set (the list of variables declared in
+        `variables`) and raw values of all the construction variables the
+        help text depends on, or ``None`` if they can't be determined."""
+        raw = {}
+        def get_deps(name):
+            value = env.get(name, _missing)
+            raw[name] = value
+            if value is _missing:
+                return []
+            names = self.__get_placeholder_names(value)
+            if names is None:
+                raw[name] = _notfound
+                return []
+            return names
+        try:
+            options = tuple(variables.options)
+            rename = self.__get_proxy_dicts(VAR)[0]
+            roots = [ rename.get(opt.key, opt.key) for opt in options ]
+            order = _dependency_order(roots, get_deps)
+        except (RuntimeError, AttributeError, TypeError):
+            return None
+        if _notfound in raw.itervalues():
+            return None
+        return (options, [ (n, raw[n]) for n in order ])
+
+    #========================================================================
+    def VariablesHelpText(self, variables, env, *args, **kw):
+        #--------------------------------------------------------------------
+        """Lazy version of `GenerateVariablesHelpText()`.
+
+        The returned object may be passed to SCons ``Help()`` and it formats
+        the help text only when SCons actually prints the help (``scons
+        -h``). The help is then generated from the values of construction
+        variables the environment `env` has at this time. The generated text
+        is cached, such that it's not formatted again for same declaration
+        set and unchanged values of variables.
+
+        **Example**::
+
+            Help(gvars.VariablesHelpText(variables, env))
+
+        :Parameters:
+            variables : ``SCons.Variables.Variables``
+                an instance of `SCons.Variables.Variables`_,
+            env
+                `SCons environment`_ object to take values from,
+            args
+                other arguments passed verbatim to ``GenerateHelpText()``
+
+        :Returns:
+            a `_LazyHelpText` object.
+
+        .. _SCons.Variables.Variables: http://www.scons.org/doc/latest/HTML/scons-api/SCons.Variables.Variables-class.html
+        .. _SCons environment:  http://www.scons.org/doc/HTML/scons-user.html#chap-environments
+        """
+        #--------------------------------------------------------------------
+        return _LazyHelpText(self.GenerateVariablesHelpText, variables, env,
+                             *args, **kw)
+
+    def GetCurrentValues(self, env):
+        #--------------------------------------------------------------------
+        """Get current values of GVars stored in environment
+
+        :Parameters:
+            env
+                `SCons environment`_ object to update,
+        :Return:
+            Dict containing current values.
+
+        .. _SCons environment:  http://www.scons.org/doc/HTML/scons-user.html#chap-environments
+        """
+        #--------------------------------------------------------------------
+        return self.CurrentValuesView(env).snapshot()
+
+    #========================================================================
+    def CurrentValuesView(self, env):
+        #--------------------------------------------------------------------
+        """Get read-only view of current values of GVars stored in
+        environment.
+
+        This is a zero-copy version of `GetCurrentValues()`; the view
+        reflects later changes of `env`, use its ``snapshot()`` method to get
+        the dictionary returned by `GetCurrentValues()`.
+
+        :Parameters:
+            env
+                `SCons environment`_ object to take values from,
+        :Return:
+            `_GVarsView` object with keys from ``ENV`` namespace.
+
+        .. _SCons environment:  http://www.scons.org/doc/HTML/scons-user.html#chap-environments
+        """
+        #--------------------------------------------------------------------
+        rename, convert = self.__get_view_args(False)
+        return _GVarsView(env, rename, convert)
+
+    #========================================================================
+    def Fingerprint(self, env):
+        #--------------------------------------------------------------------
+        """Compute a stable hash over values of all declared ``GVar``
+        variables stored in `env`.
+
+        The values are taken with original ``GVar`` names and placeholders
+        (as returned by `Unmangle()`), so the result doesn't depend on how the
+        variables are mapped to construction variables. Missing variables are
+        distinguished from variables set to ``None``.
+
+        :Parameters:
+            env
+                `SCons environment`_ object or simply a dict which holds
+                current values of GVars.
+        :Returns:
+            a hex digest.
+
+        .. _SCons environment:  http://www.scons.org/doc/HTML/scons-user.html#chap-environments
+        """
+        #--------------------------------------------------------------------
+        import hashlib
+        md5 = hashlib.md5()
+        values = self.UnmangledView(env).snapshot()
+        for k in sorted(values):
+            md5.update('%s=%s\n' % (_canonical(k), _canonical(values[k])))
+        return md5.hexdigest()
+
+    #========================================================================
+    def TrackChanges(self, env):
+        #--------------------------------------------------------------------
+        """Get current values of GVars stored in environment and start
+        tracking changes made to them.
+
+        Returns the same values as `GetCurrentValues()`, but as a
+        `_GVarsSnapshot`. From now on, the proxies to `env` returned by
+        `EnvProxy()`, `VarEnvProxy()` and `OptEnvProxy()` record the
+        variables written through them (this includes `UpdateEnvironment()`).
+        When the snapshot is later passed as **org** to `GetAltered()`,
+        `GetUnaltered()`, `ReplaceUnaltered()` or `WithUnalteredReplaced()`
+        together with the same `env`, only the recorded variables are
+        compared, so `GetAltered()` costs O(number of changes). For any other
+        **org** the full comparison is performed.
+
+        Only one environment is tracked at a time, a new call to
+        `TrackChanges()` replaces the previous snapshot. Note, that variables
+        assigned directly to `env` (not through a proxy) are not recorded, use
+        `GetCurrentValues()` if `env` is going to be modified that way.
+
+        :Parameters:
             env
-                `SCons environment`_ object to update,
-            args
-                other arguments passed verbatim to ``GenerateHelpText()``
+                `SCons environment`_ object to track,
+        :Return:
+            `_GVarsSnapshot` containing current values.
 
-        .. _SCons.Variables.Variables: http://www.scons.org/doc/latest/HTML/scons-api/SCons.Variables.Variables-class.html
         .. _SCons environment:  http://www.scons.org/doc/HTML/scons-user.html#chap-environments
         """
         #--------------------------------------------------------------------
-        proxy = self.VarEnvProxy(env)
-        return _VariablesWrapper(variables).GenerateHelpText(proxy, *args, **kw)
+        self.__tracked = None
+        snapshot = _GVarsSnapshot(env, self.GetCurrentValues(env))
+        self.__tracked = snapshot
+        return snapshot
 
-    def GetCurrentValues(self, env):
+    #========================================================================
+    def UntrackChanges(self):
+        """Stop tracking changes started by `TrackChanges()`."""
+        self.__tracked = None
+
+    #========================================================================
+    def __get_placeholder_names(self, value):
+        """Memoized `_placeholder_names()`, for string values."""
+        try:
+            return self.__placeholders[value]
+        except KeyError:
+            names = _placeholder_names(value)
+            self.__placeholders[value] = names
+            return names
+        except TypeError:
+            # unhashable value
+            return None
+
+    #========================================================================
+    def ExpandValues(self, env, keys=None):
         #--------------------------------------------------------------------
-        """Get current values of GVars stored in environment
+        """Get values of ``GVar`` variables with all the placeholders
+        expanded, as ``env.subst('${key}')`` would do (with ``key`` renamed to
+        ``ENV`` namespace).
+
+        The placeholders found in current values of construction variables
+        form a dependency graph (e.g. ``bindir -> exec_prefix -> prefix``),
+        which is evaluated in topological order. Expanded values are memoized
+        together with the (unexpanded) values of all the variables they
+        depend on, so the subsequent calls don't call ``env.subst()`` unless
+        some of these variables changes. Values containing substitutions other
+        than ``$name`` and ``${name}``, or depending on non-string values, are
+        not memoized.
 
         :Parameters:
             env
-                `SCons environment`_ object to update,
-        :Return:
-            Dict containing current values.
+                `SCons environment`_ object to take values from,
+            keys
+                list of ``GVar`` keys to expand, by default all ``GVar``
+                variables having corresponding construction variables
+                (``ENV`` declarations) are expanded.
+        :Returns:
+            Dict mapping ``GVar`` keys to expanded values.
+        :Raises:
+            KeyError
+                if some of **keys** has no corresponding construction
+                variable,
+            RuntimeError
+                if the values have circular dependencies.
 
         .. _SCons environment:  http://www.scons.org/doc/HTML/scons-user.html#chap-environments
         """
         #--------------------------------------------------------------------
-        res = {}
-        proxy1 = self.EnvProxy(env, strict = True)
-        proxy2 = self.EnvProxy(res, strict = True)
-        for k in self.__keys:
+        rename = self.__rename[ENV]
+        if keys is None:
+            keys = [ k for k in self.__keys if k in rename ]
+        else:
+            for k in keys:
+                if k not in rename:
+                    raise KeyError("GVar %r has no corresponding construction "
+                                   "variable" % k)
+        env_keys = [ rename[k] for k in keys ]
+
+        raw = {}
+        deps = {}
+        def get_deps(name):
+            value = env.get(name, _missing)
+            raw[name] = value
+            if value is _missing:
+                names = []
+            else:
+                names = self.__get_placeholder_names(value)
+            deps[name] = names
+            return names or []
+
+        # closures[name] is a sorted list of variables, the value of ``name``
+        # depends on (including ``name``), or None if it can't be memoized
+        closures = {}
+        expanded = {}
+        memo = self.__expanded
+        for name in _dependency_order(env_keys, get_deps):
+            closure = None
+            if deps[name] is not None:
+                closure = set([name])
+                for dep in deps[name]:
+                    if closures[dep] is None:
+                        closure = None
+                        break
+                    closure.update(closures[dep])
+                if closure is not None:
+                    closure = sorted(closure)
+            closures[name] = closure
+            if closure is None:
+                expanded[name] = env.subst('${%s}' % name)
+                continue
+            sig = tuple([ raw[n] for n in closure ])
             try:
-                v = proxy1[k]
+                old_sig, value = memo[name]
             except KeyError:
-                # note: KeyError can be triggered by env.
-                pass
-            else:
-                proxy2[k] = v
-        return res
+                old_sig = None
+            if old_sig != sig:
+                value = env.subst('${%s}' % name)
+                memo[name] = (sig, value)
+            expanded[name] = value
+        return dict([ (k, expanded[rename[k]]) for k in keys ])
+
+    #========================================================================
+    def Expand(self, env, key):
+        #--------------------------------------------------------------------
+        """Get value of single ``GVar`` variable with all the placeholders
+        expanded, see `ExpandValues()`.
+
+        :Parameters:
+            env
+                `SCons environment`_ object to take values from,
+            key
+                the key identifying ``GVar`` variable.
+
+        .. _SCons environment:  http://www.scons.org/doc/HTML/scons-user.html#chap-environments
+        """
+        #--------------------------------------------------------------------
+        return self.ExpandValues(env, [key])[key]
 
     @staticmethod
     def _is_unaltered(cur, org, v):
@@ -998,8 +1940,10 @@ class _GVars(object):
         envp = self.EnvProxy(env, strict = True)
         orgp = self.EnvProxy(org, strict = True)
         resp = self.EnvProxy(res, strict = True)
+        dirty = self.__dirty_keys(env, org)
         for k in self.__keys:
-            if _GVars._is_unaltered(envp, orgp, k):
+            if (dirty is not None and k not in dirty) \
+            or _GVars._is_unaltered(envp, orgp, k):
                 resp[k] = envp[k]
         return res
 
@@ -1025,7 +1969,12 @@ class _GVars(object):
         envp = self.EnvProxy(env, strict = True)
         orgp = self.EnvProxy(org, strict = True)
         resp = self.EnvProxy(res, strict = True)
-        for k in self.__keys:
+        dirty = self.__dirty_keys(env, org)
+        if dirty is None:
+            keys = self.__keys
+        else:
+            keys = dirty
+        for k in keys:
             if not _GVars._is_unaltered(envp, orgp, k):
                 resp[k] = envp[k]
         return res
@@ -1060,8 +2009,10 @@ class _GVars(object):
         envp = self.EnvProxy(env, strict = True)
         orgp = self.EnvProxy(org, strict = True)
         chgp = self.EnvProxy(chg, strict = True)
+        dirty = self.__dirty_keys(env, org)
         for k in self.__keys:
-            if _GVars._is_unaltered(envp, orgp, k):
+            if (dirty is not None and k not in dirty) \
+            or _GVars._is_unaltered(envp, orgp, k):
                 try:
                     envp[k] = new[k]
                     chgp[k] = new[k] # Backup the values we've changed.
@@ -1094,8 +2045,10 @@ class _GVars(object):
         envp = self.EnvProxy(env, strict = True)
         orgp = self.EnvProxy(org, strict = True)
         resp = self.EnvProxy(res, strict = True)
+        dirty = self.__dirty_keys(env, org)
         for k in self.__keys:
-            if _GVars._is_unaltered(envp, orgp, k):
+            if (dirty is not None and k not in dirty) \
+            or _GVars._is_unaltered(envp, orgp, k):
                 try:
                     resp[k] = new[k]
                 except KeyError:
@@ -1104,6 +2057,102 @@ class _GVars(object):
                 resp[k] = envp[k]
         return res
 
+    def ImportEnviron(self, env=None, ose=None, prefix=None):
+        #--------------------------------------------------------------------
+        """Import values of ``GVar`` variables from OS environment, to be
+        used as **ose** argument to `Postprocess()` or `ReplaceUnaltered()`.
+
+        Only the variables named after the declared ``GVar`` variables are
+        looked up in `ose`, optionally prefixed with `prefix`; the prefixed
+        name takes precedence. The other variables found in `ose` are not
+        even looked at, so this costs nothing extra for large environments.
+
+        The values of variables having converter (declared for the
+        corresponding command-line variable) are passed through it, in the
+        same way as SCons does for command-line variables. Converted values
+        are cached per variable, so the converter is called only once for
+        each value found in `ose`; each call returns fresh copies of the
+        cached values, so they may be safely modified in place.
+
+        **Example**::
+
+            gvs.Postprocess(env, var, False, gvs.ImportEnviron(env))
+
+        :Parameters:
+            env
+                `SCons environment`_ object; if given, the default `prefix`
+                is taken from it (see ``SConsGnu.Common.get_envvar_prefix()``)
+                and it's passed to converters which require it,
+            ose
+                the OS environment, ``os.environ`` by default,
+            prefix
+                the prefix of variable names in `ose`.
+        :Returns:
+            Dict mapping ``GVar`` keys to imported values.
+        :Raises:
+            SCons.Errors.UserError
+                if the converter fails to convert the value,
+            RuntimeError
+                if this object was loaded from cache (see `LoadGVars()`) and
+                the converters are unknown.
+
+        .. _SCons environment:  http://www.scons.org/doc/HTML/scons-user.html#chap-environments
+        """
+        #--------------------------------------------------------------------
+        if self.__converters is None:
+            raise RuntimeError("converters of variables are not known")
+        if ose is None:
+            import os
+            ose = os.environ
+        if prefix is None and env is not None:
+            from SConsGnu.Common import get_envvar_prefix
+            prefix = get_envvar_prefix(env)
+        imported = {}
+        for k in self.__keys:
+            if prefix:
+                try:
+                    value = ose[prefix + k]
+                except KeyError:
+                    value = ose.get(k, _missing)
+            else:
+                value = ose.get(k, _missing)
+            if value is _missing:
+                continue
+            try:
+                converter = self.__converters[k]
+            except KeyError:
+                imported[k] = value
+                continue
+            try:
+                cached = self.__imported[k]
+            except KeyError:
+                pass
+            else:
+                if cached[0] == value:
+                    imported[k] = _copy_converted(cached[1])
+                    continue
+            imported[k] = self.__convert_imported(k, converter, value, env)
+        return imported
+
+    #========================================================================
+    def __convert_imported(self, k, converter, value, env):
+        """Convert `value` imported by `ImportEnviron()` for ``GVar`` `k`.
+        The result is cached, unless the converter requires `env`."""
+        import SCons.Errors
+        try:
+            try:
+                converted = converter(value)
+            except TypeError:
+                converted = converter(value, env)
+            else:
+                self.__imported[k] = (value, converted)
+                converted = _copy_converted(converted)
+        except ValueError, x:
+            raise SCons.Errors.UserError(
+                'Error converting environment variable: %s\n%s' % (k, x))
+        return converted
+
+    #========================================================================
     def Postprocess(self, env, variables=None, options=False, ose={},
                     args=None, filename=None):
         #--------------------------------------------------------------------
@@ -1203,8 +2252,7 @@ class _GVars(object):
         :Note:
             Often you will have to preprocess ``os.environ`` before passing it
             as **ose**. This is necessary especially when your GVar use
-            ``converter``. In that case you have to pass values from
-            ``os.environ`` through a similar converter too.
+            ``converter``. Use `ImportEnviron()` to do this.
 
         .. _SCons.Variables.Variables: http://www.scons.org/doc/latest/HTML/scons-api/SCons.Variables.Variables-class.html
         .. _SCons environment:  http://www.scons.org/doc/HTML/scons-user.html#chap-environments
@@ -1212,13 +2260,57 @@ class _GVars(object):
         .. _command-line options: http://www.scons.org/doc/HTML/scons-user.html#sect-command-line-options
         """
         #--------------------------------------------------------------------
-        org = self.GetCurrentValues(env)
+        # This is equivalent to the following sequence
+        #
+        #   org = self.GetCurrentValues(env)
+        #   self.UpdateEnvironment(env, variables, options, args)
+        #   alt = self.GetAltered(env, org)
+        #   if filename:
+        #       self.SaveVariables(variables, filename, env)
+        #   alt.update(self.ReplaceUnaltered(env, org, ose))
+        #
+        # but it doesn't create proxies and handles the snapshot and
+        # diff+merge in just two passes over variables.
+        rename, resubst, irename, iresubst = self.__get_proxy_dicts(ENV)
+        renamer = _Renamer(resubst)
+        irenamer = _Renamer(iresubst)
+        keys = [ (k, rename[k]) for k in self.__keys if k in rename ]
+
+        # Snapshot, compared values as seen through strict EnvProxy
+        org = {}
+        for k, ek in keys:
+            try:
+                v = env[ek]
+            except KeyError:
+                pass
+            else:
+                org[k] = irenamer(renamer(irenamer(v)))
+
         self.UpdateEnvironment(env, variables, options, args)
-        alt = self.GetAltered(env, org)
         if filename:
             self.SaveVariables(variables, filename, env)
-        chg = self.ReplaceUnaltered(env, org, ose)
-        alt.update(chg)
+
+        # Diff and merge ose in one pass
+        alt = {}
+        for k, ek in keys:
+            try:
+                curval = irenamer(env[ek])
+            except KeyError:
+                if k in org:
+                    # altered: removed from env (GetAltered raises KeyError)
+                    raise
+                unaltered = True
+            else:
+                unaltered = (k in org) and (curval == org[k])
+            if unaltered:
+                try:
+                    newval = renamer(ose[k])
+                except KeyError:
+                    continue
+                env[ek] = newval
+                alt[ek] = newval
+            else:
+                alt[ek] = renamer(curval)
         return alt
 
     def Unmangle(self, env):
@@ -1273,14 +2365,149 @@ class _GVars(object):
         .. _SCons environment:  http://www.scons.org/doc/HTML/scons-user.html#chap-environments
         """
         #--------------------------------------------------------------------
-        proxy = self.EnvProxy(env, strict=True)
-        res = {}
-        for k in self.__keys:
-            try:
-                res[k] = proxy[k]
-            except KeyError:
-                pass
-        return res
+        return self.UnmangledView(env).snapshot()
+
+    #========================================================================
+    def UnmangledView(self, env):
+        #--------------------------------------------------------------------
+        """Return read-only view of variable values with original names.
+
+        This is a zero-copy version of `Unmangle()`; names and placeholders
+        are translated when the values are accessed and the view reflects
+        later changes of `env`. Use its ``snapshot()`` method to get the
+        dictionary returned by `Unmangle()`.
+
+        **Example**::
+
+            var = gvs.UnmangledView(env)
+            print "var['foo']: %r" % var['foo']
+
+        :Parameters:
+            env
+                `SCons environment`_ object or simply a dict which holds
+                current values of GVars.
+
+        :Return:
+            `_GVarsView` object with keys from ``GVar`` namespace.
+
+        .. _SCons environment:  http://www.scons.org/doc/HTML/scons-user.html#chap-environments
+        """
+        #--------------------------------------------------------------------
+        rename, convert = self.__get_view_args(True)
+        return _GVarsView(env, rename, convert)
+
+#############################################################################
+def _copy_converted(value):
+    """Return (shallow) copy of memoized result of a converter, such that
+    modifying in place the value stored in one environment doesn't affect
+    the others."""
+    import copy
+    import UserList
+    if isinstance(value, UserList.UserList):
+        # copy.copy() would share the underlying list
+        return value[:]
+    return copy.copy(value)
+
+#############################################################################
+class _MemoConverter(object):
+    #========================================================================
+    """Converter of command-line variable which memoizes the results of a
+    pure converter, see `MemoizeConverter()`.
+
+    The results are keyed by the raw (string) value being converted; other
+    values are passed to the converter unmemoized. Each call returns a
+    (shallow) copy of the memoized result, so modifying in place the value
+    stored in one environment (e.g. ``env['CFLAGS'] += ['-g']``) does not
+    affect other environments nor later conversions.
+    """
+    #========================================================================
+    pure = True
+
+    #========================================================================
+    def __init__(self, converter):
+        self.converter = converter
+        self.memo = {}
+
+    #========================================================================
+    def __call__(self, value, *args):
+        from SCons.Util import is_String
+        if not is_String(value):
+            return self.converter(value, *args)
+        try:
+            return _copy_converted(self.memo[value])
+        except KeyError:
+            pass
+        converted = self.converter(value, *args)
+        self.memo[value] = converted
+        return _copy_converted(converted)
+
+#############################################################################
+def PureConverter(converter):
+    """Declare `converter` as pure, i.e. its result depends only on the value
+    being converted and it has no side effects. May be used as decorator.
+
+    Only pure converters are memoized by `MemoizeConverter()`.
+
+    :Returns:
+        the `converter` with ``pure`` attribute set to ``True``.
+    """
+    converter.pure = True
+    return converter
+
+#############################################################################
+def MemoizeConverter(converter):
+    """Return converter which memoizes the results of `converter`, if it's
+    declared pure (see `PureConverter()`), otherwise return `converter`
+    unaltered.
+
+    Each call creates new cache, so it's used by a single declaration (see
+    the ``memoize_converter`` argument of `GVarDeclU()`).
+    """
+    if isinstance(converter, _MemoConverter):
+        converter = converter.converter
+    if getattr(converter, 'pure', False) is not True:
+        return converter
+    return _MemoConverter(converter)
+
+#############################################################################
+_var_decl_fields = ('key', 'help', 'default', 'validator', 'converter')
+"""Arguments of ``SCons.Variables.Variables.Add()`` stored by `_GVarDecl` in
+its ``VAR`` tuple."""
+
+#############################################################################
+def _intern(key):
+    """Intern `key` if it's a plain string (the same names are used as keys
+    in lots of dictionaries)."""
+    if type(key) is str:
+        return intern(key)
+    return key
+
+#############################################################################
+class _ReadOnlyDict(dict):
+    #========================================================================
+    """Dictionary which may not be modified through its public interface.
+
+    `_GVarDecls` keeps its supplementary dictionaries in such objects and
+    returns them from ``get_xxx_*_dict()`` without copying. The dictionary is
+    modified only by its owner, with `_set()`, `_del()` and `_update()`, and
+    only until it gets shared (see `_GVarDecls.clone()`). The `copy()` method
+    returns ordinary (modifiable) dictionary.
+    """
+    #========================================================================
+    __slots__ = ()
+
+    def __readonly(self, *args, **kw):
+        raise TypeError("%r object is read-only" % type(self).__name__)
+
+    __setitem__ = __delitem__ = __readonly
+    clear = pop = popitem = setdefault = update = __readonly
+
+    _set = dict.__setitem__
+    _del = dict.__delitem__
+    _update = dict.update
+
+    def __reduce__(self):
+        return (type(self), (dict(self),))
 
 #############################################################################
 class _GVarDecl(object):
@@ -1302,9 +2529,21 @@ class _GVarDecl(object):
         respectively.  So, for example the call ``decl.set_xxx_decl(ENV,decl)``
         stores the declaration of corresponding construction variable in a
         SCons environment (``ENV``).
+
+    To keep memory footprint low when thousands of variables are declared,
+    the object has no ``__dict__`` and the declaration parameters are stored
+    in tuples, which are replaced (never modified in place) when the
+    declaration changes:
+
+        - ``ENV`` as ``(key, default)``,
+        - ``VAR`` as ``(key, help, default, validator, converter, kw)``, with
+          `_missing` in place of parameters not provided and ``kw`` being
+          a dictionary of additional keywords (or ``None``),
+        - ``OPT`` as ``(names, kw)``; the ``kw`` dictionary is owned by
+          the object and is replaced by a modified copy on change.
     """
     #========================================================================
-
+    __slots__ = ('__env', '__var', '__opt')
 
     #========================================================================
     def __init__(self, env_decl=None, var_decl=None, opt_decl=None):
@@ -1328,11 +2567,26 @@ class _GVarDecl(object):
         .. _SCons command-line variable: http://www.scons.org/doc/HTML/scons-user.html#sect-command-line-variables
         """
         #--------------------------------------------------------------------
-        self.__xxx_args = [None,None,None]
+        self.__env = None
+        self.__var = None
+        self.__opt = None
         if env_decl: self._set_env_decl(env_decl)
         if var_decl: self._set_var_decl(var_decl)
         if opt_decl: self._set_opt_decl(opt_decl)
 
+    #========================================================================
+    def copy(self):
+        """Return a copy of this declaration.
+
+        The keys and defaults may be changed independently in the copy. The
+        declaration parameters are stored in immutable tuples, so they are
+        just shared by the copy."""
+        decl = _GVarDecl()
+        decl.__env = self.__env
+        decl.__var = self.__var
+        decl.__opt = self.__opt
+        return decl
+
     #========================================================================
     def set_xxx_decl(self, xxx, decl):
         #--------------------------------------------------------------------
@@ -1377,17 +2631,19 @@ class _GVarDecl(object):
                 raise ValueError("tuple 'decl' must have 2 elements but " \
                                  "has %d" % len(decl))
             else:
-                decl = {decl[0] : decl[1]}
+                decl = (decl[0], decl[1])
         elif is_Dict(decl):
             if not len(decl) == 1:
                 raise ValueError("dictionary 'decl' must have 1 item but " \
                                  "has %d" % len(decl))
+            else:
+                decl = decl.items()[0]
         elif is_String(decl):
-            decl = { decl : _undef }
+            decl = (decl, _undef)
         else:
             raise TypeError("'decl' must be tuple, dictionary or string, %r " \
                             "is not allowed" % type(decl).__name__)
-        self.__xxx_args[ENV] = decl
+        self.__env = (_intern(decl[0]), decl[1])
 
     #========================================================================
     def _set_var_decl(self, decl):
@@ -1443,8 +2699,11 @@ class _GVarDecl(object):
         if not is_Dict(kw):
             raise TypeError("decl['kw'] must be a dictionary, %r is not " \
                             "allowed" % type(kw).__name__)
+        kw = dict(kw)
         kw.update(args)
-        self.__xxx_args[VAR] = kw
+        values = [ kw.pop(f, _missing) for f in _var_decl_fields ]
+        values[0] = _intern(values[0])
+        self.__var = tuple(values) + (kw or None,)
 
     #========================================================================
     def _set_opt_decl(self, decl):
@@ -1521,7 +2780,9 @@ class _GVarDecl(object):
                             "is not allowed" % type(decl).__name__)
         if 'dest' not in kw:
             raise ValueError("'dest' parameter is missing")
-        self.__xxx_args[OPT] = (names, kw)
+        kw = dict(kw)
+        kw['dest'] = _intern(kw['dest'])
+        self.__opt = (names, kw)
 
     #========================================================================
     def has_xxx_decl(self, xxx):
@@ -1536,7 +2797,10 @@ class _GVarDecl(object):
             ``True`` if the declaration exists, or ``False`` otherwise.
         """
         #--------------------------------------------------------------------
-        return self.__xxx_args[xxx] is not None
+        if xxx == ENV:     return self.__env is not None
+        elif xxx == VAR:   return self.__var is not None
+        elif xxx == OPT:   return self.__opt is not None
+        else:               raise IndexError("index out of range")
 
     #========================================================================
     def get_xxx_key(self, xxx):
@@ -1551,10 +2815,17 @@ class _GVarDecl(object):
             ``decl`` parameters stored by last call `set_xxx_decl(xxx,decl)`.
         """
         #--------------------------------------------------------------------
-        if xxx == ENV:     return self.__xxx_args[ENV].keys()[0]
-        elif xxx == VAR:   return self.__xxx_args[VAR]['key']
-        elif xxx == OPT:   return self.__xxx_args[OPT][1]['dest']
-        else:               raise IndexError("index out of range")
+        if xxx == ENV:
+            return self.__env[0]
+        elif xxx == VAR:
+            key = self.__var[0]
+            if key is _missing:
+                raise KeyError('key')
+            return key
+        elif xxx == OPT:
+            return self.__opt[1]['dest']
+        else:
+            raise IndexError("index out of range")
 
     #========================================================================
     def _set_xxx_key(self, xxx, key):
@@ -1573,13 +2844,16 @@ class _GVarDecl(object):
                 new key for the corresponding variable.
         """
         #--------------------------------------------------------------------
+        key = _intern(key)
         if xxx == ENV:
-            old_key = self.get_env_key()
-            self.__xxx_args[ENV] = { key : self.__xxx_args[ENV][old_key] }
+            self.__env = (key, self.__env[1])
         elif xxx == VAR:
-            self.__xxx_args[VAR]['key'] = key
+            self.__var = (key,) + self.__var[1:]
         elif xxx == OPT:
-            self.__xxx_args[OPT][1]['dest'] = key
+            names, kw = self.__opt
+            kw = dict(kw)
+            kw['dest'] = key
+            self.__opt = (names, kw)
         else:
             raise IndexError("index out of range")
 
@@ -1594,14 +2868,13 @@ class _GVarDecl(object):
         """
         #--------------------------------------------------------------------
         if xxx == ENV:
-            return self.__xxx_args[ENV].values()[0]
+            return self.__env[1]
         elif xxx == VAR:
-            args = self.__xxx_args[VAR]
-            try:             return args['default']
-            except KeyError: return None
+            default = self.__var[2]
+            if default is _missing: return None
+            return default
         elif xxx == OPT:
-            args = self.__xxx_args[OPT]
-            kw = args[1]
+            kw = self.__opt[1]
             try: return kw['default']
             except KeyError: return None
         else:
@@ -1621,11 +2894,15 @@ class _GVarDecl(object):
         """
         #--------------------------------------------------------------------
         if xxx == ENV:
-            self.__xxx_args[ENV] = { self.get_xxx_key(xxx) : default }
+            self.__env = (self.__env[0], default)
         elif xxx == VAR:
-            self.__xxx_args[VAR]['default'] = default
+            var = self.__var
+            self.__var = var[:2] + (default,) + var[3:]
         elif xxx == OPT:
-            self.__xxx_args[OPT][1]['default'] = default
+            names, kw = self.__opt
+            kw = dict(kw)
+            kw['default'] = default
+            self.__opt = (names, kw)
         else:
             raise IndexError("index out of range")
 
@@ -1667,19 +2944,45 @@ class _GVarDecl(object):
         #--------------------------------------------------------------------
         from SCons.Script.Main import AddOption
         if xxx == ENV:
-            if self.__xxx_args[ENV].values()[0] is not _undef:
+            key, default = self.__env
+            if default is not _undef:
                 env = args[0]
-                env.SetDefault(**self.__xxx_args[ENV])
+                env.SetDefault(**{ key : default })
         elif xxx == VAR:
             variables = args[0]
-            kw2 = self.__xxx_args[VAR].copy()
+            var = self.__var
+            kw2 = dict([ (f, v) for (f, v) in zip(_var_decl_fields, var) \
+                         if v is not _missing ])
+            if var[-1]:
+                kw2.update(var[-1])
             kw2.update(kw)
             return variables.Add(*args[1:],**kw2)
         elif xxx == OPT:
-            AddOption(*self.__xxx_args[OPT][0], **self.__xxx_args[OPT][1])
+            names, kw2 = self.__opt
+            AddOption(*names, **kw2)
         else:
             raise IndexError("index out of range")
 
+    #========================================================================
+    def _get_opt_args(self):
+        """Return the pair ``(names, kw)`` of arguments used to create the
+        corresponding command-line option with ``AddOption(*names, **kw)``.
+        """
+        names, kw = self.__opt
+        return names, kw
+
+    #========================================================================
+    def _get_var_converter(self):
+        """Return the converter of the corresponding command-line variable,
+        or ``None`` if there is no converter (or no command-line variable).
+        """
+        if self.__var is None:
+            return None
+        converter = self.__var[4]
+        if converter is _missing:
+            return None
+        return converter
+
     #========================================================================
     def _safe_add_to_xxx(self, xxx, *args):
         #--------------------------------------------------------------------
@@ -1724,7 +3027,8 @@ def GVarDeclU(env_key=None, var_key=None, opt_key=None, default=_undef,
               help=None, validator=None, converter=None, option=None,
               type=None, opt_default=None, metavar=None, nargs=None,
               choices=None, action=None, const=None, callback=None,
-              callback_args=None, callback_kwargs=None):
+              callback_args=None, callback_kwargs=None,
+              memoize_converter=False):
     #------------------------------------------------------------------------
     """Convert unified set of arguments to `_GVarDecl` instance.
 
@@ -1806,6 +3110,9 @@ def GVarDeclU(env_key=None, var_key=None, opt_key=None, default=_undef,
             same as `callback_args` in `optparse option attributes`_,
         callback_kwargs
             same as `callback_kwargs` in `optparse option attributes`_,
+        memoize_converter : Boolean
+            if ``True``, the results of `converter` are memoized (only if it's
+            declared pure), see `MemoizeConverter()`,
 
     :Returns:
         - if `env_key` is present and it is an instance of `_GVarDecl`, then it
@@ -1827,6 +3134,8 @@ def GVarDeclU(env_key=None, var_key=None, opt_key=None, default=_undef,
             env_decl = None
         # --- VAR ---
         if var_key is not None:
+            if memoize_converter and converter is not None:
+                converter = MemoizeConverter(converter)
             items = [ (var_key, 'key'), (default, 'default'), (help, 'help'),
                       (validator, 'validator'), (converter, 'converter') ]
             var_decl = dict([ (k, v) for (v,k) in items if v is not None ])
@@ -1916,6 +3225,8 @@ class _GVarDecls(dict):
         """
         #--------------------------------------------------------------------
         self.__committed = False
+        self.__default_deps = {}
+        self.__owned_decls = None
         self.__validate_values(*args,**kw)
         super(_GVarDecls, self).__init__(*args,**kw)
         self.__update_supp_dicts()
@@ -1923,10 +3234,51 @@ class _GVarDecls(dict):
     #========================================================================
     def __reset_supp_dicts(self):
         """Reset supplementary dictionaries to empty state"""
-        self.__rename = [{} for n in range(0,ALL)]
-        self.__irename = [{} for n in range(0,ALL)]
-        self.__resubst = [{} for n in range(0,ALL)]
-        self.__iresubst = [{} for n in range(0,ALL)]
+        self.__rename = [_ReadOnlyDict() for n in range(0,ALL)]
+        self.__irename = [_ReadOnlyDict() for n in range(0,ALL)]
+        self.__resubst = [_ReadOnlyDict() for n in range(0,ALL)]
+        self.__iresubst = [_ReadOnlyDict() for n in range(0,ALL)]
+        self.__owned = set(['deps'])
+        for dicts in (self.__rename, self.__irename):
+            self.__owned.update([ (id(dicts), xxx) for xxx in range(0,ALL) ])
+        for dicts in (self.__resubst, self.__iresubst):
+            self.__owned.update([ (id(dicts), xxx) for xxx in range(0,ALL) ])
+
+    #========================================================================
+    def __writable(self, dicts, xxx):
+        """Return ``dicts[xxx]``, where ``dicts`` is one of the lists of
+        supplementary dictionaries, making sure it's not shared with a
+        `clone()` (copy on write)."""
+        if (id(dicts), xxx) not in self.__owned:
+            dicts[xxx] = _ReadOnlyDict(dicts[xxx])
+            self.__owned.add((id(dicts), xxx))
+        return dicts[xxx]
+
+    #========================================================================
+    def __shared(self, dicts, xxx):
+        """Return ``dicts[xxx]``, where ``dicts`` is one of the lists of
+        supplementary dictionaries, to be shared with the caller. The
+        dictionary gets copied before this object modifies it next time (copy
+        on write)."""
+        self.__owned.discard((id(dicts), xxx))
+        return dicts[xxx]
+
+    #========================================================================
+    def __writable_decl(self, key):
+        """Return declaration of ``GVar`` variable `key`, making sure it's not
+        shared with a `clone()` (copy on write)."""
+        decl = super(_GVarDecls, self).__getitem__(key)
+        owned = self.__owned_decls
+        if owned is not None and key not in owned:
+            decl = decl.copy()
+            super(_GVarDecls, self).__setitem__(key, decl)
+            owned.add(key)
+        return decl
+
+    #========================================================================
+    def __add_owned_decls(self, keys):
+        if self.__owned_decls is not None:
+            self.__owned_decls.update(keys)
 
     #========================================================================
     def __update_supp_dicts(self):
@@ -1960,7 +3312,7 @@ class _GVarDecls(dict):
         except KeyError: old_key = _notfound
         if xxx_key != old_key:
             self.__append_xxx_key_to_supp_dicts(xxx, key, xxx_key)
-            try: del self.__irename[xxx][old_key]
+            try: self.__writable(self.__irename, xxx)._del(old_key)
             except KeyError: pass
 
     #========================================================================
@@ -1985,8 +3337,8 @@ class _GVarDecls(dict):
         #--------------------------------------------------------------------
         if xxx_key in self.__irename[xxx]:
             raise RuntimeError("variable %r is already declared" % xxx_key)
-        self.__rename[xxx][key] = xxx_key
-        self.__irename[xxx][xxx_key] = key
+        self.__writable(self.__rename, xxx)._set(key, xxx_key)
+        self.__writable(self.__irename, xxx)._set(xxx_key, key)
 
     #========================================================================
     def __append_decl_to_supp_dicts(self, key, decl):
@@ -2001,8 +3353,8 @@ class _GVarDecls(dict):
         for xxx in range(0,ALL):
             if key in self.__rename[xxx]:
                 xxx_key = self.__rename[xxx][key]
-                del self.__rename[xxx][key]
-                del self.__irename[xxx][xxx_key]
+                self.__writable(self.__rename, xxx)._del(key)
+                self.__writable(self.__irename, xxx)._del(xxx_key)
 
     #========================================================================
     @staticmethod
@@ -2025,10 +3377,11 @@ class _GVarDecls(dict):
     def setdefault(self, key, value = _missing):
         if value is _missing:
             return super(_GVarDecls,self).setdefault(key)
+        elif key in self:
+            return self[key]
         else:
-            self.__ensure_not_committed()
-            value = self.__validate_value(value)
-            return super(_GVarDecls,self).setdefault(key, value)
+            self[key] = value
+            return value
 
     #========================================================================
     def update(self, *args, **kw):
@@ -2036,6 +3389,7 @@ class _GVarDecls(dict):
         _GVarDecls.__validate_values(*args,**kw)
         super(_GVarDecls,self).update(*args,**kw)
         self.__update_supp_dicts()
+        self.__add_owned_decls(dict(*args,**kw).keys())
 
     #========================================================================
     def clear(self, *args, **kw):
@@ -2060,17 +3414,50 @@ class _GVarDecls(dict):
     def copy(self):
         return _GVarDecls(self)
 
+    #========================================================================
+    def clone(self):
+        #--------------------------------------------------------------------
+        """Return a copy-on-write clone of this object.
+
+        The clone shares the declarations (`_GVarDecl` objects) and the
+        supplementary dictionaries with this object. A shared dictionary is
+        copied by the first object (this one or the clone) which modifies it
+        and a shared declaration is copied before it gets modified (for
+        example by `set_xxx_key()` or by `commit()` renaming placeholders in
+        defaults), so modifying few declarations in the clone is cheap and
+        does not affect this object (and vice versa).
+
+        The clone is committed if and only if this object is committed.
+        """
+        #--------------------------------------------------------------------
+        clone = type(self).__new__(type(self))
+        super(_GVarDecls, clone).update(self)
+        clone.__committed = self.__committed
+        clone.__default_deps = self.__default_deps
+        clone.__rename = list(self.__rename)
+        clone.__irename = list(self.__irename)
+        clone.__resubst = list(self.__resubst)
+        clone.__iresubst = list(self.__iresubst)
+        clone.__owned = set()
+        clone.__owned_decls = set()
+        self.__owned = set()
+        self.__owned_decls = set()
+        return clone
+
     #========================================================================
     def __setitem__(self, key, value):
         self.__ensure_not_committed()
-        value = self.__validate_value(value)
+        self.__validate_value(value)
+        if key in self:
+            self.__del_from_supp_dicts(key)
         self.__append_decl_to_supp_dicts(key, value)
-        return super(_GVarDecls,self).__setitem__(key, decl)
+        self.__add_owned_decls([key])
+        return super(_GVarDecls,self).__setitem__(key, value)
 
     #========================================================================
     def __delitem__(self, key):
         self.__ensure_not_committed()
-        self.__del_from_supp_ducats(key)
+        self.__del_from_supp_dicts(key)
         return super(_GVarDecls,self).__delitem__(key)
 
     #========================================================================
@@ -2084,12 +3471,14 @@ class _GVarDecls(dict):
                 selector of the corresponding namespace; one of `ENV`, `VAR` or
                 `OPT`,
         :Returns:
-            dictionary with items ``(key, xxx_key)``, where ``key`` is the key
-            from ``GVar`` namespace and ``xxx_key`` is variable name in the
-            `xxx` (`ENV`, `VAR` or `OPT`) namespace
+            read-only dictionary (`_ReadOnlyDict`) with items ``(key,
+            xxx_key)``, where ``key`` is the key from ``GVar`` namespace and
+            ``xxx_key`` is variable name in the `xxx` (`ENV`, `VAR` or `OPT`)
+            namespace; the dictionary is not copied, use its ``copy()`` to
+            get a modifiable one
         """
         #--------------------------------------------------------------------
-        return self.__rename[xxx].copy()
+        return self.__shared(self.__rename, xxx)
 
     #========================================================================
     def get_xxx_irename_dict(self, xxx):
@@ -2102,13 +3491,14 @@ class _GVarDecls(dict):
                 selector of the corresponding namespace; one of `ENV`, `VAR` or
                 `OPT`,
         :Returns:
-            dictionary with items ``(xxx_key, key)``, where ``key`` is the key
-            from ``GVar`` namespace and ``xxx_key`` is variable name in the
-            `xxx` (`ENV`, `VAR` or `OPT`) namespace
+            read-only dictionary (`_ReadOnlyDict`) with items ``(xxx_key,
+            key)``, where ``key`` is the key from ``GVar`` namespace and
+            ``xxx_key`` is variable name in the `xxx` (`ENV`, `VAR` or `OPT`)
+            namespace
 
         """
         #--------------------------------------------------------------------
-        return self.__irename[xxx].copy()
+        return self.__shared(self.__irename, xxx)
 
     #========================================================================
     def get_xxx_resubst_dict(self,xxx):
@@ -2127,14 +3517,15 @@ class _GVarDecls(dict):
                 selector of the corresponding namespace; one of `ENV`, `VAR` or
                 `OPT`,
         :Returns:
-            dictionary with items ``(key, "${" + xxx_key + "}")``, where
-            ``key`` is the key from ``GVar`` namespace and ``xxx_key`` is
-            variable name in the `xxx` (`ENV`, `VAR` or `OPT`) namespace
+            read-only dictionary (`_ReadOnlyDict`) with items ``(key, "${" +
+            xxx_key + "}")``, where ``key`` is the key from ``GVar`` namespace
+            and ``xxx_key`` is variable name in the `xxx` (`ENV`, `VAR` or
+            `OPT`) namespace
 
         """
         #--------------------------------------------------------------------
         self.__ensure_committed()
-        return self.__resubst[xxx].copy()
+        return self.__shared(self.__resubst, xxx)
 
     #========================================================================
     def get_xxx_iresubst_dict(self, xxx):
@@ -2153,14 +3544,27 @@ class _GVarDecls(dict):
                 selector of the corresponding namespace; one of `ENV`, `VAR` or
                 `OPT`,
         :Returns:
-            dictionary with items ``(xxx_key, "${" + key + "}")``, where
-            ``key`` is the key from ``GVar`` namespace and ``xxx_key`` is
-            variable name in the `xxx` (`ENV`, `VAR` or `OPT`) namespace
+            read-only dictionary (`_ReadOnlyDict`) with items ``(xxx_key,
+            "${" + key + "}")``, where ``key`` is the key from ``GVar``
+            namespace and ``xxx_key`` is variable name in the `xxx` (`ENV`,
+            `VAR` or `OPT`) namespace
 
         """
         #--------------------------------------------------------------------
         self.__ensure_committed()
-        return self.__iresubst[xxx].copy()
+        return self.__shared(self.__iresubst, xxx)
+
+    #========================================================================
+    def get_var_converters(self):
+        """Return dictionary mapping ``GVar`` keys to converters of the
+        corresponding command-line variables (only the variables having
+        converters are included)."""
+        converters = {}
+        for (k, v) in self.iteritems():
+            converter = v._get_var_converter()
+            if converter is not None:
+                converters[k] = converter
+        return converters
 
     #========================================================================
     def get_xxx_key(self, xxx, key):
@@ -2211,34 +3615,78 @@ class _GVarDecls(dict):
         """
         #--------------------------------------------------------------------
         self.__ensure_not_committed()
-        self[key]._set_xxx_key(xxx_key)
         self.__replace_xxx_key_in_supp_dicts(xxx, key, xxx_key)
+        self.__writable_decl(key)._set_xxx_key(xxx, xxx_key)
 
     #========================================================================
     def _add_to_xxx(self, xxx, *args):
         """Invoke `_GVarDecl._add_to_xxx()` for each ``GVar`` variable declared
-        in this dictionary."""
-        for (k,v) in self.iteritems(): v._add_to_xxx(xxx,*args)
+        in this dictionary. The command-line options (``xxx == OPT``) are
+        created at once by `_add_options()`."""
+        if xxx == OPT:
+            _add_options([ v._get_opt_args() for v in self.itervalues() ])
+        else:
+            for (k,v) in self.iteritems(): v._add_to_xxx(xxx,*args)
 
     #========================================================================
     def _safe_add_to_xxx(self, xxx, *args):
         """Invoke `_GVarDecl._safe_add_to_xxx()` for each ``GVar`` variable
-        declared in this dictionary."""
-        for (k,v) in self.iteritems(): v._safe_add_to_xxx(xxx, *args)
+        declared in this dictionary. The command-line options (``xxx ==
+        OPT``) are created at once by `_add_options()`."""
+        self.__safe_add_decls_to_xxx(self.itervalues(), xxx, *args)
+
+    #========================================================================
+    def __safe_add_decls_to_xxx(self, decls, xxx, *args):
+        if xxx == OPT:
+            _add_options([ v._get_opt_args() for v in decls \
+                           if v.has_xxx_decl(OPT) ])
+        elif xxx == ENV:
+            defaults = _GVarDecls.__env_defaults(decls)
+            if defaults:
+                args[0].SetDefault(**defaults)
+        else:
+            for v in decls: v._safe_add_to_xxx(xxx, *args)
+
+    #========================================================================
+    @staticmethod
+    def __env_defaults(decls):
+        """Return dictionary of default values of construction variables
+        declared by `decls`."""
+        defaults = {}
+        for v in decls:
+            if v.has_xxx_decl(ENV):
+                default = v.get_xxx_default(ENV)
+                if default is not _undef:
+                    defaults[v.get_xxx_key(ENV)] = default
+        return defaults
+
+    #========================================================================
+    def get_env_defaults(self):
+        """Return dictionary mapping keys of construction variables to their
+        default values (with placeholders renamed), as used to initialize
+        SCons environments by `add_to()`. The variables with no default
+        value are not included.
+        """
+        self.__ensure_committed()
+        return _GVarDecls.__env_defaults(self.itervalues())
 
     #========================================================================
     def _build_resubst_dicts(self):
         """Build supplementary dictionaries used to rename placeholders in
         values (forward, from ``GVar`` namespace to ``xxx`` namespaces)"""
         for xxx in range(0,ALL):
-            self.__resubst[xxx] = _build_resubst_dict(self.__rename[xxx])
+            self.__resubst[xxx] = _ReadOnlyDict(
+                    _build_resubst_dict(self.__rename[xxx]))
+            self.__owned.add((id(self.__resubst), xxx))
 
     #========================================================================
     def _build_iresubst_dicts(self):
         """Build supplementary dictionaries used to rename placeholders in
         values (inverse, from ``xxx`` namespaces to ``GVar`` namespace)"""
         for xxx in range(0,ALL):
-            self.__iresubst[xxx] = _build_iresubst_dict(self.__rename[xxx])
+            self.__iresubst[xxx] = _ReadOnlyDict(
+                    _build_iresubst_dict(self.__rename[xxx]))
+            self.__owned.add((id(self.__iresubst), xxx))
 
     #========================================================================
     def _resubst_decl_defaults(self, decl):
@@ -2259,8 +3707,38 @@ class _GVarDecls(dict):
         """Rename placeholders found in the declarations of default values of
         ``xxx`` corresponding variables for all declared ``GVar`` variables.
         """
+        for (k,v) in self.items():
+            for xxx in range(0,ALL):
+                if v.has_xxx_decl(xxx):
+                    old = v.get_xxx_default(xxx)
+                    val = _resubst(old, self.__resubst[xxx])
+                    if val is not old:
+                        v = self.__writable_decl(k)
+                        v.set_xxx_default(xxx, val)
+
+    #========================================================================
+    def __check_default_dependencies(self):
+        """Check that the default values of construction variables (``ENV``)
+        do not depend on each other circularly (e.g. ``foo='${bar}'``,
+        ``bar='${foo}'``).
+
+        Must be called before the placeholders get renamed by
+        `__resubst_defaults()`.
+
+        :Raises:
+            RuntimeError
+                if a cycle is found.
+        """
+        graph = {}
         for (k,v) in self.iteritems():
-            self._resubst_decl_defaults(v)
+            if v.has_xxx_decl(ENV):
+                graph[k] = _placeholder_names(v.get_xxx_default(ENV)) or []
+        def deps(node):
+            return [ n for n in graph[node] if n in graph ]
+        _dependency_order(sorted(graph), deps)
+        # kept for extend()
+        self.__default_deps = graph
+        self.__owned.add('deps')
 
     #========================================================================
     def __ensure_not_committed(self):
@@ -2291,6 +3769,7 @@ class _GVarDecls(dict):
         """
         #--------------------------------------------------------------------
         if not self.__committed:
+            self.__check_default_dependencies()
             self._build_resubst_dicts()
             self._build_iresubst_dicts()
             self.__resubst_defaults()
@@ -2359,6 +3838,106 @@ class _GVarDecls(dict):
         if gvars:   return _GVars(self)
         else:       return None
 
+    #========================================================================
+    def extend(self, decls, *args):
+        #--------------------------------------------------------------------
+        """Append new declarations to already committed `_GVarDecls` and
+        commit them.
+
+        Only the new declarations are processed: their names are appended to
+        the supplementary dictionaries, placeholders in their defaults are
+        renamed and the corresponding ``xxx`` variables are created for them
+        by `add_to()`-like procedure. The already committed declarations are
+        left untouched (note, that placeholders referring to the new
+        variables in their defaults are not renamed).
+
+        Nothing is modified if any of the new declarations collides with
+        already declared ``GVar`` variable (or its corresponding ``xxx``
+        variable), or if the new defaults introduce circular dependency.
+
+        :Parameters:
+            decls
+                the new declarations; a `_GVarDecls` object or anything
+                accepted by `GVarDecls()`,
+            args
+                positional arguments interpreted as in `add_to()`.
+        :Raises:
+            RuntimeError
+                if the declarations are not committed yet, when a variable is
+                already declared or when circular dependency is found.
+        """
+        #--------------------------------------------------------------------
+        self.__ensure_committed()
+        if not isinstance(decls, _GVarDecls):
+            decls = GVarDecls(decls)
+
+        # check collisions before anything gets modified
+        for key in decls:
+            if key in self:
+                raise RuntimeError("variable %r is already declared" % key)
+        renames = [ decls.get_xxx_rename_dict(xxx) for xxx in range(0,ALL) ]
+        for xxx in range(0,ALL):
+            for xxx_key in renames[xxx].itervalues():
+                if xxx_key in self.__irename[xxx]:
+                    raise RuntimeError("variable %r is already declared" \
+                                       % xxx_key)
+
+        graph = self.__default_deps
+        new_deps = {}
+        for (k,v) in decls.iteritems():
+            if v.has_xxx_decl(ENV):
+                new_deps[k] = _placeholder_names(v.get_xxx_default(ENV)) or []
+        def deps(node):
+            try:
+                names = new_deps[node]
+            except KeyError:
+                names = graph[node]
+            return [ n for n in names if n in new_deps or n in graph ]
+        _dependency_order(sorted(new_deps), deps)
+
+        # all checks passed
+        super(_GVarDecls, self).update(decls)
+        self.__add_owned_decls(decls.keys())
+        if 'deps' not in self.__owned:
+            self.__default_deps = graph = graph.copy()
+            self.__owned.add('deps')
+        graph.update(new_deps)
+        for xxx in range(0,ALL):
+            rename = renames[xxx]
+            self.__writable(self.__rename, xxx)._update(rename)
+            self.__writable(self.__irename, xxx)._update(_invert_dict(rename))
+            self.__writable(self.__resubst, xxx)._update(
+                    _build_resubst_dict(rename))
+            self.__writable(self.__iresubst, xxx)._update(
+                    _build_iresubst_dict(rename))
+        for v in decls.itervalues():
+            self._resubst_decl_defaults(v)
+        for xxx in range(0,min(len(args),ALL)):
+            if args[xxx]:
+                self.__safe_add_decls_to_xxx(decls.values(), xxx, args[xxx])
+
+    #========================================================================
+    def Extend(self, decls, env=None, variables=None, options=False,
+               gvars=True, *args):
+        """User interface to `extend()`, optionally returns newly created
+        `_GVars` object.
+
+        :Parameters:
+            decls
+                the new declarations; a `_GVarDecls` object or anything
+                accepted by `GVarDecls()`,
+            env, variables, options, gvars
+                same as in `Commit()`, but only the new declarations are
+                added to `env`, `variables` and options.
+
+        :Returns:
+            if `gvars` is ``True``, returns newly created `_GVars` object for
+            all the declarations (old and new), otherwise returns ``None``.
+        """
+        self.extend(decls, env, variables, options, *args)
+        if gvars:   return _GVars(self)
+        else:       return None
+
 #############################################################################
 def __dict_converted(convert, initializer=_missing, **kw):
     """Generic algorithm for dict initialization while converting the values
@@ -2507,6 +4086,95 @@ def GVarDeclsU(*args, **kw):
                            else GVarDeclU(*tuple(x))
     return _GVarDecls(__dict_converted(convert, *args, **kw))
 
+#############################################################################
+def SourceHash(*sources):
+    """Compute a hash identifying the source of ``GVar`` declarations, to be
+    used with `_GVars.SaveCache()` and `LoadGVars()`.
+
+    :Parameters:
+        sources
+            modules (or other objects having source file, such as functions)
+            whose source code defines the declarations, and strings which
+            determine them as well (e.g. ``repr()`` of the arguments passed to
+            ``DeclareGVars()``).
+    :Returns:
+        a hex digest of the sources.
+    """
+    import hashlib
+    import inspect
+    md5 = hashlib.md5()
+    for src in sources:
+        if not isinstance(src, basestring):
+            f = open(inspect.getsourcefile(src), 'rb')
+            try:
+                src = f.read()
+            finally:
+                f.close()
+        elif isinstance(src, unicode):
+            src = src.encode('utf-8')
+        md5.update('%d:' % len(src))
+        md5.update(src)
+    return md5.hexdigest()
+
+#############################################################################
+def LoadGVars(filename, source_hash):
+    """Load `_GVars` object from cache file written by `_GVars.SaveCache()`.
+
+    Only the namespace tables (variable names and placeholder renaming) are
+    restored. The loaded object may be used to translate names, to access
+    variables via proxies and to expand their values, but it knows neither
+    the default values, nor the converters, validators or help texts, so it
+    can't create construction variables, command-line variables or options
+    (`ApplyDefaultsTo()` and `ImportEnviron()` raise ``RuntimeError``).
+    The declaration pipeline (``Commit(env, variables, options)``) still
+    has to run wherever these are needed, typically in ``SConstruct``; the
+    cache saves it in code which needs only the names, such as helper
+    scripts run outside of the main SCons process.
+
+    **Example**::
+
+        # SConstruct: the full pipeline, the cache is refreshed if needed
+        from SConsGnu import GVars, AcDirVars
+        gvars = AcDirVars.DeclareGVars().Commit(env, variables, True)
+        gvars.SaveCache('.gvars.cache', GVars.SourceHash(GVars, AcDirVars))
+
+        # helper script: names only, no declarations processed on cache hit
+        h = GVars.SourceHash(GVars, AcDirVars)
+        gvars = GVars.LoadGVars('.gvars.cache', h)
+        if gvars is None:
+            gvars = AcDirVars.DeclareGVars().Commit()
+        env_key = gvars.env_key('bindir')
+
+    :Parameters:
+        filename
+            name of the cache file,
+        source_hash
+            hash of the declaration source, see `SourceHash()`.
+    :Returns:
+        the `_GVars` object or ``None`` if the file does not exist, it's
+        invalid or it was saved with different `source_hash`.
+    """
+    import marshal
+    try:
+        f = open(filename, 'rb')
+        try:
+            data = f.read()
+        finally:
+            f.close()
+    except IOError:
+        return None
+    if not data.startswith(_gvars_cache_header):
+        return None
+    try:
+        data = marshal.loads(data[len(_gvars_cache_header):])
+    except (EOFError, ValueError, TypeError):
+        return None
+    if not isinstance(data, tuple) or len(data) != 6 \
+       or data[0] != source_hash:
+        return None
+    gvars = _GVars(None)
+    gvars._set_tables(data[1:])
+    return gvars
 
 # Local Variables:
 # # tab-width:4
@@ -0,0 +1,221 @@
+"""`SConsGnu.Probes`
+
+Run commands probing the programs (``--version`` queries, feature checks
+and alike) with optional record and replay.
+
+The mode is selected with ``GNUBLD_PROBE_MODE`` construction variable:
+
+    - ``None`` (default) - just run the commands,
+    - ``'record'`` - run the commands and store their argv, digest of
+      input, output and exit status in journal (replacing the record
+      stored earlier for the same argv and input),
+    - ``'replay'`` - answer from journal without spawning any process, run
+      the command only if it's not found in journal.
+
+The journal file is given by ``GNUBLD_PROBE_JOURNAL`` (defaults to
+``.scons.probe.journal``). It's a text file with one JSON record per line.
+
+The scratch files passed to commands (see the **files** argument of
+`run_probe()`) are identified in journal by their base names and contents,
+not by their (usually random) paths.
+
+**Example**::
+
+    env = Environment(GNUBLD_PROBE_MODE = 'replay')
+"""
+
+#
+# Copyright (c) 2012-2014 by Pawel Tomulik
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE
+
+
+__docformat__ = "restructuredText"
+
+from SCons.Action import _subproc
+from subprocess import PIPE
+from SConsGnu.Common import get_probe_mode, get_probe_journal
+import os
+import errno
+import hashlib
+import json
+
+#############################################################################
+class _Journal(object):
+    """Journal of probe commands, their input digests and outcomes."""
+    def __init__(self, path):
+        self.path = path
+        self.__entries = None
+
+    def __load(self):
+        self.__entries = {}
+        try:
+            f = open(self.path, 'r')
+        except IOError:
+            return
+        with f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue # ignore damaged (e.g. truncated) records
+                out = rec.get('stdout')
+                if out is not None:
+                    out = out.encode('latin-1')
+                key = self.__key(rec.get('argv'), rec.get('stdin'))
+                self.__entries[key] = (rec.get('status'), out)
+
+    def __key(self, argv, digest):
+        return (tuple(argv), digest)
+
+    def lookup(self, argv, digest):
+        """Return ``(status, out)`` recorded for **argv** and **digest**, or
+        ``None`` if not found."""
+        if self.__entries is None:
+            self.__load()
+        return self.__entries.get(self.__key(argv, digest))
+
+    @staticmethod
+    def __record(key, entry):
+        (argv, digest), (status, out) = key, entry
+        if out is not None:
+            out = out.decode('latin-1')
+        rec = { 'argv' : list(argv), 'stdin' : digest, 'stdout' : out,
+                'status' : status }
+        return json.dumps(rec, sort_keys = True) + '\n'
+
+    def store(self, argv, digest, status, out):
+        """Store record in journal. A new record is appended to the file;
+        if there was a record for the same **argv** and **digest**, the
+        journal file is rewritten, so it holds one record per probe."""
+        if self.__entries is None:
+            self.__load()
+        key = self.__key(argv, digest)
+        entry = (status, out)
+        old = self.__entries.get(key)
+        self.__entries[key] = entry
+        if old is None:
+            with open(self.path, 'a') as f:
+                f.write(self.__record(key, entry))
+        elif old != entry:
+            tmp = self.path + '.tmp'
+            with open(tmp, 'w') as f:
+                for k in sorted(self.__entries):
+                    f.write(self.__record(k, self.__entries[k]))
+            os.rename(tmp, self.path)
+
+#############################################################################
+_journals = {}
+
+#############################################################################
+def _get_journal(path):
+    path = os.path.abspath(path)
+    try:
+        return _journals[path]
+    except KeyError:
+        journal = _Journal(path)
+        _journals[path] = journal
+        return journal
+
+#############################################################################
+def _digest(input, files = ()):
+    if input is None and not files:
+        return None
+    h = hashlib.sha1(input or '')
+    for path in files:
+        with open(path, 'rb') as f:
+            content = f.read()
+        h.update('\0%s\0%d\0' % (os.path.basename(path), len(content)))
+        h.update(content)
+    return h.hexdigest()
+
+#############################################################################
+def _journal_argv(argv, files):
+    """Return **argv** with paths of scratch **files** replaced by
+    ``<scratch>/basename``, such that it doesn't depend on the location of
+    the scratch directory."""
+    if not files:
+        return argv
+    names = dict([ (path, '<scratch>/' + os.path.basename(path))
+                   for path in files ])
+    return [ names.get(arg, arg) for arg in argv ]
+
+#############################################################################
+def _run_live(env, argv, input):
+    proc = _subproc(env, argv, 'raise', stdin = PIPE, stdout = PIPE)
+    # we ignore stderr; probes look at stdout and exit status only
+    out, err = proc.communicate(input)
+    return proc.wait(), out
+
+#############################################################################
+def run_probe(env, cmd, input = None, files = None):
+    """Run probe command **cmd**, feeding it with **input**.
+
+    :Parameters:
+        env
+            SCons environment object,
+        cmd
+            the command to run (list of arguments or `CLVar`),
+        input
+            a string to be passed to command's standard input,
+        files
+            list of paths of scratch files (e.g. scripts) passed as
+            arguments in **cmd**; in journal they are identified by their
+            base names and contents instead of paths.
+    :Returns:
+        tuple ``(status, out)``, where ``status`` is the exit status and
+        ``out`` is the standard output of the command.
+    :Raises:
+        EnvironmentError if the command could not be started (also in replay
+        mode, if this was recorded).
+    """
+    argv = [ str(arg) for arg in cmd ]
+    mode = get_probe_mode(env)
+    if not mode:
+        return _run_live(env, argv, input)
+    elif mode not in ('record', 'replay'):
+        raise ValueError("unsupported probe mode %r" % mode)
+
+    journal = _get_journal(get_probe_journal(env))
+    if files:
+        files = [ str(path) for path in files ]
+    key_argv = _journal_argv(argv, files)
+    digest = _digest(input, files or ())
+    if mode == 'replay':
+        entry = journal.lookup(key_argv, digest)
+        if entry is None:
+            return _run_live(env, argv, input)
+        status, out = entry
+        if status is None:
+            raise OSError(errno.ENOENT, os.strerror(errno.ENOENT), argv[0])
+        return status, out
+
+    try:
+        status, out = _run_live(env, argv, input)
+    except EnvironmentError:
+        journal.store(key_argv, digest, None, None)
+        raise
+    journal.store(key_argv, digest, status, out)
+    return status, out
+
+# Local Variables:
+# # tab-width:4
+# # indent-tabs-mode:nil
+# # End:
+# vim: set syntax=python expandtab tabstop=4 shiftwidth=4:
@@ -0,0 +1,80 @@
+"""Benchmark: recreating `SConsGnu.GVars._GVars` from a cache file.
+
+Compares the declaration pipeline (``DeclareGVars()`` of `AcDirVars`,
+`AcProgVars` and `CcVars` followed by ``Commit()``) with `LoadGVars()`
+reading the namespace tables saved by `_GVars.SaveCache()`.
+
+Usage (SCons engine must be importable)::
+
+    PYTHONPATH=/path/to/scons/engine python bench/SConsGnu/GVars/cache.py
+"""
+
+#
+# Copyright (c) 2012-2014 by Pawel Tomulik
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE
+
+
+__docformat__ = "restructuredText"
+
+import os
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+
+from SConsGnu import GVars, AcDirVars, AcProgVars, CcVars
+
+NUMBER = 50
+REPEAT = 3
+
+def declare():
+    decls = AcDirVars.DeclareGVars()
+    decls.update(AcProgVars.DeclareGVars())
+    decls.update(CcVars.DeclareGVars())
+    return decls.Commit()
+
+def main():
+    source_hash = GVars.SourceHash(GVars, AcDirVars, AcProgVars, CcVars)
+    fd, filename = tempfile.mkstemp(suffix = '.cache')
+    os.close(fd)
+    try:
+        gvars = declare()
+        gvars.SaveCache(filename, source_hash)
+        loaded = GVars.LoadGVars(filename, source_hash)
+        assert loaded._get_tables() == gvars._get_tables()
+        print "%d variables, %d bytes of cache" \
+            % (len(gvars.get_keys()), os.path.getsize(filename))
+        for name, fun in (('declare', declare),
+                          ('load', lambda: GVars.LoadGVars(filename,
+                                                           source_hash))):
+            t = min(timeit.repeat(fun, number = NUMBER, repeat = REPEAT))
+            print "%s: %8.4fms" % (name, 1000.0 * t / NUMBER)
+    finally:
+        os.remove(filename)
+
+if __name__ == '__main__':
+    main()
+
+# Local Variables:
+# # tab-width:4
+# # indent-tabs-mode:nil
+# # End:
+# vim: set syntax=python expandtab tabstop=4 shiftwidth=4:
@@ -0,0 +1,76 @@
+"""Benchmark: `SConsGnu.GVars._GVarDecls.clone` with 10k declarations.
+
+Compares ``copy()`` with the copy-on-write ``clone()`` followed by changing
+the key of few variables, as done for per-variant builds. Note, that
+``copy()`` shares the `_GVarDecl` objects, so the changes made to a copy are
+visible in the original declarations too.
+
+Usage (SCons engine must be importable)::
+
+    PYTHONPATH=/path/to/scons/engine python bench/SConsGnu/GVars/clone.py
+"""
+
+#
+# Copyright (c) 2012-2014 by Pawel Tomulik
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE
+
+
+__docformat__ = "restructuredText"
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+
+from SConsGnu.GVars import GVarDeclsU, ENV
+
+NUM_VARS = 10000
+NUM_TWEAKS = 5
+NUMBER = 30
+REPEAT = 3
+
+decls = GVarDeclsU(**dict(('v%d' % i, { 'env_key' : 'ENV_V%d' % i,
+                                        'var_key' : 'VAR_V%d' % i,
+                                        'default' : '${v%d}/x' % (i+1) })
+                          for i in range(NUM_VARS)))
+
+def variant(clone):
+    for i in range(NUM_TWEAKS):
+        clone.set_xxx_key(ENV, 'v%d' % i, 'VARIANT_V%d' % i)
+    return clone
+
+def main():
+    assert variant(decls.copy()).get_xxx_rename_dict(ENV) == \
+           variant(decls.clone()).get_xxx_rename_dict(ENV)
+    print "%d declarations, %d variants" % (NUM_VARS, NUMBER)
+    for name, fun in (('copy', lambda: variant(decls.copy())),
+                      ('clone', lambda: variant(decls.clone()))):
+        t = min(timeit.repeat(fun, number = NUMBER, repeat = REPEAT))
+        print "%s: %8.4fs" % (name, t)
+
+if __name__ == '__main__':
+    main()
+
+# Local Variables:
+# # tab-width:4
+# # indent-tabs-mode:nil
+# # End:
+# vim: set syntax=python expandtab tabstop=4 shiftwidth=4:
@@ -0,0 +1,83 @@
+"""Benchmark: initializing many environments with defaults of `GVar`
+variables.
+
+Compares committing the declarations (``add_to(env)``) to each of the
+cloned environments with single `_GVars.ApplyDefaultsTo()` call.
+
+Usage (SCons engine must be importable)::
+
+    PYTHONPATH=/path/to/scons/engine python bench/SConsGnu/GVars/defaults.py
+"""
+
+#
+# Copyright (c) 2012-2014 by Pawel Tomulik
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE
+
+
+__docformat__ = "restructuredText"
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+
+from SCons.Environment import Environment
+from SConsGnu import AcDirVars, AcProgVars, CcVars
+from SConsGnu.GVars import ENV
+
+NUM_ENVS = 30
+NUMBER = 10
+REPEAT = 3
+
+decls = AcDirVars.DeclareGVars()
+decls.update(AcProgVars.DeclareGVars())
+decls.update(CcVars.DeclareGVars())
+base = Environment(tools = [])
+gvars = decls.Commit(base)
+
+def per_declaration(envs):
+    # what add_to() did before, one SetDefault() per declaration
+    for env in envs:
+        for v in decls.itervalues():
+            v._safe_add_to_xxx(ENV, env)
+
+def bulk(envs):
+    gvars.ApplyDefaultsTo(envs)
+
+def main():
+    envs = [ Environment(tools = []) for i in range(NUM_ENVS) ]
+    per_declaration(envs[:1])
+    bulk(envs[1:2])
+    assert envs[0].Dictionary() == envs[1].Dictionary()
+    print "%d variables, %d environments" % (len(decls), NUM_ENVS)
+    for name, fun in (('per declaration', per_declaration), ('bulk', bulk)):
+        t = min(timeit.repeat(lambda: fun(envs), number = NUMBER,
+                              repeat = REPEAT))
+        print "%s: %8.4fms" % (name, 1000.0 * t / NUMBER)
+
+if __name__ == '__main__':
+    main()
+
+# Local Variables:
+# # tab-width:4
+# # indent-tabs-mode:nil
+# # End:
+# vim: set syntax=python expandtab tabstop=4 shiftwidth=4:
@@ -0,0 +1,73 @@
+"""Benchmark: `SConsGnu.GVars._GVars.ExpandValues` on the directory variables
+from `SConsGnu.AcDirVars`.
+
+Compares plain ``env.subst('${dir}')`` with memoized `_GVars.ExpandValues()`
+for repeated lookups, e.g. by builders asking for install paths.
+
+Usage (SCons engine must be importable)::
+
+    PYTHONPATH=/path/to/scons/engine python bench/SConsGnu/GVars/expand.py
+"""
+
+#
+# Copyright (c) 2012-2014 by Pawel Tomulik
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE
+
+
+__docformat__ = "restructuredText"
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+
+from SCons.Environment import Environment
+from SConsGnu import AcDirVars
+
+NUMBER = 100
+REPEAT = 3
+
+env = Environment(tools = [])
+gvars = AcDirVars.DeclareGVars().Commit(env)
+keys = gvars.get_keys()
+
+def expand_subst(gvars, env):
+    return dict((k, env.subst('${%s}' % gvars.env_key(k))) for k in keys)
+
+def expand_memo(gvars, env):
+    return gvars.ExpandValues(env, keys)
+
+def main():
+    assert expand_subst(gvars, env) == expand_memo(gvars, env)
+    print "%d variables, %d lookups" % (len(keys), NUMBER)
+    for name, fun in (('subst', expand_subst), ('memo', expand_memo)):
+        t = min(timeit.repeat(lambda: fun(gvars, env),
+                              number = NUMBER, repeat = REPEAT))
+        print "%s: %8.4fs" % (name, t)
+
+if __name__ == '__main__':
+    main()
+
+# Local Variables:
+# # tab-width:4
+# # indent-tabs-mode:nil
+# # End:
+# vim: set syntax=python expandtab tabstop=4 shiftwidth=4:
@@ -0,0 +1,101 @@
+"""Benchmark: memory taken by 10k `SConsGnu.GVars._GVarDecl` declarations.
+
+Uses ``tracemalloc`` when available. Python 2 has no ``tracemalloc``, so
+there the memory is estimated by summing ``sys.getsizeof()`` over all the
+objects reachable from the declarations (shared objects, such as interned
+strings, counted once); the number of objects tracked by the garbage
+collector is reported as well.
+
+Usage (SCons engine must be importable)::
+
+    PYTHONPATH=/path/to/scons/engine python bench/SConsGnu/GVars/memory.py
+"""
+
+#
+# Copyright (c) 2012-2014 by Pawel Tomulik
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE
+
+
+__docformat__ = "restructuredText"
+
+import gc
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+
+from SConsGnu.GVars import GVarDeclsU
+
+NUM_VARS = 10000
+
+def declare():
+    return GVarDeclsU(**dict(('v%d' % i, { 'env_key' : 'ENV_V%d' % i,
+                                           'var_key' : 'VAR_V%d' % i,
+                                           'opt_key' : 'opt_v%d' % i,
+                                           'option' : '--v%d' % i,
+                                           'help' : 'help for v%d' % i,
+                                           'default' : '${v%d}/x' % (i+1) })
+                             for i in range(NUM_VARS)))
+
+def deep_size(root, seen):
+    size = 0
+    stack = [ root ]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, type):
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        stack.extend(gc.get_referents(obj))
+    return size
+
+def main():
+    try:
+        import tracemalloc
+    except ImportError:
+        tracemalloc = None
+    if tracemalloc:
+        tracemalloc.start()
+        decls = declare()
+        current, peak = tracemalloc.get_traced_memory()
+        print "%d declarations: %d bytes (peak %d bytes)" % (NUM_VARS, current, peak)
+        return
+    gc.collect()
+    nobjs = len(gc.get_objects())
+    decls = declare()
+    gc.collect()
+    nobjs = len(gc.get_objects()) - nobjs
+    seen = set()
+    decl_size = sum(deep_size(d, seen) for d in decls.itervalues())
+    total_size = decl_size + deep_size(decls, seen)
+    print "%d declarations" % NUM_VARS
+    print "_GVarDecl objects: %8d bytes (%d per declaration)" \
+            % (decl_size, decl_size / NUM_VARS)
+    print "_GVarDecls total:  %8d bytes" % total_size
+    print "gc tracked objects: %d" % nobjs
+
+if __name__ == '__main__':
+    main()
+
+# Local Variables:
+# # tab-width:4
+# # indent-tabs-mode:nil
+# # End:
+# vim: set syntax=python expandtab tabstop=4 shiftwidth=4:
@@ -0,0 +1,85 @@
+"""Benchmark: `SConsGnu.GVars._GVars.Postprocess` with 10k variables.
+
+Compares the fused `_GVars.Postprocess()` with the former sequence of
+``GetCurrentValues()``, ``UpdateEnvironment()``, ``GetAltered()`` and
+``ReplaceUnaltered()``.
+
+Usage (SCons engine must be importable)::
+
+    PYTHONPATH=/path/to/scons/engine python bench/SConsGnu/GVars/postprocess.py
+"""
+
+#
+# Copyright (c) 2012-2014 by Pawel Tomulik
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE
+
+
+__docformat__ = "restructuredText"
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+
+from SConsGnu.GVars import GVarDeclsU
+
+NUM_VARS = 10000
+REPEAT = 3
+
+decls = dict(('v%d' % i, { 'env_key' : 'ENV_V%d' % i,
+                           'var_key' : 'VAR_V%d' % i })
+             for i in range(NUM_VARS))
+gvars = GVarDeclsU(**decls).Commit()
+
+# every third value refers to another variable, others are plain strings
+env0 = dict(('ENV_V%d' % i, ('${ENV_V%d}/sub' if i % 3 == 0 else '/usr/v%d')
+                            % (i+1)) for i in range(NUM_VARS))
+ose = dict(('v%d' % i, 'ose${v%d}' % i) for i in range(0, NUM_VARS, 3))
+
+def postprocess_old(gvars, env, ose):
+    """The former implementation of _GVars.Postprocess()"""
+    org = gvars.GetCurrentValues(env)
+    gvars.UpdateEnvironment(env)
+    alt = gvars.GetAltered(env, org)
+    alt.update(gvars.ReplaceUnaltered(env, org, ose))
+    return alt
+
+def postprocess_new(gvars, env, ose):
+    return gvars.Postprocess(env, ose = ose)
+
+def main():
+    env1, env2 = env0.copy(), env0.copy()
+    assert postprocess_old(gvars, env1, ose) == postprocess_new(gvars, env2, ose)
+    assert env1 == env2
+    print "%d variables" % NUM_VARS
+    for name, fun in (('old', postprocess_old), ('new', postprocess_new)):
+        t = min(timeit.repeat(lambda: fun(gvars, env0.copy(), ose),
+                              number = 1, repeat = REPEAT))
+        print "%s: %8.4fs" % (name, t)
+
+if __name__ == '__main__':
+    main()
+
+# Local Variables:
+# # tab-width:4
+# # indent-tabs-mode:nil
+# # End:
+# vim: set syntax=python expandtab tabstop=4 shiftwidth=4:
@@ -0,0 +1,82 @@
+"""Microbenchmark: placeholder renaming in `SConsGnu.GVars`.
+
+Compares the former ``string.Template`` based implementation of
+``_resubst()`` with the `_Renamer` object, for a resubst dictionary with
+2000 entries.
+
+Usage (SCons engine must be importable)::
+
+    PYTHONPATH=/path/to/scons/engine python bench/SConsGnu/GVars/resubst.py
+"""
+
+#
+# Copyright (c) 2012-2014 by Pawel Tomulik
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE
+
+
+__docformat__ = "restructuredText"
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+
+from SConsGnu import GVars
+
+def _resubst_template(value, resubst_dict = {}):
+    """The former implementation of GVars._resubst()"""
+    from string import Template
+    from SCons.Util import is_String
+    if is_String(value):
+        return Template(value).safe_substitute(**resubst_dict)
+    else:
+        return value
+
+NUM_VARS = 2000
+NUMBER = 20000
+
+resubst = dict(('var%d' % i, '${ENV_VAR%d}' % i) for i in range(NUM_VARS))
+renamer = GVars._Renamer(resubst)
+
+values = {
+    'plain'       : '/usr/local/share/doc',
+    'placeholder' : '${var1}/share/${var1999}',
+}
+
+def main():
+    print "%d variables, %d calls per case" % (NUM_VARS, NUMBER)
+    for name, value in sorted(values.items()):
+        assert _resubst_template(value, resubst) == renamer(value)
+        old = min(timeit.repeat(lambda: _resubst_template(value, resubst),
+                                number = NUMBER, repeat = 3))
+        new = min(timeit.repeat(lambda: renamer(value),
+                                number = NUMBER, repeat = 3))
+        print "%-12s Template: %8.4fs  _Renamer: %8.4fs  (x%.1f)" \
+            % (name, old, new, old / new)
+
+if __name__ == '__main__':
+    main()
+
+# Local Variables:
+# # tab-width:4
+# # indent-tabs-mode:nil
+# # End:
+# vim: set syntax=python expandtab tabstop=4 shiftwidth=4:
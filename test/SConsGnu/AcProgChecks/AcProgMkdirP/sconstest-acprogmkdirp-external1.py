@@ -0,0 +1,58 @@
+#
+# Copyright (c) 2012-2014 by Pawel Tomulik
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE
+
+__docformat__ = "restructuredText"
+
+"""
+TODO: write description
+"""
+
+import TestSCons
+
+##############################################################################
+#
+##############################################################################
+test = TestSCons.TestSCons()
+test.dir_fixture('../../../../SConsGnu', 'site_scons/SConsGnu')
+test.write('SConstruct',
+"""
+# SConstruct
+from SConsGnu import AcProgChecks
+env = Environment()               # create an environment
+cfg = Configure(env)              # create SConf object
+cfg.AddTests(AcProgChecks.Tests()) # add tests for alternative programs
+prog = cfg.AcProgMkdirP(external = True) # look for external mkdir -p
+env = cfg.Finish()                # finish configuration
+print "mkdir_p: %r" % prog        # print the returned value
+""")
+
+test.run()
+test.must_contain_all_lines(test.stdout(), [
+    'Checking for a thread-safe mkdir -p... ',
+    'mkdir_p: [\'/'
+])
+test.pass_test()
+
+# Local Variables:
+# # tab-width:4
+# # indent-tabs-mode:nil
+# # End:
+# vim: set syntax=python expandtab tabstop=4 shiftwidth=4:
@@ -0,0 +1,277 @@
+""" SConsGnu.AcProgChecksTests
+
+Unit tests for SConsGnu.AcProgChecks
+"""
+
+__docformat__ = "restructuredText"
+
+#
+# Copyright (c) 2012-2014 by Pawel Tomulik
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE
+
+
+import unittest
+import tempfile, shutil, os
+from SConsGnu import AcProgChecks
+from mock import Mock, patch
+
+#############################################################################
+class Test_InstallCapabilities(unittest.TestCase):
+    def test___init___1(self):
+        """AcProgChecks.InstallCapabilities() should have all features disabled"""
+        caps = AcProgChecks.InstallCapabilities()
+        self.assertFalse(caps.multiple_files)
+        self.assertFalse(caps.leading_dirs)
+        self.assertFalse(caps.target_directory)
+        self.assertFalse(caps.preserve_timestamps)
+        self.assertFalse(caps.compare)
+
+    def test___eq___1(self):
+        """InstallCapabilities objects with same features should compare equal"""
+        caps1 = AcProgChecks.InstallCapabilities(True, compare = True)
+        caps2 = AcProgChecks.InstallCapabilities(True, compare = True)
+        caps3 = AcProgChecks.InstallCapabilities(True)
+        self.assertEqual(caps1, caps2)
+        self.assertNotEqual(caps1, caps3)
+
+    def test_batch_command_1(self):
+        """InstallCapabilities().batch_command(...) should be None"""
+        caps = AcProgChecks.InstallCapabilities()
+        self.assertIsNone(caps.batch_command(['install', '-c'], ['a', 'b'], 'd'))
+
+    def test_batch_command_2(self):
+        """InstallCapabilities(multiple_files = True).batch_command(...) should put dir last"""
+        caps = AcProgChecks.InstallCapabilities(multiple_files = True)
+        cmd = caps.batch_command(['install', '-c'], ['a', 'b'], 'd')
+        self.assertEqual(cmd, ['install', '-c', 'a', 'b', 'd'])
+
+    def test_batch_command_3(self):
+        """InstallCapabilities(target_directory = True).batch_command(...) should use -t"""
+        caps = AcProgChecks.InstallCapabilities(True, target_directory = True)
+        cmd = caps.batch_command(['install', '-c'], ['a', 'b'], 'd')
+        self.assertEqual(cmd, ['install', '-c', '-t', 'd', 'a', 'b'])
+
+#############################################################################
+class Test_MkdirP(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test__mkdir_p_func_1(self):
+        """AcProgChecks._mkdir_p_func(dir) should create dir with parents"""
+        path = os.path.join(self.tmpdir, 'a', 'b', 'c')
+        AcProgChecks._mkdir_p_func(path)
+        self.assertTrue(os.path.isdir(path))
+
+    def test__mkdir_p_func_2(self):
+        """AcProgChecks._mkdir_p_func(dir) should tolerate existing dir"""
+        path = os.path.join(self.tmpdir, 'a', 'b')
+        AcProgChecks._mkdir_p_func([path, path])
+        AcProgChecks._mkdir_p_func(path)
+        self.assertTrue(os.path.isdir(path))
+
+    def test__mkdir_p_func_3(self):
+        """AcProgChecks._mkdir_p_func(file) should raise OSError"""
+        path = os.path.join(self.tmpdir, 'f')
+        open(path, 'w').close()
+        self.assertRaises(OSError, AcProgChecks._mkdir_p_func, path)
+
+    def test_AcProgMkdirP_1(self):
+        """AcProgChecks.AcProgMkdirP(context) should return MkdirP"""
+        context = Mock(name = 'context')
+        self.assertIs(AcProgChecks.AcProgMkdirP(context), AcProgChecks.MkdirP)
+        self.assertFalse(context.TryAction.called)
+
+    def test_AcProgMkdirP_2(self):
+        """AcProgChecks.AcProgMkdirP(context, selection, external = False) should return CLVar(selection)"""
+        from SCons.Util import CLVar
+        context = Mock(name = 'context')
+        prog = AcProgChecks.AcProgMkdirP(context, '/usr/bin/mkdir -p', external = False)
+        self.assertIsInstance(prog, CLVar)
+        self.assertEqual(prog, ['/usr/bin/mkdir', '-p'])
+        context.Result.assert_called_once_with('/usr/bin/mkdir -p')
+        self.assertFalse(context.TryAction.called)
+
+#############################################################################
+class Test_scratch_dir(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _env(self, scratch):
+        env = Mock(name = 'env')
+        env.has_key = Mock(name = 'has_key', return_value = True)
+        env.subst = Mock(name = 'subst', return_value = scratch)
+        return env
+
+    def test_scratch_dir_1(self):
+        """AcProgChecks.scratch_dir(env) should use $GNUBLD_SCRATCH_DIR"""
+        env = self._env(self.tmpdir)
+        with AcProgChecks.scratch_dir(env) as path:
+            self.assertTrue(os.path.isdir(path))
+            self.assertEqual(os.path.dirname(path), self.tmpdir)
+
+    def test_scratch_dir_2(self):
+        """AcProgChecks.scratch_dir(env) should remove the directory with its content"""
+        env = self._env(self.tmpdir)
+        with AcProgChecks.scratch_dir(env) as path:
+            os.mkdir(os.path.join(path, 'sub'))
+            open(os.path.join(path, 'sub', 'file'), 'w').close()
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(os.listdir(self.tmpdir), [])
+
+    def test_scratch_dir_3(self):
+        """AcProgChecks.scratch_dir(env, fallback) should use fallback if $GNUBLD_SCRATCH_DIR does not exist"""
+        env = self._env(os.path.join(self.tmpdir, 'nonexistent'))
+        with AcProgChecks.scratch_dir(env, self.tmpdir) as path:
+            self.assertEqual(os.path.dirname(path), self.tmpdir)
+
+#############################################################################
+class Test__ProgSed(unittest.TestCase):
+    def setUp(self):
+        from SConsGnu import Probes
+        self.tmpdir = tempfile.mkdtemp()
+        bindir = os.path.join(self.tmpdir, 'bin')
+        os.mkdir(bindir)
+        sed = os.path.join(bindir, 'sed')
+        open(sed, 'w').close()
+        os.chmod(sed, 0755)
+        self.bindir = bindir
+        Probes._journals.clear()
+
+    def tearDown(self):
+        from SConsGnu import Probes
+        Probes._journals.clear()
+        shutil.rmtree(self.tmpdir)
+
+    def _run(self, mode):
+        from SCons.Environment import Environment
+        env = Environment(tools = [], ENV = { 'PATH' : self.bindir },
+                          GNUBLD_PROBE_MODE = mode,
+                          GNUBLD_PROBE_JOURNAL = os.path.join(self.tmpdir, 'journal'),
+                          GNUBLD_SCRATCH_DIR = self.tmpdir)
+        target = [ env.File(os.path.join(self.tmpdir, 'conftest.out')) ]
+        return AcProgChecks._ProgSed(None)(target, [], env)
+
+    @staticmethod
+    def _sed(env, argv, input):
+        if argv[1:] == ['--version']:
+            return 0, 'sed version 4.2\n'
+        return 0, input
+
+    def test_replay(self):
+        """AcProgChecks._ProgSed(...) should be replayed from journal"""
+        from SConsGnu import Probes
+        with patch('SConsGnu.Probes._run_live', side_effect = self._sed) as live:
+            self.assertEqual(self._run('record'), 0)
+            self.assertTrue(live.called)
+        with open(os.path.join(self.tmpdir, 'journal')) as f:
+            records = len(f.readlines())
+        Probes._journals.clear()
+        with patch('SConsGnu.Probes._run_live', side_effect = self._sed) as live:
+            self.assertEqual(self._run('replay'), 0)
+            self.assertFalse(live.called)
+        Probes._journals.clear()
+        with patch('SConsGnu.Probes._run_live', side_effect = self._sed) as live:
+            self._run('record')
+        with open(os.path.join(self.tmpdir, 'journal')) as f:
+            self.assertEqual(len(f.readlines()), records)
+
+#############################################################################
+class Test_memoize_prog_check(unittest.TestCase):
+    def setUp(self):
+        AcProgChecks.InvalidateProgChecks()
+        self.calls = []
+        def AcDummy(context, selection=None, programs=None):
+            self.calls.append((selection, programs))
+            context.Display("Checking for dummy... ")
+            context.Result("found")
+            return ['dummy']
+        self.check = AcProgChecks._memoize_prog_check(AcDummy)
+
+    def tearDown(self):
+        AcProgChecks.InvalidateProgChecks()
+
+    def _context(self, path = '/bin'):
+        context = Mock(name = 'context')
+        context.env = { 'ENV' : { 'PATH' : path } }
+        return context
+
+    def test_memo_1(self):
+        """_memoize_prog_check(check) should run check once for same arguments"""
+        self.check(self._context(), programs = ['a'])
+        self.check(self._context(), None, ['a'])
+        self.assertEqual(self.calls, [(None, ['a'])])
+
+    def test_memo_2(self):
+        """_memoize_prog_check(check) should replay Display and Result messages"""
+        self.check(self._context())
+        context = self._context()
+        self.check(context)
+        context.Display.assert_called_once_with("Checking for dummy... ")
+        context.Result.assert_called_once_with("found")
+
+    def test_memo_3(self):
+        """_memoize_prog_check(check) should return a copy of memoized result"""
+        self.check(self._context()).append('x')
+        self.assertEqual(self.check(self._context()), ['dummy'])
+
+    def test_memo_4(self):
+        """_memoize_prog_check(check) should rerun check for different arguments or PATH"""
+        self.check(self._context())
+        self.check(self._context(), programs = ['a'])
+        self.check(self._context('/usr/bin'))
+        self.assertEqual(len(self.calls), 3)
+
+    def test_InvalidateProgChecks_1(self):
+        """AcProgChecks.InvalidateProgChecks(['AcDummy']) should force check to rerun"""
+        self.check(self._context())
+        AcProgChecks.InvalidateProgChecks(['AcOther'])
+        self.check(self._context())
+        AcProgChecks.InvalidateProgChecks(['AcDummy'])
+        self.check(self._context())
+        self.assertEqual(len(self.calls), 2)
+
+#############################################################################
+if __name__ == "__main__":
+    ldr = unittest.TestLoader()
+    suite = unittest.TestSuite()
+    # Load tests to test suite
+    tclasses = [ Test_InstallCapabilities
+               , Test_MkdirP
+               , Test_scratch_dir
+               , Test__ProgSed
+               , Test_memoize_prog_check ]
+
+    for tclass in tclasses:
+        suite.addTests(ldr.loadTestsFromTestCase(tclass))
+
+    if not unittest.TextTestRunner(verbosity = 2).run(suite).wasSuccessful():
+        sys.exit(1)
+
+# Local Variables:
+# # tab-width:4
+# # indent-tabs-mode:nil
+# # End:
+# vim: set syntax=python expandtab tabstop=4 shiftwidth=4:
@@ -0,0 +1,130 @@
+""" SConsGnu.GConfigTests
+
+Unit tests for SConsGnu.GConfig
+"""
+
+__docformat__ = "restructuredText"
+
+#
+# Copyright (c) 2012-2014 by Pawel Tomulik
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+from SConsGnu import GConfig
+from SConsGnu.GVars import GVarDecls
+from mock import Mock
+
+#############################################################################
+class Test__toolchain_fingerprint(unittest.TestCase):
+    def test_toolchain_fingerprint(self):
+        """_toolchain_fingerprint(env) should depend on tools and PATH"""
+        from SCons.Environment import Environment
+        env = Environment(tools = [], ENV = { 'PATH' : '/bin' }, CC = 'cc')
+        fp = GConfig._toolchain_fingerprint(env)
+        self.assertEqual(GConfig._toolchain_fingerprint(env.Clone()), fp)
+        self.assertNotEqual(GConfig._toolchain_fingerprint(env.Clone(CC = 'gcc')), fp)
+        self.assertNotEqual(GConfig._toolchain_fingerprint(env.Clone(ENV = { 'PATH' : '/usr/bin' })), fp)
+        self.assertEqual(GConfig._toolchain_fingerprint(env.Clone(FOO = 'foo')), fp)
+
+#############################################################################
+class Test__checks_fingerprint(unittest.TestCase):
+    def test_checks_fingerprint(self):
+        """_checks_fingerprint(custom_tests) should depend on names of checks"""
+        def CheckFoo(context): pass
+        fp = GConfig._checks_fingerprint({ 'CheckFoo' : CheckFoo })
+        self.assertEqual(GConfig._checks_fingerprint({ 'CheckFoo' : CheckFoo }), fp)
+        self.assertNotEqual(GConfig._checks_fingerprint({}), fp)
+        self.assertNotEqual(GConfig._checks_fingerprint({ 'CheckBar' : CheckFoo }), fp)
+        # checks without source file
+        GConfig._checks_fingerprint({ 'CheckLen' : len })
+
+#############################################################################
+class Test__GConfig(unittest.TestCase):
+    def setUp(self):
+        from SCons.Environment import Environment
+        self.tmpdir = tempfile.mkdtemp()
+        fpfile = os.path.join(self.tmpdir, 'config.fingerprint')
+        self.env = Environment(tools = [], GNUBLD_CONFIG_FINGERPRINT = fpfile)
+        self.env.Configure = Mock(name = 'Configure')
+        self.env.Configure.return_value.Finish.return_value = self.env
+        decls = GVarDecls(foo = ({'ENV_FOO' : 'foo'}, None, None))
+        self.gvars = decls.Commit(self.env)
+        self.conf = GConfig._GConfig(self.env, variables = 'variables')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_Configure_1(self):
+        """_GConfig(env).Configure(gvars, tests, callback) should run checks only when configuration changes"""
+        callback = Mock(name = 'callback')
+        tests = { 'CheckFoo' : Mock(name = 'CheckFoo') }
+        self.assertFalse(self.conf.IsConfigured(self.gvars, tests))
+        self.assertTrue(self.conf.Configure(self.gvars, tests, callback))
+        self.env.Configure.assert_called_once_with(custom_tests = tests)
+        callback.assert_called_once_with(self.env.Configure.return_value)
+        self.assertTrue(self.conf.IsConfigured(self.gvars, tests))
+        self.assertFalse(self.conf.Configure(self.gvars, tests, callback))
+        self.assertEqual(callback.call_count, 1)
+        self.env['ENV_FOO'] = 'FOO'
+        self.assertTrue(self.conf.Configure(self.gvars, tests, callback))
+        self.assertEqual(callback.call_count, 2)
+
+    def test_Configure_2(self):
+        """_GConfig(env).Configure(gvars, tests, callback) should store fingerprint of configured values"""
+        def callback(context):
+            self.env['ENV_FOO'] = 'configured'
+        self.assertTrue(self.conf.Configure(self.gvars, {}, callback))
+        self.assertEqual(self.env['ENV_FOO'], 'configured')
+        self.assertTrue(self.conf.IsConfigured(self.gvars, {}))
+        self.assertFalse(self.conf.IsConfigured(self.gvars, { 'CheckFoo' : len }))
+
+    def test_Configure_3(self):
+        """_GConfig(env).Configure(gvars) should run with no custom tests"""
+        self.assertTrue(self.conf.Configure(self.gvars))
+        self.env.Configure.assert_called_once_with(custom_tests = {})
+        self.assertTrue(self.conf.IsConfigured(self.gvars))
+        self.assertTrue(self.conf.IsConfigured(self.gvars, {}))
+        self.assertFalse(self.conf.Configure(self.gvars))
+
+if __name__ == "__main__":
+    ldr = unittest.TestLoader()
+    suite = unittest.TestSuite()
+    # Load tests to test suite
+    tclasses = [ Test__toolchain_fingerprint
+               , Test__checks_fingerprint
+               , Test__GConfig
+               ]
+
+    for tclass in tclasses:
+        suite.addTests(ldr.loadTestsFromTestCase(tclass))
+
+    if not unittest.TextTestRunner(verbosity = 2).run(suite).wasSuccessful():
+        sys.exit(1)
+
+# Local Variables:
+# # tab-width:4
+# # indent-tabs-mode:nil
+# # End:
+# vim: set syntax=python expandtab tabstop=4 shiftwidth=4:
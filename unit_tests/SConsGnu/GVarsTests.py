@@ -27,6 +27,7 @@ __docformat__ = "restructuredText"
 # SOFTWARE
 
 import unittest
+import collections
 
 from SConsGnu import GVars
 from SConsGnu.GVars import GVarDecl, GVarDeclU, GVarDecls, GVarDeclsU
@@ -85,6 +86,34 @@ class Test__resubst(unittest.TestCase):
         """GVars._resubst('${foo} ${bar}', {'foo' : '${bar}', 'bar' : 'XBAR'}) should be '${bar} XBAR'"""
         self.assertEqual(GVars._resubst('${foo} ${bar}', {'foo' : '${bar}', 'bar' : 'XBAR'}), '${bar} XBAR')
 
+#############################################################################
+class Test__Renamer(unittest.TestCase):
+    """Test GVars._Renamer class"""
+    def test_call_1(self):
+        """GVars._Renamer({'foo' : 'XFOO'})(value) should return value without '$' as is"""
+        value = 'foo bar'
+        self.assertIs(GVars._Renamer({'foo' : 'XFOO'})(value), value)
+    def test_call_2(self):
+        """GVars._Renamer({'foo' : 'XFOO'})(10) should be 10"""
+        self.assertEqual(GVars._Renamer({'foo' : 'XFOO'})(10), 10)
+    def test_call_3(self):
+        """GVars._Renamer({'foo' : 'XFOO'})('$$foo $foo ${foo} $foobar $') should be '$foo XFOO XFOO $foobar $'"""
+        renamer = GVars._Renamer({'foo' : 'XFOO'})
+        self.assertEqual(renamer('$$foo $foo ${foo} $foobar $'), '$foo XFOO XFOO $foobar $')
+    def test_call_4(self):
+        """GVars._Renamer(d)(value) should see later changes to d"""
+        d = {}
+        renamer = GVars._Renamer(d)
+        d['foo'] = 'XFOO'
+        self.assertEqual(renamer('$foo'), 'XFOO')
+    def test___init___1(self):
+        """GVars._Renamer(_Renamer(d)) should share d"""
+        d = {'foo' : 'XFOO'}
+        self.assertIs(GVars._Renamer(GVars._Renamer(d)).resubst_dict, d)
+    def test__resubst_with_Renamer(self):
+        """GVars._resubst('$foo', _Renamer({'foo' : 'XFOO'})) should be 'XFOO'"""
+        self.assertEqual(GVars._resubst('$foo', GVars._Renamer({'foo' : 'XFOO'})), 'XFOO')
+
 #############################################################################
 class Test__build_resubst_dict(unittest.TestCase):
     """Test GVars._build_resubst_dict() function"""
@@ -127,6 +156,119 @@ class Test__invert_dict(unittest.TestCase):
         """_invert_dict({ 'v' : 'w', 'x' : 'y' }) should == { 'w' : 'v', 'y' : 'x'}"""
         self.assertEqual(GVars._invert_dict({'v' : 'w', 'x' : 'y'}), { 'w' : 'v', 'y' : 'x'})
 
+#############################################################################
+class Test__ReadOnlyDict(unittest.TestCase):
+    def test_read_only(self):
+        """_ReadOnlyDict({...}) should not be modifiable via public interface"""
+        d = GVars._ReadOnlyDict({'x' : 'y'})
+        def setitem(): d['v'] = 'w'
+        def delitem(): del d['x']
+        self.assertRaises(TypeError, setitem)
+        self.assertRaises(TypeError, delitem)
+        for meth in ('clear', 'pop', 'popitem', 'setdefault', 'update'):
+            self.assertRaises(TypeError, getattr(d, meth), 'x')
+        self.assertEqual(d, {'x' : 'y'})
+    def test_private_modifiers(self):
+        """_ReadOnlyDict()._set(), _del() and _update() should modify the dict"""
+        d = GVars._ReadOnlyDict()
+        d._set('x', 'y')
+        d._update({'v' : 'w', 'z' : 'z'})
+        d._del('z')
+        self.assertEqual(d, {'x' : 'y', 'v' : 'w'})
+    def test_copy(self):
+        """_ReadOnlyDict({...}).copy() should return modifiable dict"""
+        d = GVars._ReadOnlyDict({'x' : 'y'}).copy()
+        d['v'] = 'w'
+        self.assertIs(type(d), dict)
+        self.assertEqual(d, {'x' : 'y', 'v' : 'w'})
+    def test_deepcopy(self):
+        """copy.deepcopy(_ReadOnlyDict({...})) should work"""
+        import copy
+        d = copy.deepcopy(GVars._ReadOnlyDict({'x' : 'y'}))
+        self.assertIsInstance(d, GVars._ReadOnlyDict)
+        self.assertEqual(d, {'x' : 'y'})
+
+#############################################################################
+class Test__placeholder_names(unittest.TestCase):
+    def test_placeholder_names_1(self):
+        """_placeholder_names('${a}/$b/${a}$$c') should be ['a', 'b']"""
+        self.assertEqual(GVars._placeholder_names('${a}/$b/${a}$$c'), ['a','b'])
+
+    def test_placeholder_names_2(self):
+        """_placeholder_names('a') should be []"""
+        self.assertEqual(GVars._placeholder_names('a'), [])
+
+    def test_placeholder_names_3(self):
+        """_placeholder_names() should be None for non-strings and expressions"""
+        self.assertIsNone(GVars._placeholder_names(['$a']))
+        self.assertIsNone(GVars._placeholder_names('${a.b}'))
+        self.assertIsNone(GVars._placeholder_names('$( $a $)'))
+
+#############################################################################
+class Test__dependency_order(unittest.TestCase):
+    def test_dependency_order_1(self):
+        """_dependency_order(roots, deps) should return dependencies first"""
+        graph = { 'a' : ['b', 'c'], 'b' : ['c'], 'c' : [], 'd' : [] }
+        order = GVars._dependency_order(['a'], lambda n : graph[n])
+        self.assertEqual(order, ['c', 'b', 'a'])
+
+    def test_dependency_order_2(self):
+        """_dependency_order(roots, deps) should raise RuntimeError on cycles"""
+        graph = { 'a' : ['b'], 'b' : ['c'], 'c' : ['a'] }
+        with self.assertRaisesRegexp(RuntimeError, 'a -> b -> c -> a'):
+            GVars._dependency_order(['a'], lambda n : graph[n])
+
+#############################################################################
+def _scons_option_parser(args):
+    from SCons.Script.SConsOptions import Parser, SConsValues
+    parser = Parser('0.0')
+    parser.preserve_unknown_options = True
+    parser.parse_args(args, SConsValues(parser.get_default_values()))
+    return parser
+
+#############################################################################
+class Test__add_options(unittest.TestCase):
+    def test_add_options_1(self):
+        """_add_options(opt_args) should add options and re-parse command line once"""
+        parser = _scons_option_parser(['--foo=FOO', '--bar=BAR'])
+        parser.parse_args = Mock(name = 'parse_args', wraps = parser.parse_args)
+        with patch('SCons.Script.Main.OptionsParser', parser):
+            GVars._add_options([ (('--foo',), {'dest' : 'opt_foo'}),
+                                 (('--bar',), {'dest' : 'opt_bar', 'default' : 'B'}),
+                                 (('--geez',), {'dest' : 'opt_geez', 'default' : 'G'}) ])
+            self.assertEqual(parser.parse_args.call_count, 1)
+            self.assertEqual(parser.values.opt_foo, 'FOO')
+            self.assertEqual(parser.values.opt_bar, 'BAR')
+            self.assertEqual(parser.values.opt_geez, 'G')
+            self.assertIn(parser.get_option('--foo'), parser.local_option_group.option_list)
+
+    def test_add_options_2(self):
+        """_add_options(opt_args) should use AddOption() if parser is not initialized"""
+        with patch('SCons.Script.Main.AddOption') as AddOption:
+            GVars._add_options([ (('--foo',), {'dest' : 'opt_foo'}),
+                                 (('-b', '--bar'), {'dest' : 'opt_bar'}) ])
+            self.assertEqual(AddOption.call_args_list,
+                             [ (('--foo',), {'dest' : 'opt_foo'}),
+                               (('-b', '--bar'), {'dest' : 'opt_bar'}) ])
+
+#############################################################################
+class Test__get_options(unittest.TestCase):
+    def test_get_options_1(self):
+        """_get_options(keys) should return same values as GetOption()"""
+        from SCons.Script.Main import GetOption
+        parser = _scons_option_parser(['--foo=FOO'])
+        with patch('SCons.Script.Main.OptionsParser', parser):
+            GVars._add_options([ (('--foo',), {'dest' : 'opt_foo'}),
+                                 (('--bar',), {'dest' : 'opt_bar', 'default' : 'B'}),
+                                 (('--geez',), {'dest' : 'opt_geez'}) ])
+            parser.values.set_option('num_jobs', 3)
+            keys = [ 'opt_foo', 'opt_bar', 'opt_geez', 'num_jobs' ]
+            self.assertEqual(GVars._get_options(keys),
+                             [ (k, GetOption(k)) for k in keys ])
+            self.assertEqual(GVars._get_options(keys),
+                             [ ('opt_foo', 'FOO'), ('opt_bar', 'B'),
+                               ('opt_geez', None), ('num_jobs', 3) ])
+
 #############################################################################
 class Test__GVarsEnvProxy(unittest.TestCase):
     def test___init___1(self):
@@ -200,6 +342,9 @@ class Test__GVarsEnvProxy(unittest.TestCase):
         self.assertEqual(proxy.has_key, proxy._has_key_strict)
         self.assertEqual(proxy._GVarsEnvProxy__contains__impl, proxy._GVarsEnvProxy__contains__strict)
         self.assertEqual(proxy.items, proxy._items_strict)
+        self.assertEqual(proxy.iteritems, proxy._iteritems_strict)
+        self.assertEqual(proxy.iterkeys, proxy._iterkeys_strict)
+        self.assertEqual(proxy.itervalues, proxy._itervalues_strict)
 
     def test___setup_methods_False(self):
         """_GVarsEnvProxy.__setup_methods(False) should setup appropriate methods"""
@@ -212,6 +357,9 @@ class Test__GVarsEnvProxy(unittest.TestCase):
         self.assertEqual(proxy.has_key, proxy._has_key_nonstrict)
         self.assertEqual(proxy._GVarsEnvProxy__contains__impl, proxy._GVarsEnvProxy__contains__nonstrict)
         self.assertEqual(proxy.items, proxy._items_nonstrict)
+        self.assertEqual(proxy.iteritems, proxy._iteritems_nonstrict)
+        self.assertEqual(proxy.iterkeys, proxy._iterkeys_nonstrict)
+        self.assertEqual(proxy.itervalues, proxy._itervalues_nonstrict)
 
     def test___delitem___1(self):
         """_GVarsEnvProxy({'a' : 'A'}).__delitem__('a') should delete item 'a'"""
@@ -383,6 +531,50 @@ class Test__GVarsEnvProxy(unittest.TestCase):
         """_GVarsEnvProxy({'a' : 'a'}, irename = {'a' : 'b'}, iresubst = {'a' : '${b}'}).items() should be [('b', 'a')]"""
         self.assertEqual(GVars._GVarsEnvProxy({'a' : 'a'}, irename = {'a' : 'b'}, iresubst = {'a' : '${b}'}).items(), [('b', 'a')])
 
+    def test_items_6(self):
+        """_GVarsEnvProxy({'a' : 'A'}, rename = {'c' : 'a', 'd' : 'b'}, strict = True).items() should skip missing variables"""
+        self.assertEqual(GVars._GVarsEnvProxy({'a' : 'A'}, rename = { 'c' : 'a', 'd' : 'b'}, strict = True).items(), [('c', 'A')])
+
+    def test_iteritems_1(self):
+        """_GVarsEnvProxy(env).iteritems() should resubst only consumed values"""
+        for strict in (False, True):
+            proxy = GVars._GVarsEnvProxy({'a' : 'A', 'b' : 'B'}, rename = {'a' : 'a', 'b' : 'b'}, strict = strict)
+            proxy._GVarsEnvProxy__irenamer = Mock(name = 'irenamer', side_effect = lambda v : v)
+            items = proxy.iteritems()
+            self.assertEqual(proxy._GVarsEnvProxy__irenamer.call_count, 0)
+            self.assertIn(next(items), [('a', 'A'), ('b', 'B')])
+            self.assertEqual(proxy._GVarsEnvProxy__irenamer.call_count, 1)
+
+    def test_keys_1(self):
+        """_GVarsEnvProxy({'a' : 'A', 'b' : 'B'}, irename = {'a' : 'c'}).keys() should be ['c', 'b'] and resubst no values"""
+        proxy = GVars._GVarsEnvProxy({'a' : 'A', 'b' : 'B'}, irename = {'a' : 'c'})
+        proxy._GVarsEnvProxy__irenamer = Mock(name = 'irenamer')
+        self.assertEqual(sorted(proxy.keys()), ['b', 'c'])
+        self.assertEqual(sorted(proxy), ['b', 'c'])
+        self.assertFalse(proxy._GVarsEnvProxy__irenamer.called)
+
+    def test_keys_2(self):
+        """_GVarsEnvProxy({'a' : 'A', 'b' : 'B'}, rename = {'c' : 'a', 'd' : 'x'}, strict = True).keys() should be ['c']"""
+        proxy = GVars._GVarsEnvProxy({'a' : 'A', 'b' : 'B'}, rename = {'c' : 'a', 'd' : 'x'}, strict = True)
+        self.assertEqual(proxy.keys(), ['c'])
+
+    def test_values_1(self):
+        """_GVarsEnvProxy({'a' : '${a}'}, iresubst = {'a' : '${b}'}).values() should be ['${b}']"""
+        proxy = GVars._GVarsEnvProxy({'a' : '${a}'}, irename = {'a' : 'b'}, iresubst = {'a' : '${b}'})
+        self.assertEqual(proxy.values(), ['${b}'])
+        self.assertEqual(list(proxy.itervalues()), ['${b}'])
+
+    def test_items_SCons_Environment(self):
+        """_GVarsEnvProxy(env).items() should work with SCons environment"""
+        from SCons.Environment import Environment
+        env = Environment(tools = [], FOO = '${BAR}', BAR = 'bar')
+        proxy = GVars._GVarsEnvProxy(env, irename = {'FOO' : 'foo', 'BAR' : 'bar'},
+                                          iresubst = {'FOO' : '${foo}', 'BAR' : '${bar}'})
+        items = dict(proxy.items())
+        self.assertEqual(items['foo'], '${bar}')
+        self.assertEqual(items['bar'], 'bar')
+        self.assertEqual(dict(proxy.iteritems()), items)
+
     def test_subst_1(self):
         """_GVarsEnvProxy(env).subst('${a} ${b}') should call env.subst('${a} ${b}')"""
         env = Mock(name = 'env')
@@ -403,15 +595,210 @@ class Test__GVarsEnvProxy(unittest.TestCase):
         except AssertionError as e:
             self.fail(str(e))
 
+    def test_dirty(self):
+        """_GVarsEnvProxy(env, ..., dirty = dirty) should record written keys"""
+        env = { 'ENV_FOO' : 'foo', 'ENV_BAR' : 'bar' }
+        dirty = set()
+        proxy = GVars._GVarsEnvProxy(env, {'foo' : 'ENV_FOO', 'bar' : 'ENV_BAR'}, dirty = dirty)
+        proxy['foo'] = 'FOO'
+        proxy['geez'] = 'GEEZ'
+        self.assertEqual(dirty, set(['ENV_FOO', 'geez']))
+        del proxy['bar']
+        self.assertEqual(dirty, set(['ENV_FOO', 'ENV_BAR', 'geez']))
+        self.assertEqual(env, { 'ENV_FOO' : 'FOO', 'geez' : 'GEEZ' })
+
+#############################################################################
+class Test__VariablesWrapper(unittest.TestCase):
+    def _variables(self, args):
+        from SCons.Variables import Variables
+        variables = Variables(args = args, is_global = False)
+        variables.Add((['foo', 'foo_alias'], 'foo help', 'foo default'))
+        variables.Add('bar', 'bar help', GVars._undef)
+        variables.Add('geez', 'geez help', None, None, lambda x : x.upper())
+        return variables
+
+    def test_Update_1(self):
+        """_VariablesWrapper(variables).Update(env, None) should set defaults"""
+        env = {}
+        GVars._VariablesWrapper(self._variables({})).Update(env, None)
+        self.assertEqual(env, {'foo' : 'foo default'})
+
+    def test_Update_2(self):
+        """_VariablesWrapper(variables).Update(env, None) should take values by keys and aliases"""
+        env = {}
+        variables = self._variables({'foo_alias' : 'FOO', 'geez' : 'geez', 'xyz' : 'XYZ'})
+        GVars._VariablesWrapper(variables).Update(env, None)
+        self.assertEqual(env, {'foo' : 'FOO', 'geez' : 'GEEZ'})
+        self.assertEqual(variables.unknown, {'xyz' : 'XYZ'})
+
+    def test_Update_3(self):
+        """_VariablesWrapper(variables).Update(env, args) should call validators"""
+        env = {}
+        variables = self._variables({})
+        validator = Mock(name = 'validator')
+        variables.Add('qux', 'qux help', None, validator)
+        GVars._VariablesWrapper(variables).Update(env, {'qux' : 'QUX'})
+        validator.assert_called_once_with('qux', 'QUX', env)
+
+    def _save_and_load(self, values):
+        import os
+        import shutil
+        import tempfile
+        from SCons.Environment import Environment
+        tmpdir = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(tmpdir, 'variables')
+            env = Environment(tools = [], **values)
+            saved = GVars._VariablesWrapper(self._variables({})).Save(filename, env)
+            with open(filename, 'rb') as f:
+                header = f.readline()
+            variables = self._variables({})
+            variables.files = [ filename ]
+            env = {}
+            GVars._VariablesWrapper(variables).Update(env, None)
+            return saved, header, env
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_Save_1(self):
+        """_VariablesWrapper(variables).Save(filename, env) should save non-default values"""
+        saved, header, env = self._save_and_load({'foo' : 'FOO', 'geez' : 'GEEZ'})
+        self.assertTrue(saved)
+        self.assertEqual(header, GVars._variables_file_header)
+        self.assertEqual(env, {'foo' : 'FOO', 'geez' : 'GEEZ'})
+
+    def test_Save_2(self):
+        """_VariablesWrapper(variables).Save(filename, env) should skip default values"""
+        saved, header, env = self._save_and_load({'foo' : 'foo default'})
+        self.assertEqual(header, GVars._variables_file_header)
+        self.assertEqual(env, {'foo' : 'foo default'})
+
+    def test_Save_3(self):
+        """_VariablesWrapper(variables).Save(filename, env) should not rewrite unchanged file"""
+        import os
+        import shutil
+        import tempfile
+        from SCons.Environment import Environment
+        tmpdir = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(tmpdir, 'variables')
+            env = Environment(tools = [], foo = 'FOO')
+            wrapper = GVars._VariablesWrapper(self._variables({}))
+            self.assertTrue(wrapper.Save(filename, env))
+            os.utime(filename, (0, 0))
+            self.assertFalse(wrapper.Save(filename, env))
+            self.assertEqual(os.stat(filename).st_mtime, 0)
+            env['foo'] = 'BAR'
+            self.assertTrue(wrapper.Save(filename, env))
+            self.assertNotEqual(os.stat(filename).st_mtime, 0)
+            self.assertEqual(os.listdir(tmpdir), ['variables'])
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_Save_4(self):
+        """_VariablesWrapper(variables).Save(filename, env) should convert legacy file"""
+        import os
+        import shutil
+        import tempfile
+        from SCons.Environment import Environment
+        tmpdir = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(tmpdir, 'variables')
+            with open(filename, 'w') as f:
+                f.write("foo = 'FOO'\ngeez = 'GEEZ'\n")
+            variables = self._variables({})
+            variables.files = [ filename ]
+            env = Environment(tools = [])
+            wrapper = GVars._VariablesWrapper(variables)
+            wrapper.Update(env, None)
+            self.assertEqual(env['foo'], 'FOO')
+            self.assertEqual(env['geez'], 'GEEZ')
+            self.assertTrue(wrapper.Save(filename, env))
+            with open(filename, 'rb') as f:
+                self.assertEqual(f.readline(), GVars._variables_file_header)
+            env = {}
+            wrapper.Update(env, None)
+            self.assertEqual(env, {'foo' : 'FOO', 'geez' : 'GEEZ'})
+        finally:
+            shutil.rmtree(tmpdir)
+
+#############################################################################
+class Test__GVarsView(unittest.TestCase):
+    def _view(self, env):
+        return GVars._GVarsView(env, {'a' : 'env_a', 'b' : 'env_b', 'c' : 'env_c'},
+                                GVars._Renamer({'env_a' : '${a}'}))
+
+    def test_mapping(self):
+        """_GVarsView(env, rename, convert) should map renamed keys to converted values"""
+        env = { 'env_a' : 'A', 'env_b' : 'B ${env_a}', 'env_x' : 'X' }
+        view = self._view(env)
+        self.assertIsInstance(view, collections.Mapping)
+        self.assertEqual(view['a'], 'A')
+        self.assertEqual(view['b'], 'B ${a}')
+        self.assertRaises(KeyError, lambda : view['c'])
+        self.assertRaises(KeyError, lambda : view['env_x'])
+        self.assertIn('a', view)
+        self.assertNotIn('c', view)
+        self.assertNotIn('env_a', view)
+        self.assertEqual(sorted(view), ['a', 'b'])
+        self.assertEqual(len(view), 2)
+        self.assertEqual(view.get('c', 'C'), 'C')
+
+    def test_read_only(self):
+        """_GVarsView(env, rename, convert) should not support assignment"""
+        view = self._view({ 'env_a' : 'A' })
+        with self.assertRaises(TypeError):
+            view['a'] = 'X'
+
+    def test_live(self):
+        """_GVarsView(env, rename, convert) should reflect changes in env"""
+        env = { 'env_a' : 'A' }
+        view = self._view(env)
+        env['env_c'] = 'C'
+        self.assertEqual(view['c'], 'C')
+        self.assertEqual(len(view), 2)
+
+    def test_snapshot(self):
+        """_GVarsView(env, rename, convert).snapshot() should return independent dict"""
+        env = { 'env_a' : 'A', 'env_b' : '${env_a}' }
+        view = self._view(env)
+        snapshot = view.snapshot()
+        self.assertIs(type(snapshot), dict)
+        self.assertEqual(snapshot, { 'a' : 'A', 'b' : '${a}' })
+        env['env_a'] = 'X'
+        self.assertEqual(snapshot['a'], 'A')
+        self.assertEqual(view, { 'a' : 'X', 'b' : '${a}' })
+
+#############################################################################
+class Test__LazyHelpText(unittest.TestCase):
+    def test_str(self):
+        """str(_LazyHelpText(func, 'a', b = 'B')) should call func('a', b = 'B') once"""
+        func = Mock(name = 'func', return_value = 'TEXT')
+        text = GVars._LazyHelpText(func, 'a', b = 'B')
+        self.assertFalse(func.called)
+        self.assertEqual(str(text), 'TEXT')
+        self.assertEqual(str(text), 'TEXT')
+        func.assert_called_once_with('a', b = 'B')
+
+    def test_add(self):
+        """_LazyHelpText concatenated with strings should remain lazy"""
+        func = Mock(name = 'func', return_value = 'TEXT')
+        text = 'head:' + GVars._LazyHelpText(func) + ':tail'
+        self.assertIsInstance(text, GVars._LazyHelpText)
+        self.assertFalse(func.called)
+        self.assertEqual(str(text), 'head:TEXT:tail')
+
+#############################################################################
 #############################################################################
 class Test__GVars(unittest.TestCase):
 
     @classmethod
     def _gdecls_mock_1(cls):
-        # decls0 is a substitute of _GVarDecls instance, with only keys()
-        # method defined
+        # decls0 is a substitute of _GVarDecls instance, with only keys() and
+        # get_var_converters() methods defined
         gdecls = Mock(name = 'gdecls0')
         gdecls.keys = Mock(name = 'keys', return_value = ['k','e','y','s'])
+        gdecls.get_var_converters = Mock(name = 'get_var_converters', return_value = {})
         return gdecls
 
     @classmethod
@@ -588,6 +975,18 @@ class Test__GVars(unittest.TestCase):
         """_GVars(gdecls).EnvProxy(env) should _GVarsEnvProxy() with appropriate arguments"""
         self.XxxEnvProxy_test('')
 
+    def test_VarEnvProxy_shares_dicts(self):
+        """_GVars(gdecls).VarEnvProxy(env) should compute dicts only once"""
+        gv = GVars._GVars(self._gdecls_mock_4())
+        with patch('SConsGnu.GVars._compose_dicts', side_effect = GVars._compose_dicts) as compose:
+            proxy1 = gv.VarEnvProxy('env1')
+            proxy2 = gv.VarEnvProxy('env2', strict = True)
+            self.assertEqual(compose.call_count, 1)
+        self.assertIs(proxy1._GVarsEnvProxy__rename, proxy2._GVarsEnvProxy__rename)
+        self.assertIs(proxy1._GVarsEnvProxy__iresubst, proxy2._GVarsEnvProxy__iresubst)
+        self.assertIs(proxy2.env, 'env2')
+        self.assertTrue(proxy2.is_strict())
+
     def test_get_keys(self):
         """_GVars(gdecls).get_keys() should return attribute __keys"""
         gv = GVars._GVars(self._gdecls_mock_1())
@@ -756,12 +1155,13 @@ class Test__GVars(unittest.TestCase):
         gv = GVars._GVars(self._gdecls_mock_1())
         gv.VarEnvProxy = Mock(name = 'VarEnvProxy', side_effect = VarEnvProxy)
         variables = Mock(name = 'variables')
-        variables.Save = Mock(name = 'Save')
-        gv.SaveVariables(variables, 'filename1', 'env1')
-        try:
-            variables.Save.assert_called_once_with('filename1','var_env1_proxy')
-        except AssertionError as e:
-            self.fail(str(e))
+        with patch('SConsGnu.GVars._VariablesWrapper') as _VariablesWrapper:
+            gv.SaveVariables(variables, 'filename1', 'env1')
+            try:
+                _VariablesWrapper.assert_called_once_with(variables)
+                _VariablesWrapper(variables).Save.assert_called_once_with('filename1','var_env1_proxy')
+            except AssertionError as e:
+                self.fail(str(e))
 
     def test_GenerateVariablesHelpText_1(self):
         """_GVars(gdecls).GenerateVariablesHelpText(variables, 'env1')"""
@@ -789,6 +1189,51 @@ class Test__GVars(unittest.TestCase):
         except AssertionError as e:
             self.fail(str(e))
 
+    def _helpvars(self):
+        from SCons.Environment import Environment
+        from SCons.Variables import Variables
+        decls = GVarDecls({
+            'prefix' : ( {'ENV_PREFIX' : '/usr'},
+                         ('VAR_PREFIX', 'installation prefix', '/usr'),
+                         None ),
+            'bindir' : ( {'ENV_BINDIR' : '${prefix}/bin'},
+                         ('VAR_BINDIR', 'user executables', '${prefix}/bin'),
+                         None ),
+        })
+        env = Environment(tools = [])
+        variables = Variables(is_global = False)
+        gv = decls.Commit(env, variables, False)
+        variables.GenerateHelpText = Mock(name = 'GenerateHelpText',
+                                          side_effect = variables.GenerateHelpText)
+        return gv, env, variables
+
+    def test_GenerateVariablesHelpText_3(self):
+        """_GVars(gdecls).GenerateVariablesHelpText(variables, env) should cache the help text"""
+        gv, env, variables = self._helpvars()
+        text = gv.GenerateVariablesHelpText(variables, env)
+        self.assertIn('actual: /usr/bin', text)
+        self.assertEqual(gv.GenerateVariablesHelpText(variables, env), text)
+        self.assertEqual(variables.GenerateHelpText.call_count, 1)
+        # other arguments
+        gv.GenerateVariablesHelpText(variables, env, True)
+        self.assertEqual(variables.GenerateHelpText.call_count, 2)
+        # change of upstream variable
+        env['ENV_PREFIX'] = '/opt'
+        text = gv.GenerateVariablesHelpText(variables, env)
+        self.assertIn('actual: /opt/bin', text)
+        self.assertEqual(variables.GenerateHelpText.call_count, 3)
+
+    def test_VariablesHelpText(self):
+        """_GVars(gdecls).VariablesHelpText(variables, env) should defer formatting"""
+        gv, env, variables = self._helpvars()
+        text = gv.VariablesHelpText(variables, env, True)
+        self.assertIsInstance(text, GVars._LazyHelpText)
+        self.assertFalse(variables.GenerateHelpText.called)
+        env['ENV_PREFIX'] = '/opt'
+        self.assertIn('actual: /opt/bin', str(text))
+        self.assertEqual(str(text), gv.GenerateVariablesHelpText(variables, env, True))
+        self.assertEqual(variables.GenerateHelpText.call_count, 1)
+
     def test_GetCurrentValues_1(self):
         """_GVars(gdecls).GetCurrentValues(env) works as expected"""
         gv = GVars._GVars(self._gdecls_mock_5())
@@ -798,11 +1243,329 @@ class Test__GVars(unittest.TestCase):
         self.assertIs(current['env_e'], env['env_e'])
         self.assertEqual(current, {'env_k' : 'K', 'env_e' : 'E'})
 
+    def test_CurrentValuesView_1(self):
+        """_GVars(gdecls).CurrentValuesView(env) should be a view with same content as GetCurrentValues(env)"""
+        gv = GVars._GVars(self._gdecls_mock_5())
+        env = { 'env_k' : 'K', 'env_e' : '$$ ${env_k}', 'env_x' : 'X' }
+        view = gv.CurrentValuesView(env)
+        self.assertIsInstance(view, GVars._GVarsView)
+        self.assertEqual(view, gv.GetCurrentValues(env))
+        self.assertEqual(view.snapshot(), gv.GetCurrentValues(env))
+        self.assertEqual(view['env_e'], '$ ${env_k}')
+        env['env_s'] = 'S'
+        self.assertEqual(view['env_s'], 'S')
+
+    def test_Unmangle_1(self):
+        """_GVars(gdecls).Unmangle(env) should return values with GVar names"""
+        gv = GVars._GVars(self._gdecls_mock_5())
+        env = { 'env_k' : 'K', 'env_e' : 'E ${env_k}', 'env_x' : 'X' }
+        self.assertEqual(gv.Unmangle(env), { 'k' : 'K', 'e' : 'E ${k}' })
+
+    def test_UnmangledView_1(self):
+        """_GVars(gdecls).UnmangledView(env) should be a view with same content as Unmangle(env)"""
+        gv = GVars._GVars(self._gdecls_mock_5())
+        env = { 'env_k' : 'K', 'env_e' : 'E ${env_k}', 'env_x' : 'X' }
+        view = gv.UnmangledView(env)
+        self.assertIsInstance(view, GVars._GVarsView)
+        self.assertEqual(view, gv.Unmangle(env))
+        self.assertEqual(view['e'], 'E ${k}')
+        self.assertNotIn('x', view)
+        env['env_k'] = 'K2'
+        self.assertEqual(view['k'], 'K2')
+
+    def test_ApplyDefaultsTo_1(self):
+        """_GVars(gdecls).ApplyDefaultsTo(envs) should initialize envs as Commit(env) does"""
+        from SCons.Environment import Environment
+        decls = GVarDecls(foo = ({'ENV_FOO' : 'foo'}, None, None),
+                          bar = ({'ENV_BAR' : '${foo}/bar'}, None, None))
+        env = Environment(tools = [])
+        gv = decls.Commit(env)
+        envs = [ Environment(tools = []), Environment(tools = [], ENV_FOO = 'FOO') ]
+        for e in envs:
+            e.SetDefault = Mock(name = 'SetDefault', side_effect = e.SetDefault)
+        gv.ApplyDefaultsTo(envs)
+        self.assertEqual(envs[0]['ENV_FOO'], 'foo')
+        self.assertEqual(envs[0]['ENV_BAR'], '${ENV_FOO}/bar')
+        self.assertEqual(envs[1]['ENV_FOO'], 'FOO')
+        self.assertEqual(envs[1]['ENV_BAR'], '${ENV_FOO}/bar')
+        for e in envs:
+            self.assertEqual(e.SetDefault.call_count, 1)
+
+    def test_ApplyDefaultsTo_2(self):
+        """_GVars(None).ApplyDefaultsTo(envs) should raise RuntimeError"""
+        with self.assertRaises(RuntimeError):
+            GVars._GVars(None).ApplyDefaultsTo([{}])
+
+    def test_Fingerprint_1(self):
+        """_GVars(gdecls).Fingerprint(env) should depend only on values of declared GVars"""
+        gv = GVars._GVars(self._gdecls_mock_5())
+        env = { 'env_k' : 'K', 'env_e' : ['E', 1], 'env_x' : 'X' }
+        fp = gv.Fingerprint(env)
+        self.assertEqual(gv.Fingerprint(dict(env)), fp)
+        self.assertEqual(gv.Fingerprint(dict(env, env_x = 'Y')), fp)
+        self.assertNotEqual(gv.Fingerprint(dict(env, env_k = 'K2')), fp)
+        self.assertNotEqual(gv.Fingerprint(dict(env, env_y = None)), fp)
+        self.assertNotEqual(gv.Fingerprint(dict(env, env_e = ['E', '1'])), fp)
+
+    def test_Fingerprint_2(self):
+        """_GVars(gdecls).Fingerprint(env) should not depend on mapping of GVar names"""
+        decls1 = GVarDecls(foo = ({'ENV_FOO' : 'foo'}, None, None),
+                           bar = ({'ENV_BAR' : '${foo}/bar'}, None, None))
+        decls2 = GVarDecls(foo = ({'FOO' : 'foo'}, None, None),
+                           bar = ({'BAR' : '${foo}/bar'}, None, None))
+        from SCons.Environment import Environment
+        env1, env2 = Environment(tools = []), Environment(tools = [])
+        gv1 = decls1.Commit(env1)
+        gv2 = decls2.Commit(env2)
+        self.assertEqual(env1['ENV_BAR'], '${ENV_FOO}/bar')
+        self.assertEqual(gv1.Fingerprint(env1), gv2.Fingerprint(env2))
+
+    def test_TrackChanges_1(self):
+        """_GVars(gdecls).TrackChanges(env) should return same values as GetCurrentValues(env)"""
+        gv = GVars._GVars(self._gdecls_mock_5())
+        env = { 'env_k' : 'K', 'env_e' : 'E', 'env_x' : 'X' }
+        org = gv.TrackChanges(env)
+        self.assertIsInstance(org, GVars._GVarsSnapshot)
+        self.assertEqual(org, gv.GetCurrentValues(env))
+        self.assertIs(org.env, env)
+        self.assertEqual(org.dirty, set())
+        self.assertIs(gv.VarEnvProxy(env).dirty, org.dirty)
+        self.assertIsNone(gv.VarEnvProxy({}).dirty)
+        gv.UntrackChanges()
+        self.assertIsNone(gv.VarEnvProxy(env).dirty)
+
+    def _TrackChanges_results(self, track):
+        gv = GVars._GVars(self._gdecls_mock_5())
+        env = { 'env_k' : 'K', 'env_e' : 'E', 'env_y' : '${env_k}', 'env_s' : 'S' }
+        if track:
+            org = gv.TrackChanges(env)
+        else:
+            org = gv.GetCurrentValues(env)
+        proxy = gv.VarEnvProxy(env)
+        proxy['var_k'] = 'K2 ${var_e}'
+        proxy['var_e'] = 'E'
+        new = { 'k' : 'NK', 'e' : 'NE', 's' : 'NS ${k}' }
+        res = [ gv.GetAltered(env, org), gv.GetUnaltered(env, org),
+                gv.WithUnalteredReplaced(env, org, new) ]
+        res.append(gv.ReplaceUnaltered(env, org, new))
+        res.append(env)
+        return res
+
+    def test_TrackChanges_2(self):
+        """_GVars(gdecls).TrackChanges(env) should not change results of GetAltered() & co."""
+        self.assertEqual(self._TrackChanges_results(True),
+                         self._TrackChanges_results(False))
+
+    def test_TrackChanges_3(self):
+        """_GVars(gdecls).GetAltered(env, org) should only compare changed variables"""
+        gv = GVars._GVars(self._gdecls_mock_5())
+        env = { 'env_k' : 'K', 'env_e' : 'E', 'env_y' : 'Y', 'env_s' : 'S' }
+        org = gv.TrackChanges(env)
+        gv.VarEnvProxy(env)['var_k'] = 'K2'
+        with patch.object(GVars._GVars, '_is_unaltered', Mock(wraps = GVars._GVars._is_unaltered)) as is_unaltered:
+            self.assertEqual(gv.GetAltered(env, org), { 'env_k' : 'K2' })
+            self.assertEqual(is_unaltered.call_count, 1)
+            # a copy of org is not tracked, full comparison is done
+            self.assertEqual(gv.GetAltered(env, dict(org)), { 'env_k' : 'K2' })
+            self.assertEqual(is_unaltered.call_count, 5)
+
+    def _Postprocess_reference(self, gv, env, ose):
+        org = gv.GetCurrentValues(env)
+        gv.UpdateEnvironment(env)
+        alt = gv.GetAltered(env, org)
+        alt.update(gv.ReplaceUnaltered(env, org, ose))
+        return alt
+
+    def test_Postprocess_1(self):
+        """_GVars(gdecls).Postprocess(env, ose = ose) should be same as GetCurrentValues(), UpdateEnvironment(), GetAltered(), ReplaceUnaltered() sequence"""
+        def UpdateEnvironment(env, *args):
+            env['env_k'] = 'K2 $$ ${env_y}'
+            env['env_s'] = 'S'
+        ose = { 'e' : 'OSE ${k}', 'y' : 'Y', 'x' : 'X' }
+        results = []
+        for postprocess in (lambda gv, env : gv.Postprocess(env, ose = ose),
+                            lambda gv, env : self._Postprocess_reference(gv, env, ose)):
+            gv = GVars._GVars(self._gdecls_mock_5())
+            gv.UpdateEnvironment = Mock(name = 'UpdateEnvironment', side_effect = UpdateEnvironment)
+            env = { 'env_k' : 'K', 'env_e' : '${env_y}', 'env_y' : 'Y', 'env_x' : 'X' }
+            alt = postprocess(gv, env)
+            results.append((alt, env))
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(results[0][0], { 'env_k' : 'K2 $ ${env_y}', 'env_s' : 'S',
+                                          'env_e' : 'OSE ${env_k}', 'env_y' : 'Y' })
+
+    def test_Postprocess_2(self):
+        """_GVars(gdecls).Postprocess(env, variables, filename = 'f') should save variables"""
+        gv = GVars._GVars(self._gdecls_mock_5())
+        gv.UpdateEnvironment = Mock(name = 'UpdateEnvironment')
+        gv.SaveVariables = Mock(name = 'SaveVariables')
+        env = { 'env_k' : 'K' }
+        self.assertEqual(gv.Postprocess(env, 'variables', True, {}, 'args', 'f'), {})
+        gv.UpdateEnvironment.assert_called_once_with(env, 'variables', True, 'args')
+        gv.SaveVariables.assert_called_once_with('variables', 'f', env)
+
+    def _converted_vars(self):
+        decls = GVarDecls(
+            foo = ({'ENV_FOO' : 'foo'}, ('VAR_FOO', 'foo help', 'foo'), None),
+            num = ({'ENV_NUM' : 0}, ('VAR_NUM', 'num help', 0, None, int), None),
+        )
+        return decls.Commit()
+
+    def test_ImportEnviron_1(self):
+        """_GVars(gdecls).ImportEnviron(ose = ose) should import and convert declared variables only"""
+        gv = self._converted_vars()
+        ose = { 'foo' : 'FOO', 'num' : '12', 'PATH' : '/bin' }
+        self.assertEqual(gv.ImportEnviron(ose = ose), { 'foo' : 'FOO', 'num' : 12 })
+        self.assertEqual(gv.ImportEnviron(ose = {}), {})
+
+    def test_ImportEnviron_2(self):
+        """_GVars(gdecls).ImportEnviron(env, ose) should prefer names with GNUBLD_ENVVAR_PREFIX"""
+        from SCons.Environment import Environment
+        gv = self._converted_vars()
+        env = Environment(tools = [], GNUBLD_ENVVAR_PREFIX = 'PFX_')
+        ose = { 'foo' : 'FOO', 'PFX_foo' : 'PFX FOO', 'num' : '1' }
+        self.assertEqual(gv.ImportEnviron(env, ose), { 'foo' : 'PFX FOO', 'num' : 1 })
+        self.assertEqual(gv.ImportEnviron(ose = ose, prefix = 'PFX_'),
+                         { 'foo' : 'PFX FOO', 'num' : 1 })
+
+    def test_ImportEnviron_3(self):
+        """_GVars(gdecls).ImportEnviron(ose = ose) should call converter once per value"""
+        converter = Mock(name = 'converter', side_effect = int)
+        decls = GVarDecls(num = ({'ENV_NUM' : 0}, ('VAR_NUM', '', 0, None, converter), None))
+        gv = decls.Commit()
+        self.assertEqual(gv.ImportEnviron(ose = { 'num' : '1' }), { 'num' : 1 })
+        self.assertEqual(gv.ImportEnviron(ose = { 'num' : '1' }), { 'num' : 1 })
+        self.assertEqual(converter.call_count, 1)
+        self.assertEqual(gv.ImportEnviron(ose = { 'num' : '2' }), { 'num' : 2 })
+        self.assertEqual(converter.call_count, 2)
+
+    def test_ImportEnviron_4(self):
+        """_GVars(gdecls).ImportEnviron(ose = ose) should raise UserError when conversion fails"""
+        import SCons.Errors
+        gv = self._converted_vars()
+        with self.assertRaises(SCons.Errors.UserError):
+            gv.ImportEnviron(ose = { 'num' : 'x' })
+
+    def test_ImportEnviron_5(self):
+        """_GVars(gdecls).ImportEnviron(env, ose) should not share converted values between environments"""
+        from SCons.Environment import Environment
+        from SCons.Util import CLVar
+        decls = GVarDecls(CFLAGS = ({'CFLAGS' : None}, ('CFLAGS', '', None, None, CLVar), None))
+        e1 = Environment(tools = [])
+        gv = decls.Commit(e1)
+        gv.Postprocess(e1, None, False, gv.ImportEnviron(e1, { 'CFLAGS' : '-O2' }))
+        e1['CFLAGS'] += ['-g']
+        e2 = Environment(tools = [])
+        gv.Postprocess(e2, None, False, gv.ImportEnviron(e2, { 'CFLAGS' : '-O2' }))
+        self.assertEqual(e1['CFLAGS'], ['-O2', '-g'])
+        self.assertEqual(e2['CFLAGS'], ['-O2'])
+        self.assertIsNot(e1['CFLAGS'], e2['CFLAGS'])
+
+    def _dirvars(self):
+        from SCons.Environment import Environment
+        decls = GVarDecls({
+            'prefix'  : ({'ENV_PREFIX' : '/usr'}, None, None),
+            'bindir'  : ({'ENV_BINDIR' : '${prefix}/bin'}, None, None),
+            'sbindir' : ({'ENV_SBINDIR' : '${prefix}/sbin'}, None, None),
+            'flags'   : ({'ENV_FLAGS' : ['-a', '-b']}, None, None),
+        })
+        env = Environment(tools = [])
+        gv = decls.Commit(env)
+        env.subst = Mock(name = 'subst', side_effect = env.subst)
+        return gv, env
+
+    def test_ExpandValues_1(self):
+        """_GVars(gdecls).ExpandValues(env) should expand all the values"""
+        gv, env = self._dirvars()
+        self.assertEqual(gv.ExpandValues(env), { 'prefix' : '/usr',
+                                                 'bindir' : '/usr/bin',
+                                                 'sbindir' : '/usr/sbin',
+                                                 'flags' : '-a -b' })
+
+    def test_ExpandValues_2(self):
+        """_GVars(gdecls).ExpandValues(env) should memoize expanded values"""
+        gv, env = self._dirvars()
+        gv.ExpandValues(env, ['bindir', 'sbindir'])
+        self.assertEqual(env.subst.call_count, 3)
+        env.subst.reset_mock()
+        self.assertEqual(gv.Expand(env, 'bindir'), '/usr/bin')
+        self.assertEqual(env.subst.call_count, 0)
+        # non-string values are not memoized
+        gv.Expand(env, 'flags')
+        gv.Expand(env, 'flags')
+        self.assertEqual(env.subst.call_count, 2)
+
+    def test_ExpandValues_3(self):
+        """_GVars(gdecls).ExpandValues(env) should notice changes of upstream variables"""
+        gv, env = self._dirvars()
+        gv.ExpandValues(env)
+        env['ENV_PREFIX'] = '/opt'
+        self.assertEqual(gv.Expand(env, 'bindir'), '/opt/bin')
+        env['ENV_BINDIR'] = '/bin'
+        self.assertEqual(gv.Expand(env, 'bindir'), '/bin')
+        env.subst.reset_mock()
+        env['ENV_PREFIX'] = '/usr'
+        self.assertEqual(gv.Expand(env, 'bindir'), '/bin')
+        self.assertEqual(env.subst.call_count, 0)
+
+    def test_ExpandValues_4(self):
+        """_GVars(gdecls).ExpandValues(env) should raise RuntimeError on circular dependencies"""
+        gv, env = self._dirvars()
+        env['ENV_PREFIX'] = '${ENV_BINDIR}'
+        with self.assertRaisesRegexp(RuntimeError, 'circular'):
+            gv.Expand(env, 'bindir')
+
+    def test_ExpandValues_5(self):
+        """_GVars(gdecls).ExpandValues(env) should skip GVars without ENV declaration"""
+        from SCons.Environment import Environment
+        decls = GVarDecls({
+            'prefix' : ({'ENV_PREFIX' : '/usr'}, ('VAR_PREFIX', 'prefix help'), None),
+            'bindir' : ({'ENV_BINDIR' : '${prefix}/bin'}, None, None),
+            'x'      : (None, ('VAR_X', 'x help'), None),
+            'y'      : (None, None, ('--y', {'dest' : 'y'})),
+        })
+        env = Environment(tools = [])
+        gv = decls.Commit(env)
+        self.assertEqual(gv.ExpandValues(env), { 'prefix' : '/usr',
+                                                 'bindir' : '/usr/bin' })
+        with self.assertRaisesRegexp(KeyError, "'x'"):
+            gv.ExpandValues(env, ['bindir', 'x'])
+        with self.assertRaisesRegexp(KeyError, "'y'"):
+            gv.Expand(env, 'y')
 
 #############################################################################
 class Test__GVarDecl(unittest.TestCase):
-    # TODO: Write unit tests for _GVarDecl class (see GH issue #1)
-    pass
+    # TODO: Cover the rest of _GVarDecl class (see GH issue #1)
+    def test_slots(self):
+        """_GVarDecl objects should have no __dict__"""
+        decl = GVars._GVarDecl({'ENV_FOO' : 'foo'})
+        self.assertFalse(hasattr(decl, '__dict__'))
+
+    def test_var_decl(self):
+        """_GVarDecl(None, var_decl) should keep the VAR arguments"""
+        kw = { 'kw1' : 'KW1' }
+        decl = GVars._GVarDecl(None, ('VAR_FOO', 'foo help', 'foo', None, None, kw))
+        self.assertEqual(decl.get_xxx_key(GVars.VAR), 'VAR_FOO')
+        self.assertEqual(decl.get_xxx_default(GVars.VAR), 'foo')
+        self.assertEqual(kw, { 'kw1' : 'KW1' })
+        variables = Mock(name = 'variables')
+        decl._add_to_xxx(GVars.VAR, variables)
+        variables.Add.assert_called_once_with(key = 'VAR_FOO', help = 'foo help',
+                                              default = 'foo', validator = None,
+                                              converter = None, kw1 = 'KW1')
+
+    def test_copy(self):
+        """_GVarDecl.copy() should return independent copy"""
+        decl = GVars._GVarDecl({'ENV_FOO' : 'foo'}, ('VAR_FOO', 'foo help'),
+                               ('--foo', {'dest' : 'opt_foo'}))
+        copy = decl.copy()
+        for xxx in range(0, GVars.ALL):
+            copy.set_xxx_default(xxx, 'bar')
+            copy._set_xxx_key(xxx, 'bar')
+            self.assertEqual(decl.get_xxx_default(xxx), [ 'foo', None, None ][xxx])
+            self.assertEqual(decl.get_xxx_key(xxx), [ 'ENV_FOO', 'VAR_FOO', 'opt_foo' ][xxx])
+            self.assertEqual(copy.get_xxx_default(xxx), 'bar')
+            self.assertEqual(copy.get_xxx_key(xxx), 'bar')
 
 #############################################################################
 class Test__GVarDecls(unittest.TestCase):
@@ -852,6 +1615,180 @@ class Test_GVarDecls(unittest.TestCase):
         self.assertIsInstance(decls['foo'], GVars._GVarDecl)
         self.assertIsInstance(decls['bar'], GVars._GVarDecl)
 
+    def _extend_decls(self):
+        decls1 = GVarDecls({
+            'prefix' : ({'ENV_PREFIX' : '/usr'}, ('VAR_PREFIX', 'prefix help'), None),
+            'foo'    : ({'ENV_FOO' : '${bar}'}, None, None),
+        })
+        decls2 = {
+            'bindir' : ({'ENV_BINDIR' : '${prefix}/bin'}, ('VAR_BINDIR', 'bindir help'), None),
+            'sbindir' : ({'ENV_SBINDIR' : '${bindir}/../sbin'}, None, None),
+        }
+        return decls1, decls2
+
+    def test_get_env_defaults(self):
+        """_GVarDecls(...).get_env_defaults() should return renamed defaults of construction variables"""
+        decls = GVarDecls(foo = ({'ENV_FOO' : 'foo'}, None, None),
+                          bar = ({'ENV_BAR' : '${foo}/bar'}, None, None),
+                          geez = ({'ENV_GEEZ' : GVars._undef}, None, None),
+                          var = (None, ('VAR', 'var help', 'var'), None))
+        with self.assertRaises(RuntimeError):
+            decls.get_env_defaults()
+        decls.commit()
+        self.assertEqual(decls.get_env_defaults(), { 'ENV_FOO' : 'foo', 'ENV_BAR' : '${ENV_FOO}/bar' })
+
+    def test_extend_1(self):
+        """GVarDecls(...).extend(decls, env) should append and commit new declarations"""
+        decls1, decls2 = self._extend_decls()
+        from SCons.Environment import Environment
+        from SCons.Variables import Variables
+        env = Environment(tools = [])
+        variables = Variables(is_global = False)
+        decls1.commit(env, variables)
+        decls1.extend(decls2, env, variables)
+        self.assertEqual(env['ENV_PREFIX'], '/usr')
+        self.assertEqual(env['ENV_FOO'], '${bar}')
+        self.assertEqual(env['ENV_BINDIR'], '${ENV_PREFIX}/bin')
+        self.assertEqual(env['ENV_SBINDIR'], '${ENV_BINDIR}/../sbin')
+        self.assertEqual(variables.keys(), ['VAR_PREFIX', 'VAR_BINDIR'])
+        self.assertEqual(sorted(decls1.keys()), ['bindir', 'foo', 'prefix', 'sbindir'])
+
+    def test_extend_2(self):
+        """GVarDecls(...).extend(decls) should give same dicts as single commit()"""
+        decls1, decls2 = self._extend_decls()
+        decls1.commit()
+        decls1.extend(decls2)
+        decls3, decls4 = self._extend_decls()
+        decls3 = GVarDecls(dict(decls3.items() + GVarDecls(decls4).items()))
+        decls3.commit()
+        for xxx in range(0, GVars.ALL):
+            self.assertEqual(decls1.get_xxx_rename_dict(xxx), decls3.get_xxx_rename_dict(xxx))
+            self.assertEqual(decls1.get_xxx_irename_dict(xxx), decls3.get_xxx_irename_dict(xxx))
+            self.assertEqual(decls1.get_xxx_resubst_dict(xxx), decls3.get_xxx_resubst_dict(xxx))
+            self.assertEqual(decls1.get_xxx_iresubst_dict(xxx), decls3.get_xxx_iresubst_dict(xxx))
+
+    def test_extend_3(self):
+        """GVarDecls(...).extend(decls) should reject collisions"""
+        decls1, decls2 = self._extend_decls()
+        decls1.commit()
+        with self.assertRaisesRegexp(RuntimeError, "'prefix' is already declared"):
+            decls1.extend({ 'prefix' : ({'ENV_PREFIX2' : '/usr'}, None, None) })
+        with self.assertRaisesRegexp(RuntimeError, "'VAR_PREFIX' is already declared"):
+            decls1.extend(dict(decls2, geez = ({'ENV_GEEZ' : 'G'}, ('VAR_PREFIX', 'help'), None)))
+        self.assertEqual(sorted(decls1.keys()), ['foo', 'prefix'])
+        self.assertEqual(decls1.get_xxx_rename_dict(GVars.ENV), { 'prefix' : 'ENV_PREFIX', 'foo' : 'ENV_FOO' })
+
+    def test_extend_4(self):
+        """GVarDecls(...).extend(decls) should reject circular dependencies"""
+        decls1, decls2 = self._extend_decls()
+        decls1.commit()
+        with self.assertRaisesRegexp(RuntimeError, 'circular'):
+            decls1.extend({ 'bar' : ({'ENV_BAR' : '${foo}'}, None, None) })
+        self.assertEqual(sorted(decls1.keys()), ['foo', 'prefix'])
+
+    def test_extend_5(self):
+        """GVarDecls(...).extend(decls) should require committed declarations"""
+        decls1, decls2 = self._extend_decls()
+        self.assertRaises(RuntimeError, decls1.extend, decls2)
+
+    def test_Extend(self):
+        """GVarDecls(...).Extend(decls, env) should return _GVars for all the declarations"""
+        decls1, decls2 = self._extend_decls()
+        env = {}
+        decls1.Commit(env)
+        gv = decls1.Extend(decls2, env)
+        self.assertIsInstance(gv, GVars._GVars)
+        self.assertEqual(sorted(gv.get_keys()), ['bindir', 'foo', 'prefix', 'sbindir'])
+        self.assertEqual(gv.env_key('bindir'), 'ENV_BINDIR')
+
+    def _clone_decls(self):
+        return GVarDecls({
+            'prefix' : ({'ENV_PREFIX' : '/usr'}, ('VAR_PREFIX', 'prefix help'), None),
+            'bindir' : ({'ENV_BINDIR' : '${prefix}/bin'}, ('VAR_BINDIR', 'bindir help'), None),
+            'foo'    : ({'ENV_FOO' : 'FOO'}, None, None),
+        })
+
+    def test_clone_1(self):
+        """GVarDecls(...).clone() should share declarations and supplementary dicts"""
+        parent = self._clone_decls()
+        child = parent.clone()
+        self.assertIsInstance(child, GVars._GVarDecls)
+        self.assertEqual(child, parent)
+        for k in parent:
+            self.assertIs(child[k], parent[k])
+        for xxx in range(0, GVars.ALL):
+            self.assertIs(child._GVarDecls__rename[xxx], parent._GVarDecls__rename[xxx])
+            self.assertIs(child._GVarDecls__irename[xxx], parent._GVarDecls__irename[xxx])
+
+    def test_get_xxx_rename_dict_shared(self):
+        """GVarDecls(...).get_xxx_rename_dict() should return read-only dict not affected by later modifications"""
+        decls = self._clone_decls()
+        rename = decls.get_xxx_rename_dict(GVars.ENV)
+        self.assertIsInstance(rename, GVars._ReadOnlyDict)
+        self.assertIs(decls.get_xxx_rename_dict(GVars.ENV), rename)
+        def setitem(): rename['geez'] = 'ENV_GEEZ'
+        self.assertRaises(TypeError, setitem)
+        decls['geez'] = GVarDecl({'ENV_GEEZ' : 'G'})
+        self.assertNotIn('geez', rename)
+        self.assertIn('geez', decls.get_xxx_rename_dict(GVars.ENV))
+
+    def test_clone_2(self):
+        """GVarDecls(...).clone() should copy only what is modified"""
+        parent = self._clone_decls()
+        child = parent.clone()
+        child.set_xxx_key(GVars.ENV, 'foo', 'ENV_FOO2')
+        del child['bindir']
+        child['geez'] = GVarDecl({'ENV_GEEZ' : 'G'})
+        self.assertEqual(child.get_xxx_key(GVars.ENV, 'foo'), 'ENV_FOO2')
+        self.assertEqual(parent.get_xxx_key(GVars.ENV, 'foo'), 'ENV_FOO')
+        self.assertEqual(sorted(child.keys()), ['foo', 'geez', 'prefix'])
+        self.assertEqual(sorted(parent.keys()), ['bindir', 'foo', 'prefix'])
+        self.assertEqual(child.get_xxx_rename_dict(GVars.ENV),
+                         {'prefix' : 'ENV_PREFIX', 'foo' : 'ENV_FOO2', 'geez' : 'ENV_GEEZ'})
+        self.assertEqual(parent.get_xxx_rename_dict(GVars.ENV),
+                         {'prefix' : 'ENV_PREFIX', 'bindir' : 'ENV_BINDIR', 'foo' : 'ENV_FOO'})
+        self.assertEqual(parent.get_xxx_irename_dict(GVars.ENV),
+                         {'ENV_PREFIX' : 'prefix', 'ENV_BINDIR' : 'bindir', 'ENV_FOO' : 'foo'})
+        # untouched namespace is still shared
+        self.assertIs(child._GVarDecls__rename[GVars.OPT], parent._GVarDecls__rename[GVars.OPT])
+        self.assertIsNot(child['foo'], parent['foo'])
+        self.assertIs(child['prefix'], parent['prefix'])
+
+    def test_clone_3(self):
+        """GVarDecls(...).clone().commit() should not modify parent's declarations"""
+        parent = self._clone_decls()
+        child = parent.clone()
+        child.set_xxx_key(GVars.ENV, 'prefix', 'ENV_PREFIX2')
+        child.commit()
+        self.assertEqual(child['bindir'].get_xxx_default(GVars.ENV), '${ENV_PREFIX2}/bin')
+        self.assertEqual(parent['bindir'].get_xxx_default(GVars.ENV), '${prefix}/bin')
+        self.assertIs(child['foo'], parent['foo'])
+        parent.commit()
+        self.assertEqual(parent['bindir'].get_xxx_default(GVars.ENV), '${ENV_PREFIX}/bin')
+        self.assertEqual(child['bindir'].get_xxx_default(GVars.ENV), '${ENV_PREFIX2}/bin')
+
+    def test_clone_4(self):
+        """GVarDecls(...).clone() of committed declarations should be committed"""
+        parent = self._clone_decls()
+        parent.commit()
+        child = parent.clone()
+        self.assertRaises(RuntimeError, child.set_xxx_key, GVars.ENV, 'foo', 'ENV_FOO2')
+        child.extend({ 'geez' : ({'ENV_GEEZ' : '${foo}'}, None, None) })
+        self.assertEqual(child['geez'].get_xxx_default(GVars.ENV), '${ENV_FOO}')
+        self.assertNotIn('geez', parent)
+        self.assertNotIn('geez', parent.get_xxx_rename_dict(GVars.ENV))
+        self.assertNotIn('geez', parent.get_xxx_resubst_dict(GVars.ENV))
+
+    def test_commit_circular_defaults(self):
+        """GVarDecls(...).commit() should raise RuntimeError on circular defaults"""
+        decls = GVarDecls({
+            'foo' : ({'ENV_FOO' : '${bar}'}, None, None),
+            'bar' : ({'ENV_BAR' : 'x ${foo}'}, None, None),
+            'geez' : ({'ENV_GEEZ' : '${foo}'}, None, None)
+        })
+        with self.assertRaisesRegexp(RuntimeError, '(foo -> bar -> foo|bar -> foo -> bar)'):
+            decls.commit()
+
     def test_user_doc_example_4(self):
         """example 4 from user documentation should work"""
         # create multiple declarations at once
@@ -950,6 +1887,171 @@ class Test_GVarDeclsU(unittest.TestCase):
         self.assertIsInstance(decls['foo'], GVars._GVarDecl)
         self.assertIsInstance(decls['bar'], GVars._GVarDecl)
 
+#############################################################################
+class Test_MemoizeConverter(unittest.TestCase):
+    def test_PureConverter(self):
+        """PureConverter(converter) should mark converter as pure"""
+        def converter(value): return value
+        self.assertIs(GVars.PureConverter(converter), converter)
+        self.assertTrue(converter.pure)
+
+    def test_MemoizeConverter_1(self):
+        """MemoizeConverter(converter) should return impure converter unaltered"""
+        converter = lambda value : value
+        self.assertIs(GVars.MemoizeConverter(converter), converter)
+
+    def test_MemoizeConverter_2(self):
+        """MemoizeConverter(converter) should memoize pure converter by raw value"""
+        from SCons.Util import CLVar
+        converter = GVars.PureConverter(Mock(name = 'converter', side_effect = CLVar))
+        memo = GVars.MemoizeConverter(converter)
+        self.assertIsNot(memo, converter)
+        flags = memo('-a -b')
+        self.assertEqual(flags, ['-a', '-b'])
+        self.assertEqual(memo('-a -b'), flags)
+        self.assertEqual(converter.call_count, 1)
+        self.assertEqual(memo('-c'), ['-c'])
+        self.assertEqual(converter.call_count, 2)
+        # non-strings are not memoized
+        memo(['-a'])
+        memo(['-a'])
+        self.assertEqual(converter.call_count, 4)
+
+    def test_MemoizeConverter_3(self):
+        """MemoizeConverter(converter) should create separate cache for each declaration"""
+        converter = GVars.PureConverter(Mock(name = 'converter', side_effect = lambda v, *args : v.upper()))
+        memo1 = GVars.MemoizeConverter(converter)
+        memo2 = GVars.MemoizeConverter(memo1)
+        self.assertIsNot(memo1, memo2)
+        self.assertIs(memo2.converter, converter)
+        self.assertEqual(memo1('a', 'env'), 'A')
+        converter.assert_called_once_with('a', 'env')
+        self.assertEqual(memo2('a'), 'A')
+        self.assertEqual(converter.call_count, 2)
+
+    def test_GVarDeclU_memoize_converter(self):
+        """GVarDeclU(..., memoize_converter = True) should memoize pure converter in Update()"""
+        from SCons.Environment import Environment
+        from SCons.Variables import Variables
+        converter = GVars.PureConverter(Mock(name = 'converter', side_effect = int))
+        decls = GVarDeclsU(num = { 'env_key' : 'NUM', 'var_key' : 'NUM', 'default' : '0',
+                                   'converter' : converter, 'memoize_converter' : True })
+        variables = Variables(is_global = False)
+        env = Environment(tools = [])
+        gv = decls.Commit(env, variables, False)
+        for i in range(3):
+            gv.UpdateEnvironment(env, variables, False, { 'NUM' : '12' })
+            self.assertEqual(env['NUM'], 12)
+        self.assertEqual(converter.call_count, 1)
+
+    def test_MemoizeConverter_copies(self):
+        """MemoizeConverter(converter) should return copies of memoized value"""
+        from SCons.Util import CLVar
+        memo = GVars.MemoizeConverter(GVars.PureConverter(CLVar))
+        flags1 = memo('-O2')
+        flags1 += ['-g']
+        flags2 = memo('-O2')
+        self.assertIsInstance(flags2, CLVar)
+        self.assertEqual(flags2, ['-O2'])
+        self.assertIsNot(flags2, flags1)
+
+    def test_GVarDeclU_memoize_converter_in_place(self):
+        """Modifying in place value converted by memoized converter should not affect other environments"""
+        from SCons.Environment import Environment
+        from SCons.Variables import Variables
+        from SConsGnu.CcVars import _flag_converter
+        decls = GVarDeclsU(cflags = { 'env_key' : 'CFLAGS', 'var_key' : 'CFLAGS',
+                                      'converter' : _flag_converter,
+                                      'memoize_converter' : True })
+        variables = Variables(is_global = False)
+        env1 = Environment(tools = [])
+        env2 = Environment(tools = [])
+        env3 = Environment(tools = [])
+        gv = decls.Commit(env1, variables, False)
+        gv.UpdateEnvironment(env1, variables, False, { 'CFLAGS' : '-O2' })
+        gv.UpdateEnvironment(env2, variables, False, { 'CFLAGS' : '-O2' })
+        self.assertIsNot(env1['CFLAGS'], env2['CFLAGS'])
+        env1['CFLAGS'] += ['-g']
+        self.assertEqual(env1['CFLAGS'], ['-O2', '-g'])
+        self.assertEqual(env2['CFLAGS'], ['-O2'])
+        gv.UpdateEnvironment(env3, variables, False, { 'CFLAGS' : '-O2' })
+        self.assertEqual(env3['CFLAGS'], ['-O2'])
+
+#############################################################################
+class Test_SourceHash(unittest.TestCase):
+    def test_SourceHash_1(self):
+        """SourceHash(*sources) should depend on all the sources"""
+        self.assertEqual(GVars.SourceHash('a', 'b'), GVars.SourceHash('a', 'b'))
+        self.assertNotEqual(GVars.SourceHash('a', 'b'), GVars.SourceHash('ab'))
+        self.assertNotEqual(GVars.SourceHash('a'), GVars.SourceHash('b'))
+
+    def test_SourceHash_2(self):
+        """SourceHash(module) should hash module's source file"""
+        import inspect
+        f = open(inspect.getsourcefile(GVars), 'rb')
+        try:
+            source = f.read()
+        finally:
+            f.close()
+        self.assertEqual(GVars.SourceHash(GVars), GVars.SourceHash(source))
+
+#############################################################################
+class Test_LoadGVars(unittest.TestCase):
+    def setUp(self):
+        import tempfile
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.tmpdir)
+
+    def _cache(self):
+        import os
+        decls = GVarDecls(
+            foo = ({'ENV_FOO' : 'foo'}, ('VAR_FOO', 'foo help'), ('--foo', {'dest' : 'opt_foo'})),
+            bar = ({'ENV_BAR' : '${foo}/bar'}, None, None)
+        )
+        gv = decls.Commit()
+        filename = os.path.join(self.tmpdir, 'gvars.cache')
+        return gv, filename
+
+    def test_LoadGVars_1(self):
+        """LoadGVars(filename, hash) should restore _GVars saved by SaveCache(filename, hash)"""
+        gv, filename = self._cache()
+        self.assertTrue(gv.SaveCache(filename, 'h1'))
+        self.assertFalse(gv.SaveCache(filename, 'h1'))
+        loaded = GVars.LoadGVars(filename, 'h1')
+        self.assertIsInstance(loaded, GVars._GVars)
+        self.assertEqual(loaded._get_tables(), gv._get_tables())
+        self.assertEqual(sorted(loaded.get_keys()), ['bar', 'foo'])
+        self.assertEqual(loaded.var_key('foo'), 'VAR_FOO')
+        self.assertEqual(loaded.opt_key('foo'), 'opt_foo')
+        env = { 'ENV_FOO' : 'F', 'ENV_BAR' : '${ENV_FOO}/bar' }
+        self.assertEqual(loaded.EnvProxy(env)['bar'], '${foo}/bar')
+
+    def test_LoadGVars_2(self):
+        """LoadGVars(filename, hash) should return None for different hash"""
+        gv, filename = self._cache()
+        gv.SaveCache(filename, 'h1')
+        self.assertIsNone(GVars.LoadGVars(filename, 'h2'))
+
+    def test_LoadGVars_3(self):
+        """LoadGVars(filename, hash) should return None for missing or invalid files"""
+        gv, filename = self._cache()
+        self.assertIsNone(GVars.LoadGVars(filename, 'h1'))
+        for content in ('foo = 1\n', GVars._gvars_cache_header + 'garbage'):
+            f = open(filename, 'wb')
+            f.write(content)
+            f.close()
+            self.assertIsNone(GVars.LoadGVars(filename, 'h1'))
+
+    def test_LoadGVars_ImportEnviron(self):
+        """LoadGVars(filename, hash).ImportEnviron() should raise RuntimeError"""
+        gv, filename = self._cache()
+        gv.SaveCache(filename, 'h1')
+        loaded = GVars.LoadGVars(filename, 'h1')
+        self.assertRaises(RuntimeError, loaded.ImportEnviron, ose = { 'foo' : 'F' })
+
 #############################################################################
 if __name__ == "__main__":
     ldr = unittest.TestLoader()
@@ -957,17 +2059,29 @@ if __name__ == "__main__":
     # Load tests to test suite
     tclasses = [ Test_module_constants
                , Test__resubst
+               , Test__Renamer
                , Test__build_resubst_dict
                , Test__build_iresubst_dict
                , Test__compose_dicts
                , Test__invert_dict
+               , Test__ReadOnlyDict
+               , Test__placeholder_names
+               , Test__dependency_order
+               , Test__add_options
+               , Test__get_options
                , Test__GVarsEnvProxy
+               , Test__VariablesWrapper
+               , Test__GVarsView
+               , Test__LazyHelpText
                , Test__GVars
                , Test__GVarDecl
                , Test__GVarDecls
                , Test_GVarDecl
                , Test_GVarDeclU
-               , Test_GVarDecls ]
+               , Test_GVarDecls
+               , Test_MemoizeConverter
+               , Test_SourceHash
+               , Test_LoadGVars ]
 
     for tclass in tclasses:
         suite.addTests(ldr.loadTestsFromTestCase(tclass))
@@ -0,0 +1,148 @@
+""" SConsGnu.ProbesTests
+
+Unit tests for SConsGnu.Probes
+"""
+
+__docformat__ = "restructuredText"
+
+#
+# Copyright (c) 2012-2014 by Pawel Tomulik
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE
+
+
+import unittest
+import tempfile, shutil, os
+from SConsGnu import Probes
+from mock import Mock, patch
+
+#############################################################################
+class Test_run_probe(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.journal = os.path.join(self.tmpdir, 'journal')
+        Probes._journals.clear()
+
+    def tearDown(self):
+        Probes._journals.clear()
+        shutil.rmtree(self.tmpdir)
+
+    def _env(self, mode):
+        vars = { 'GNUBLD_PROBE_MODE' : mode,
+                 'GNUBLD_PROBE_JOURNAL' : self.journal }
+        env = Mock(name = 'env')
+        env.has_key = Mock(name = 'has_key', side_effect = lambda k : k in vars)
+        env.subst = Mock(name = 'subst', side_effect = lambda s : vars[s[2:-1]])
+        return env
+
+    def test_run_probe_1(self):
+        """Probes.run_probe(env, cmd) should run cmd and return (status, out)"""
+        env = self._env(None)
+        with patch('SConsGnu.Probes._run_live', return_value = (0, 'out')) as live:
+            self.assertEqual(Probes.run_probe(env, ['prog', '-v'], 'in'), (0, 'out'))
+            live.assert_called_once_with(env, ['prog', '-v'], 'in')
+        self.assertFalse(os.path.exists(self.journal))
+
+    def test_run_probe_2(self):
+        """Probes.run_probe(env, cmd) should replay outcomes recorded earlier"""
+        with patch('SConsGnu.Probes._run_live', return_value = (1, 'out\n')):
+            Probes.run_probe(self._env('record'), ['prog', '-v'], 'in')
+        Probes._journals.clear()
+        with patch('SConsGnu.Probes._run_live') as live:
+            result = Probes.run_probe(self._env('replay'), ['prog', '-v'], 'in')
+            self.assertEqual(result, (1, 'out\n'))
+            self.assertFalse(live.called)
+
+    def test_run_probe_3(self):
+        """Probes.run_probe(env, cmd) should run cmd if it's not found in journal"""
+        with patch('SConsGnu.Probes._run_live', return_value = (0, 'out')):
+            Probes.run_probe(self._env('record'), ['prog', '-v'], 'in')
+        with patch('SConsGnu.Probes._run_live', return_value = (0, 'live')) as live:
+            result = Probes.run_probe(self._env('replay'), ['prog', '-v'], 'other')
+            self.assertEqual(result, (0, 'live'))
+            self.assertTrue(live.called)
+
+    def test_run_probe_4(self):
+        """Probes.run_probe(env, cmd) should replay failures to start cmd"""
+        with patch('SConsGnu.Probes._run_live', side_effect = OSError(2, 'foo')):
+            self.assertRaises(OSError, Probes.run_probe, self._env('record'), ['prog'])
+        Probes._journals.clear()
+        with patch('SConsGnu.Probes._run_live') as live:
+            self.assertRaises(OSError, Probes.run_probe, self._env('replay'), ['prog'])
+            self.assertFalse(live.called)
+
+    def test_run_probe_5(self):
+        """Probes.run_probe(env, cmd) should raise ValueError for unsupported mode"""
+        self.assertRaises(ValueError, Probes.run_probe, self._env('foo'), ['prog'])
+
+    def test_run_probe_6(self):
+        """Probes.run_probe(env, cmd) should replace record for the same probe in journal"""
+        env = self._env('record')
+        with patch('SConsGnu.Probes._run_live', return_value = (0, 'out1')):
+            Probes.run_probe(env, ['prog', '-v'], 'in')
+            Probes.run_probe(env, ['prog', '-v'], 'in')
+            Probes.run_probe(env, ['prog', '-h'], 'in')
+        with patch('SConsGnu.Probes._run_live', return_value = (0, 'out2')):
+            Probes.run_probe(env, ['prog', '-v'], 'in')
+        with open(self.journal) as f:
+            self.assertEqual(len(f.readlines()), 2)
+        Probes._journals.clear()
+        with patch('SConsGnu.Probes._run_live') as live:
+            result = Probes.run_probe(self._env('replay'), ['prog', '-v'], 'in')
+            self.assertEqual(result, (0, 'out2'))
+            self.assertFalse(live.called)
+
+    def test_run_probe_files(self):
+        """Probes.run_probe(env, cmd, input, files) should identify files by name and content"""
+        def script(dirname, content):
+            path = os.path.join(self.tmpdir, dirname, 'conftest.sed')
+            os.makedirs(os.path.dirname(path))
+            with open(path, 'w') as f:
+                f.write(content)
+            return path
+        f1, f2, f3 = script('a', 's/a/b/'), script('b', 's/a/b/'), script('c', 's/x/y/')
+        with patch('SConsGnu.Probes._run_live', return_value = (0, 'out')) as live:
+            Probes.run_probe(self._env('record'), ['sed', '-f', f1], 'in', [f1])
+            self.assertEqual(live.call_args[0][1:], (['sed', '-f', f1], 'in'))
+        Probes._journals.clear()
+        with patch('SConsGnu.Probes._run_live', return_value = (0, 'live')) as live:
+            env = self._env('replay')
+            self.assertEqual(Probes.run_probe(env, ['sed', '-f', f2], 'in', [f2]), (0, 'out'))
+            self.assertFalse(live.called)
+            self.assertEqual(Probes.run_probe(env, ['sed', '-f', f3], 'in', [f3]), (0, 'live'))
+            self.assertTrue(live.called)
+
+#############################################################################
+if __name__ == "__main__":
+    ldr = unittest.TestLoader()
+    suite = unittest.TestSuite()
+    # Load tests to test suite
+    tclasses = [ Test_run_probe ]
+
+    for tclass in tclasses:
+        suite.addTests(ldr.loadTestsFromTestCase(tclass))
+
+    if not unittest.TextTestRunner(verbosity = 2).run(suite).wasSuccessful():
+        sys.exit(1)
+
+# Local Variables:
+# # tab-width:4
+# # indent-tabs-mode:nil
+# # End:
+# vim: set syntax=python expandtab tabstop=4 shiftwidth=4: